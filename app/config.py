@@ -1,17 +1,206 @@
 import os
 from dotenv import load_dotenv
 
+# The only place .env is read: every other module imports its settings from here
 load_dotenv()
 
-HORIZON_URL = "https://horizon-testnet.stellar.org"
+DATABASE_URL = os.getenv("DATABASE_URL")
+HORIZON_URL = os.getenv("HORIZON_URL", "https://horizon-testnet.stellar.org")
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+# Users (comma-separated emails) allowed on the operator endpoints; none by default
+ADMIN_EMAILS = {email.strip() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
 ISSUER_PUBLIC_KEY = os.getenv("ISSUER_PUBLIC_KEY")
 ISSUER_SECRET_KEY = os.getenv("ISSUER_SECRET_KEY")
 VAULT_PUBLIC_KEY = os.getenv("VAULT_PUBLIC_KEY")
 VAULT_SECRET_KEY = os.getenv("VAULT_SECRET_KEY")
-SOROBAN_CONTRACT_ID = "CAX3A2HAGBRPE2KDQAKH543Y7ERZKEDTVYZ57R5RTH3M2HZDIYFUTHGL"
-SOROBAN_RPC_URL = "https://soroban-testnet.stellar.org"
\ No newline at end of file
+# Admin of the Soroban contract (signs add_yield_batch), the vault by default
+CONTRACT_ADMIN_SECRET = os.getenv("CONTRACT_ADMIN_SECRET", VAULT_SECRET_KEY)
+# add_yield_batch / batch_applied take a batch id: point this at a
+# deployment of the current contract before running the yield engine
+SOROBAN_CONTRACT_ID = os.getenv("SOROBAN_CONTRACT_ID", "CAX3A2HAGBRPE2KDQAKH543Y7ERZKEDTVYZ57R5RTH3M2HZDIYFUTHGL")
+SOROBAN_RPC_URL = os.getenv("SOROBAN_RPC_URL", "https://soroban-testnet.stellar.org")
+FRIENDBOT_URL = os.getenv("FRIENDBOT_URL", "https://friendbot.stellar.org")
+
+# Connection pools shared by the Horizon / Soroban RPC clients
+STELLAR_HTTP_POOL_SIZE = int(os.getenv("STELLAR_HTTP_POOL_SIZE", 100))
+STELLAR_HTTP_TIMEOUT = float(os.getenv("STELLAR_HTTP_TIMEOUT", 11))
+STELLAR_HTTP_POST_TIMEOUT = float(os.getenv("STELLAR_HTTP_POST_TIMEOUT", 33))
+
+# Rebuild attempts for system-account transactions rejected with tx_bad_seq
+SEQUENCE_RETRY_LIMIT = int(os.getenv("SEQUENCE_RETRY_LIMIT", 3))
+
+# Vault payouts are coalesced into multi-operation transactions
+PAYOUT_BATCH_WINDOW_MS = int(os.getenv("PAYOUT_BATCH_WINDOW_MS", 200))
+PAYOUT_BATCH_MAX_OPS = int(os.getenv("PAYOUT_BATCH_MAX_OPS", 100))
+
+# Users per add_yield_batch transaction, sized to stay within Soroban's
+# per-transaction ledger write limits
+YIELD_BATCH_SIZE = int(os.getenv("YIELD_BATCH_SIZE", 20))
+
+# APY the daily distribution pays out (and simulations default to)
+YIELD_ANNUAL_APY = os.getenv("YIELD_ANNUAL_APY", "0.08")
+
+# Vault balance cache: entry lifetime / size, and per-endpoint staleness bounds (seconds)
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", 60))
+BALANCE_CACHE_MAX_SIZE = int(os.getenv("BALANCE_CACHE_MAX_SIZE", 10000))
+MY_BALANCE_MAX_AGE = float(os.getenv("MY_BALANCE_MAX_AGE", 15))
+TOTAL_XLM_MAX_AGE = float(os.getenv("TOTAL_XLM_MAX_AGE", 60))
+
+# Cached Soroban simulations (footprint + resource fees) for repeat user calls
+FOOTPRINT_CACHE_TTL = float(os.getenv("FOOTPRINT_CACHE_TTL", 600))
+FOOTPRINT_CACHE_MAX_SIZE = int(os.getenv("FOOTPRINT_CACHE_MAX_SIZE", 10000))
+FOOTPRINT_FEE_MARGIN = float(os.getenv("FOOTPRINT_FEE_MARGIN", 0.15))
+
+# Background job workers (jobs table)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", 5))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 300))
+
+# Idempotency-Key on /wallet/pay, /vault/deposit and /vault/withdraw: how
+# long a key is remembered, how long an unfinished request holds it before
+# it is presumed dead, and how long a duplicate waits for the original (seconds)
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", 86400))
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 120))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 30))
+
+# Round-off savings are accumulated locally and swept into the contract in
+# bulk: once a user's pending total reaches the threshold (XLM), and on a schedule
+ROUNDOFF_SWEEP_THRESHOLD = float(os.getenv("ROUNDOFF_SWEEP_THRESHOLD", 1))
+ROUNDOFF_SWEEP_INTERVAL = float(os.getenv("ROUNDOFF_SWEEP_INTERVAL", 3600))
+ROUNDOFF_SWEEP_BATCH_SIZE = int(os.getenv("ROUNDOFF_SWEEP_BATCH_SIZE", 20))
+
+# Contract event indexer. INDEXER_START_LEDGER should be the contract's deploy
+# ledger (0 = oldest ledger the RPC node still retains); VAULT_READ_SOURCE
+# "index" serves /vault balance reads from the local index instead of RPC
+# and runs the indexer, in one process at a time (lease renewed every poll)
+INDEXER_START_LEDGER = int(os.getenv("INDEXER_START_LEDGER", 0))
+INDEXER_POLL_INTERVAL = float(os.getenv("INDEXER_POLL_INTERVAL", 5))
+INDEXER_PAGE_SIZE = int(os.getenv("INDEXER_PAGE_SIZE", 200))
+INDEXER_LEASE_SECONDS = float(os.getenv("INDEXER_LEASE_SECONDS", 30))
+VAULT_READ_SOURCE = os.getenv("VAULT_READ_SOURCE", "rpc")
+
+# Custodial account balances streamed from Horizon effects: reconnect
+# delay, how long cached balances are trusted while the stream is down and
+# while it is up (it may lag), in seconds, and how many accounts are kept
+# in memory
+ACCOUNT_STREAM_RETRY_SECONDS = float(os.getenv("ACCOUNT_STREAM_RETRY_SECONDS", 5))
+ACCOUNT_STATE_FALLBACK_TTL = float(os.getenv("ACCOUNT_STATE_FALLBACK_TTL", 10))
+ACCOUNT_STATE_MAX_AGE = float(os.getenv("ACCOUNT_STATE_MAX_AGE", 60))
+ACCOUNT_STATE_MAX_SIZE = int(os.getenv("ACCOUNT_STATE_MAX_SIZE", 10000))
+
+# Bulk balance / summary lookups: keys per request and concurrent upstream calls
+BULK_LOOKUP_MAX_KEYS = int(os.getenv("BULK_LOOKUP_MAX_KEYS", 500))
+BULK_LOOKUP_CONCURRENCY = int(os.getenv("BULK_LOOKUP_CONCURRENCY", 16))
+
+# Database: SQLite runs in WAL mode with a busy timeout. Pool size / overflow /
+# timeout apply to SQLite files and server databases, recycle to server databases
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+# JWT subject -> wallet lookups cached per process (seconds, 0 disables)
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", 30))
+IDENTITY_CACHE_MAX_SIZE = int(os.getenv("IDENTITY_CACHE_MAX_SIZE", 10000))
+
+# Password hashing (bcrypt) runs on its own thread pool. Logins beyond
+# workers + max queue are refused with 429; a queued hash that waited longer
+# than the queue timeout (seconds) is dropped with 503. Hashes with fewer
+# rounds than BCRYPT_ROUNDS are upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 32))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", 2))
+
+# Decrypted signing keypairs of active wallets, held in memory only
+# (seconds, 0 disables); evicted on logout and when a wallet's key changes
+SIGNER_CACHE_TTL = float(os.getenv("SIGNER_CACHE_TTL", 300))
+SIGNER_CACHE_MAX_SIZE = int(os.getenv("SIGNER_CACHE_MAX_SIZE", 1000))
+
+# Bulk wallet provisioning: key generation processes (CLI runs; API runs go
+# through the job queue with one), rows per insert / commit, emails per API
+# call, and funding from the treasury (create_account operations per
+# transaction, transactions per funding job, XLM per account). The treasury
+# must be set explicitly: funding is refused without it.
+TREASURY_SECRET_KEY = os.getenv("TREASURY_SECRET_KEY")
+PROVISIONING_PROCESSES = int(os.getenv("PROVISIONING_PROCESSES", os.cpu_count() or 1))
+PROVISIONING_CHUNK_SIZE = int(os.getenv("PROVISIONING_CHUNK_SIZE", 1000))
+PROVISIONING_MAX_EMAILS = int(os.getenv("PROVISIONING_MAX_EMAILS", 50000))
+PROVISIONING_OPS_PER_TX = int(os.getenv("PROVISIONING_OPS_PER_TX", 100))
+PROVISIONING_TX_PER_JOB = int(os.getenv("PROVISIONING_TX_PER_JOB", 20))
+PROVISIONING_STARTING_BALANCE = os.getenv("PROVISIONING_STARTING_BALANCE", "2.5")
+
+# Payment history imported from Horizon for savings projections
+PAYMENT_HISTORY_PAGE_SIZE = int(os.getenv("PAYMENT_HISTORY_PAGE_SIZE", 200))
+PAYMENT_HISTORY_SYNC_PAGES = int(os.getenv("PAYMENT_HISTORY_SYNC_PAGES", 50))
+
+# Loaded payment histories kept in memory between projections (seconds,
+# 0 disables); dropped when this process records or imports a payment
+PROJECTION_CACHE_TTL = float(os.getenv("PROJECTION_CACHE_TTL", 60))
+PROJECTION_CACHE_MAX_SIZE = int(os.getenv("PROJECTION_CACHE_MAX_SIZE", 100))
+
+# Yield simulations run from the API: users across all cohorts, and days
+YIELD_SIMULATION_MAX_USERS = int(os.getenv("YIELD_SIMULATION_MAX_USERS", 1_000_000))
+YIELD_SIMULATION_MAX_DAYS = int(os.getenv("YIELD_SIMULATION_MAX_DAYS", 3650))
+
+# Submitted Soroban transactions are confirmed in rounds (seconds between
+# them): up to TX_TRACKER_HASH_POLL_MAX pending hashes are looked up one by
+# one with getTransaction, more are found by reading the ledgers they were
+# sent in with getTransactions (transactions per page, ledgers per round).
+# After TX_TRACKER_EXPIRE_LEDGERS ledgers a hash not seen yet is checked on
+# its own and marked expired. Withdrawals wait up to TX_CONFIRM_TIMEOUT
+# seconds before paying out
+TX_TRACKER_POLL_INTERVAL = float(os.getenv("TX_TRACKER_POLL_INTERVAL", 1))
+TX_TRACKER_HASH_POLL_MAX = int(os.getenv("TX_TRACKER_HASH_POLL_MAX", 20))
+TX_TRACKER_PAGE_SIZE = int(os.getenv("TX_TRACKER_PAGE_SIZE", 200))
+TX_TRACKER_SCAN_LEDGERS = int(os.getenv("TX_TRACKER_SCAN_LEDGERS", 10))
+TX_TRACKER_EXPIRE_LEDGERS = int(os.getenv("TX_TRACKER_EXPIRE_LEDGERS", 12))
+TX_CONFIRM_TIMEOUT = float(os.getenv("TX_CONFIRM_TIMEOUT", 60))
+
+# /wallet/tx-events streams: seconds between keep-alives (each also picks up
+# updates confirmed by other processes), transactions sent on connect, and
+# seconds a stream token (the ?token= of the EventSource) can be used to connect
+TX_EVENTS_HEARTBEAT = float(os.getenv("TX_EVENTS_HEARTBEAT", 15))
+TX_EVENTS_RECENT = int(os.getenv("TX_EVENTS_RECENT", 20))
+TX_EVENTS_TOKEN_SECONDS = int(os.getenv("TX_EVENTS_TOKEN_SECONDS", 60))
+
+# Transaction fees (stroops per operation) follow Horizon fee_stats, refreshed
+# every FEE_STATS_TTL seconds: user-facing transactions bid the
+# FEE_PERCENTILE of recently charged fees, background batches
+# FEE_BACKGROUND_PERCENTILE, never more than FEE_MAX. A transaction still not
+# in a ledger after FEE_BUMP_AFTER seconds (0 disables) is resubmitted inside
+# a fee-bump paid by FEE_SPONSOR_SECRET (the vault by default), bidding at
+# most FEE_BUMP_MAX
+FEE_STATS_TTL = float(os.getenv("FEE_STATS_TTL", 10))
+FEE_PERCENTILE = int(os.getenv("FEE_PERCENTILE", 90))
+FEE_BACKGROUND_PERCENTILE = int(os.getenv("FEE_BACKGROUND_PERCENTILE", 50))
+FEE_MAX = int(os.getenv("FEE_MAX", 10_000))
+FEE_BUMP_AFTER = float(os.getenv("FEE_BUMP_AFTER", 12))
+FEE_BUMP_MAX = int(os.getenv("FEE_BUMP_MAX", 100_000))
+FEE_SPONSOR_SECRET = os.getenv("FEE_SPONSOR_SECRET", VAULT_SECRET_KEY)
+
+# Channel accounts: vault and issuer transactions take their sequence number
+# (and fee) from one of CHANNEL_POOL_SIZE channel accounts per process, so
+# that many can land in the same ledger; 0 (the default) disables. Channels
+# are created from the vault with CHANNEL_STARTING_BALANCE XLM by
+# `python -m app.services.channel_pool create N`, leased to one process at a
+# time for CHANNEL_LEASE_SECONDS (renewed while it runs) and topped back up
+# when a health check (every CHANNEL_HEALTH_INTERVAL seconds) finds less
+# than CHANNEL_MIN_BALANCE
+CHANNEL_POOL_SIZE = int(os.getenv("CHANNEL_POOL_SIZE", 0))
+CHANNEL_STARTING_BALANCE = os.getenv("CHANNEL_STARTING_BALANCE", "5")
+CHANNEL_MIN_BALANCE = float(os.getenv("CHANNEL_MIN_BALANCE", 2))
+CHANNEL_HEALTH_INTERVAL = float(os.getenv("CHANNEL_HEALTH_INTERVAL", 300))
+CHANNEL_LEASE_SECONDS = float(os.getenv("CHANNEL_LEASE_SECONDS", 60))
+
+# Observability: GET /metrics serves upstream call, DB statement and HTTP
+# route latency (per process, Prometheus text format). Logs are JSON lines
+# carrying the request's trace id (X-Request-ID); LOG_TIMINGS adds a line
+# per request and per upstream call made while serving one
+LOG_TIMINGS = os.getenv("LOG_TIMINGS", "true").lower() == "true"
@@ -1,18 +1,73 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-engine = create_engine(
+from app.config import (
     DATABASE_URL,
-    connect_args={"check_same_thread": False}  # needed for SQLite
+    SQLITE_BUSY_TIMEOUT_MS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
 )
 
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+}
+
+if DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={
+            "check_same_thread": False,  # needed for SQLite
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+        },
+        # In-memory databases use a single shared connection
+        **({} if ":memory:" in DATABASE_URL else POOL_OPTIONS),
+    )
+
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        # WAL lets readers run alongside the single writer; busy_timeout makes
+        # writers wait for the lock instead of failing with "database is locked"
+        cursor = dbapi_connection.cursor()
+        if ":memory:" not in DATABASE_URL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        **POOL_OPTIONS,
+    )
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+
+def get_db():
+    """Request-scoped session (FastAPI dependency), always closed"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def with_session(func, *args):
+    """
+    func(db, *args) in a session of its own, closed before returning. Async
+    handlers run it with asyncio.to_thread instead of holding a request
+    session (and its connection) across their awaits.
+    """
+    db = SessionLocal()
+    try:
+        return func(db, *args)
+    finally:
+        db.close()
@@ -1,15 +1,33 @@
 from fastapi import FastAPI
-from app.database import engine, SessionLocal
-from app.models.user import User
-from app.utils.security import hash_password
-from app.database import Base
+from app.database import engine
+from app.migrations import check_schema
+from app.utils.security import shutdown_executor
 from app.routes import auth
 from app.utils.dependencies import get_current_user
 from fastapi import Depends
 from app.models import wallet
+from app.models import yield_run
+from app.models import job
+from app.models import roundoff
+from app.models import contract_event
+from app.models import provisioning
+from app.models import payment_history
+from app.models import idempotency
+from app.models import tracked_tx
+from app.models import channel_account
 from app.routes import wallet as wallet_routes
 from app.routes import vault as vault_routes
+from app.services.stellar_service_async import close_clients, start_fee_refresher, stop_fee_refresher
+from app.services.payout_batcher import close_vault_batcher
+from app.services.job_queue import start_workers, stop_workers
+from app.services.roundoff_ledger import start_sweep_scheduler, stop_sweep_scheduler
+from app.services.event_indexer import start_indexer, stop_indexer
+from app.services.account_state import start_account_stream, stop_account_stream
+from app.services.tx_tracker import start_tracker, stop_tracker
+from app.services.channel_pool import start_channel_pool, stop_channel_pool
+from app.utils.metrics import RequestMetricsMiddleware, instrument_engine, render as render_metrics
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 
 
@@ -25,35 +43,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+# Outermost, so its timings and trace id cover the whole request
+app.add_middleware(RequestMetricsMiddleware)
+instrument_engine(engine)
 
-Base.metadata.create_all(bind=engine)
+# The schema is migrated by a deploy step (python -m app.migrations) and demo
+# users are created by python -m app.seed; startup only checks the version
+@app.on_event("startup")
+def verify_schema():
+    check_schema()
 
 @app.on_event("startup")
-def create_demo_users():
-    db = SessionLocal()
-
-    if not db.query(User).filter(User.email == "demo1@microyield.com").first():
-        user1 = User(
-            email="demo1@microyield.com",
-            hashed_password=hash_password("password123")
-        )
-        db.add(user1)
-
-    if not db.query(User).filter(User.email == "demo2@microyield.com").first():
-        user2 = User(
-            email="demo2@microyield.com",
-            hashed_password=hash_password("password123")
-        )
-        db.add(user2)
-
-    db.commit()
-    db.close()
+async def start_job_workers():
+    start_workers()
+    start_sweep_scheduler()
+    start_indexer()
+    start_account_stream()
+    start_tracker()
+    start_fee_refresher()
+    start_channel_pool()
+
+@app.on_event("shutdown")
+async def close_stellar_clients():
+    await stop_fee_refresher()
+    await stop_tracker()
+    await stop_account_stream()
+    await stop_indexer()
+    await stop_sweep_scheduler()
+    await stop_workers()
+    await close_vault_batcher()
+    await stop_channel_pool()
+    await close_clients()
+    shutdown_executor()
 
 @app.get("/")
 def root():
     return {"message": "MicroYield API running 🚀"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Latency histograms and counters, Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/protected")
 def protected_route(current_user: str = Depends(get_current_user)):
     return {"message": f"Hello {current_user}, you are authenticated."}
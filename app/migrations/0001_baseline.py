@@ -0,0 +1,243 @@
+"""
+Baseline: the schema as create_all built it at app import, before
+migrations. Tables are written out here rather than taken from the
+models, so later model changes need a migration of their own. Missing
+tables are created and existing ones left alone, which adopts databases
+created before migrations.
+"""
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+)
+
+
+def upgrade(conn):
+    metadata = MetaData()
+    Table(
+        "channel_accounts",
+        metadata,
+        Column("public_key", String, primary_key=True),
+        Column("encrypted_secret", String),
+        Column("created_at", DateTime),
+        Column("funded_at", DateTime),
+    )
+    Table(
+        "contract_events",
+        metadata,
+        Column("id", String, primary_key=True),
+        Column("ledger", Integer),
+        Column("tx_hash", String),
+        Column("topic", String),
+        Column("public_key", String),
+        Column("amount", BigInteger),
+        Index("ix_contract_events_ledger", "ledger"),
+        Index("ix_contract_events_public_key", "public_key"),
+        Index("ix_contract_events_topic", "topic"),
+    )
+    Table(
+        "indexer_cursors",
+        metadata,
+        Column("name", String, primary_key=True),
+        Column("cursor", String),
+        Column("start_ledger", Integer),
+        Column("latest_ledger", Integer),
+        Column("updated_at", DateTime),
+    )
+    Table(
+        "jobs",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("kind", String),
+        Column("payload", Text),
+        Column("status", String),
+        Column("attempts", Integer),
+        Column("max_attempts", Integer),
+        Column("run_after", DateTime),
+        Column("last_error", Text),
+        Column("result", Text),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+        Index("ix_jobs_id", "id"),
+        Index("ix_jobs_kind", "kind"),
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+    Table(
+        "provisioning_runs",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("label", String),
+        Column("requested", Integer),
+        Column("wallets_created", Integer),
+        Column("accounts_funded", Integer),
+        Column("transactions", Integer),
+        Column("starting_balance", String),
+        Column("status", String),
+        Column("create_seconds", Float),
+        Column("fund_seconds", Float),
+        Column("last_error", String),
+        Column("created_at", DateTime),
+        Column("completed_at", DateTime),
+        Index("ix_provisioning_runs_id", "id"),
+    )
+    Table(
+        "roundoff_sweeps",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("total_amount", BigInteger),
+        Column("user_count", Integer),
+        Column("tx_hash", String),
+        Column("status", String),
+        Column("created_at", DateTime),
+        Column("completed_at", DateTime),
+        Index("ix_roundoff_sweeps_id", "id"),
+    )
+    Table(
+        "tracked_transactions",
+        metadata,
+        Column("hash", String, primary_key=True),
+        Column("public_key", String),
+        Column("kind", String),
+        Column("status", String),
+        Column("submitted_ledger", Integer),
+        Column("ledger", Integer),
+        Column("created_at", DateTime),
+        Column("confirmed_at", DateTime),
+        Index("ix_tracked_transactions_public_key", "public_key", "created_at"),
+        Index("ix_tracked_transactions_status", "status"),
+    )
+    Table(
+        "users",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("email", String),
+        Column("hashed_password", String),
+        Index("ix_users_email", "email", unique=True),
+        Index("ix_users_id", "id"),
+    )
+    Table(
+        "vault_positions",
+        metadata,
+        Column("public_key", String, primary_key=True),
+        Column("xlm_balance", BigInteger),
+        Column("usdc_principal", BigInteger),
+        Column("usdc_yield", BigInteger),
+        Column("updated_ledger", Integer),
+    )
+    Table(
+        "yield_runs",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("run_date", String),
+        Column("total_principal", BigInteger),
+        Column("daily_yield", BigInteger),
+        Column("status", String),
+        Column("created_at", DateTime),
+        Column("completed_at", DateTime),
+        Index("ix_yield_runs_id", "id"),
+        Index("ix_yield_runs_run_date", "run_date", unique=True),
+    )
+    Table(
+        "wallets",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("user_id", Integer, ForeignKey("users.id")),
+        Column("public_key", String),
+        Column("encrypted_secret", String),
+        Column("created_at", DateTime),
+        Index("ix_wallets_id", "id"),
+        Index("ix_wallets_public_key", "public_key", unique=True),
+    )
+    Table(
+        "yield_allocations",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("run_id", Integer, ForeignKey("yield_runs.id")),
+        Column("chunk_index", Integer),
+        Column("public_key", String),
+        Column("amount", BigInteger),
+        Column("tx_hash", String),
+        Column("status", String),
+        Index("ix_yield_allocations_chunk_index", "chunk_index"),
+        Index("ix_yield_allocations_id", "id"),
+        Index("ix_yield_allocations_run_id", "run_id"),
+    )
+    Table(
+        "idempotency_keys",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("wallet_id", Integer, ForeignKey("wallets.id")),
+        Column("key", String),
+        Column("endpoint", String),
+        Column("fingerprint", String),
+        Column("status", String),
+        Column("response_status", Integer),
+        Column("response_body", Text),
+        Column("steps", Text),
+        Column("tx_hashes", Text),
+        Column("locked_until", DateTime),
+        Column("created_at", DateTime),
+        Column("completed_at", DateTime),
+        Column("expires_at", DateTime),
+        UniqueConstraint("wallet_id", "key", name="uq_idempotency_keys_wallet_key"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+        Index("ix_idempotency_keys_id", "id"),
+    )
+    Table(
+        "payment_history",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("wallet_id", Integer, ForeignKey("wallets.id")),
+        Column("public_key", String),
+        Column("amount", BigInteger),
+        Column("roundoff", BigInteger),
+        Column("tx_hash", String),
+        Column("operation_id", String),
+        Column("created_at", DateTime),
+        UniqueConstraint("operation_id"),
+        Index("ix_payment_history_id", "id"),
+        Index("ix_payment_history_projection", "public_key", "created_at", "amount", "roundoff"),
+        Index("ix_payment_history_tx_hash", "tx_hash"),
+        Index("ix_payment_history_wallet_id", "wallet_id"),
+    )
+    Table(
+        "provisioned_accounts",
+        metadata,
+        Column("wallet_id", Integer, ForeignKey("wallets.id"), primary_key=True),
+        Column("run_id", Integer, ForeignKey("provisioning_runs.id")),
+        Column("public_key", String),
+        Column("status", String),
+        Column("funding_tx_hash", String),
+        Column("funded_at", DateTime),
+        Index("ix_provisioned_accounts_run_id", "run_id"),
+        Index("ix_provisioned_accounts_run_status", "run_id", "status"),
+    )
+    Table(
+        "roundoff_entries",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("wallet_id", Integer, ForeignKey("wallets.id")),
+        Column("public_key", String),
+        Column("amount", BigInteger),
+        Column("payment_hash", String),
+        Column("status", String),
+        Column("sweep_id", Integer, ForeignKey("roundoff_sweeps.id")),
+        Column("created_at", DateTime),
+        Index("ix_roundoff_entries_id", "id"),
+        Index("ix_roundoff_entries_public_key", "public_key"),
+        Index("ix_roundoff_entries_status_public_key", "status", "public_key"),
+        Index("ix_roundoff_entries_sweep_id", "sweep_id"),
+        Index("ix_roundoff_entries_wallet_id", "wallet_id"),
+    )
+
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,15 @@
+"""
+Channel accounts are leased to one process at a time (channel_pool):
+leased_by / leased_until on channel_accounts.
+"""
+
+from sqlalchemy import DateTime, String, inspect, text
+
+
+def upgrade(conn):
+    existing = {column["name"] for column in inspect(conn).get_columns("channel_accounts")}
+    for name, column_type in (("leased_by", String()), ("leased_until", DateTime())):
+        if name not in existing:
+            conn.execute(text(
+                f"ALTER TABLE channel_accounts ADD COLUMN {name} {column_type.compile(dialect=conn.dialect)}"
+            ))
@@ -0,0 +1,15 @@
+"""
+The event indexer runs in one process at a time: leased_by / leased_until
+on indexer_cursors.
+"""
+
+from sqlalchemy import DateTime, String, inspect, text
+
+
+def upgrade(conn):
+    existing = {column["name"] for column in inspect(conn).get_columns("indexer_cursors")}
+    for name, column_type in (("leased_by", String()), ("leased_until", DateTime())):
+        if name not in existing:
+            conn.execute(text(
+                f"ALTER TABLE indexer_cursors ADD COLUMN {name} {column_type.compile(dialect=conn.dialect)}"
+            ))
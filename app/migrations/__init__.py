@@ -0,0 +1,72 @@
+"""
+Versioned schema migrations, applied as a deploy step instead of at app
+import:
+
+    python -m app.migrations            # apply pending migrations
+    python -m app.migrations --status   # list applied / pending ones
+
+Each module here named NNNN_description.py has an upgrade(conn) that runs
+in its own transaction; applied versions are recorded in
+schema_migrations. At startup the app only checks that none are pending
+(check_schema) and refuses to start otherwise.
+"""
+
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select
+
+from app.database import engine as default_engine
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime),
+)
+
+
+def available():
+    """[(version, module name)] of every migration, in order"""
+    names = sorted(module.name for module in pkgutil.iter_modules(__path__) if module.name[:4].isdigit())
+    return [(name[:4], name) for name in names]
+
+
+def applied(conn) -> set:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return set()
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending(engine=None):
+    with (engine or default_engine).connect() as conn:
+        done = applied(conn)
+    return [(version, name) for version, name in available() if version not in done]
+
+
+def upgrade(engine=None):
+    """Apply pending migrations in order; returns the names applied"""
+    engine = engine or default_engine
+    with engine.begin() as conn:
+        _metadata.create_all(conn)
+
+    names = []
+    for version, name in pending(engine):
+        module = importlib.import_module(f"{__name__}.{name}")
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+        print(f"Applied migration {name}")
+        names.append(name)
+    return names
+
+
+def check_schema(engine=None):
+    """Raise if the database is missing migrations (called at app startup)"""
+    missing = pending(engine)
+    if missing:
+        names = ", ".join(name for _, name in missing)
+        raise RuntimeError(f"Database schema is not up to date ({names} pending): run python -m app.migrations")
@@ -0,0 +1,15 @@
+import argparse
+
+from app.migrations import available, pending, upgrade
+
+parser = argparse.ArgumentParser(prog="python -m app.migrations")
+parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+args = parser.parse_args()
+
+if args.status:
+    waiting = {name for _, name in pending()}
+    for _, name in available():
+        print(f"{'pending' if name in waiting else 'applied':<8} {name}")
+else:
+    names = upgrade()
+    print(f"{len(names)} migrations applied" if names else "Schema is up to date")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+from app.database import Base
+
+class ChannelAccount(Base):
+    __tablename__ = "channel_accounts"
+
+    public_key = Column(String, primary_key=True)
+    encrypted_secret = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    funded_at = Column(DateTime, nullable=True)   # last create / top-up from the vault
+    leased_by = Column(String, nullable=True)     # process using the channel (channel_pool.OWNER)
+    leased_until = Column(DateTime, nullable=True)
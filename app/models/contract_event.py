@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
+from datetime import datetime
+from app.database import Base
+
+class ContractEvent(Base):
+    __tablename__ = "contract_events"
+
+    id = Column(String, primary_key=True)    # Soroban RPC event id
+    ledger = Column(Integer, index=True)
+    tx_hash = Column(String)
+    topic = Column(String, index=True)
+    public_key = Column(String, index=True)
+    amount = Column(BigInteger)              # stroops
+
+
+class VaultPosition(Base):
+    __tablename__ = "vault_positions"
+
+    public_key = Column(String, primary_key=True)
+    xlm_balance = Column(BigInteger, default=0)      # stroops
+    usdc_principal = Column(BigInteger, default=0)   # stroops
+    usdc_yield = Column(BigInteger, default=0)       # stroops
+    updated_ledger = Column(Integer)
+
+
+class IndexerCursor(Base):
+    __tablename__ = "indexer_cursors"
+
+    name = Column(String, primary_key=True)
+    cursor = Column(String, nullable=True)
+    start_ledger = Column(Integer, nullable=True)
+    latest_ledger = Column(Integer, nullable=True)
+    leased_by = Column(String, nullable=True)     # process running the sync (channel_pool.OWNER)
+    leased_until = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    wallet_id = Column(Integer, ForeignKey("wallets.id"))
+    key = Column(String)
+    endpoint = Column(String)
+    fingerprint = Column(String)             # sha256 of endpoint + request body
+    status = Column(String, default="in_progress")
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)     # JSON
+    steps = Column(Text, nullable=True)             # JSON {step: result} of the on-chain steps done so far
+    tx_hashes = Column(Text, nullable=True)         # JSON list
+    locked_until = Column(DateTime)                 # an in-progress request past this has died
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime)
+
+    __table_args__ = (
+        UniqueConstraint("wallet_id", "key", name="uq_idempotency_keys_wallet_key"),
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+class PaymentRecord(Base):
+    __tablename__ = "payment_history"
+
+    id = Column(Integer, primary_key=True, index=True)
+    wallet_id = Column(Integer, ForeignKey("wallets.id"), index=True)
+    public_key = Column(String)
+    amount = Column(BigInteger)                  # stroops paid to the merchant
+    roundoff = Column(BigInteger, default=0)     # stroops paid to the vault in the same transaction
+    tx_hash = Column(String, index=True)
+    operation_id = Column(String, unique=True, nullable=True)   # set for payments imported from Horizon
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Covers the projection: its reads never touch the table itself
+    __table_args__ = (
+        Index("ix_payment_history_projection", "public_key", "created_at", "amount", "roundoff"),
+    )
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Index
+from datetime import datetime
+from app.database import Base
+
+class ProvisioningRun(Base):
+    __tablename__ = "provisioning_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    label = Column(String, nullable=True)
+    requested = Column(Integer, default=0)          # distinct emails submitted
+    wallets_created = Column(Integer, default=0)
+    accounts_funded = Column(Integer, default=0)
+    transactions = Column(Integer, default=0)
+    starting_balance = Column(String)               # XLM per funded account
+    status = Column(String, default="creating")     # (queued ->) creating -> funding -> completed / failed
+    create_seconds = Column(Float, default=0)
+    fund_seconds = Column(Float, default=0)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+
+class ProvisionedAccount(Base):
+    __tablename__ = "provisioned_accounts"
+
+    wallet_id = Column(Integer, ForeignKey("wallets.id"), primary_key=True)
+    run_id = Column(Integer, ForeignKey("provisioning_runs.id"), index=True)
+    public_key = Column(String)
+    status = Column(String, default="pending")      # pending -> funded
+    funding_tx_hash = Column(String, nullable=True)
+    funded_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_provisioned_accounts_run_status", "run_id", "status"),
+    )
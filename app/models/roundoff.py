@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database import Base
+
+class RoundoffEntry(Base):
+    __tablename__ = "roundoff_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    wallet_id = Column(Integer, ForeignKey("wallets.id"), index=True)
+    public_key = Column(String, index=True)
+    amount = Column(BigInteger)              # stroops
+    payment_hash = Column(String, nullable=True)
+    status = Column(String, default="pending")   # pending -> sweeping -> swept
+    sweep_id = Column(Integer, ForeignKey("roundoff_sweeps.id"), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    sweep = relationship("RoundoffSweep", back_populates="entries")
+
+    __table_args__ = (
+        Index("ix_roundoff_entries_status_public_key", "status", "public_key"),
+    )
+
+
+class RoundoffSweep(Base):
+    __tablename__ = "roundoff_sweeps"
+
+    id = Column(Integer, primary_key=True, index=True)
+    total_amount = Column(BigInteger, default=0)   # stroops
+    user_count = Column(Integer, default=0)
+    tx_hash = Column(String, nullable=True)
+    status = Column(String, default="pending")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+    entries = relationship("RoundoffEntry", back_populates="sweep")
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+class TrackedTransaction(Base):
+    __tablename__ = "tracked_transactions"
+
+    hash = Column(String, primary_key=True)
+    public_key = Column(String)                  # user the transaction is for
+    kind = Column(String)                        # contract function, or "payment"
+    status = Column(String, default="pending")   # pending / success / failed / expired
+    submitted_ledger = Column(Integer, nullable=True)  # latest ledger when it was sent
+    ledger = Column(Integer, nullable=True)      # ledger it was applied in
+    created_at = Column(DateTime, default=datetime.utcnow)
+    confirmed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_tracked_transactions_status", "status"),
+        Index("ix_tracked_transactions_public_key", "public_key", "created_at"),
+    )
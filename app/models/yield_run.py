@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database import Base
+
+class YieldRun(Base):
+    __tablename__ = "yield_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_date = Column(String, unique=True, index=True)
+    total_principal = Column(BigInteger)     # stroops
+    daily_yield = Column(BigInteger)         # stroops
+    status = Column(String, default="pending")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+    allocations = relationship("YieldAllocation", back_populates="run")
+
+
+class YieldAllocation(Base):
+    __tablename__ = "yield_allocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("yield_runs.id"), index=True)
+    chunk_index = Column(Integer, index=True)
+    public_key = Column(String)
+    amount = Column(BigInteger)              # stroops
+    tx_hash = Column(String, nullable=True)
+    status = Column(String, default="pending")
+
+    run = relationship("YieldRun", back_populates="allocations")
@@ -1,26 +1,70 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from app.database import get_db, with_session
 from app.models.user import User
+from app.models.wallet import Wallet
 from app.schemas.user import LoginRequest
-from app.utils.security import verify_password
+from app.utils.security import verify_password_async, PasswordHasherBusy, hasher_stats
 from app.services.auth_service import create_access_token
+from app.utils.dependencies import get_current_user, get_admin_user, invalidate_identity
+from app.utils.signer_cache import evict_signer
 
 router = APIRouter()
 
+def _find_user(db, email: str):
+    """(id, email, hashed_password) of the user, or None"""
+    return db.query(User.id, User.email, User.hashed_password).filter(User.email == email).first()
+
+def _upgrade_hash(db, user_id: int, new_hash: str):
+    db.query(User).filter(User.id == user_id).update({User.hashed_password: new_hash})
+    db.commit()
+
 @router.post("/login")
-def login(data: LoginRequest):
-    db: Session = SessionLocal()
-    user = db.query(User).filter(User.email == data.email).first()
+async def login(data: LoginRequest):
+    # Sessions of their own, so no connection is held while the hash runs
+    user = await asyncio.to_thread(with_session, _find_user, data.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    user_id, email, hashed_password = user
 
-    if not user or not verify_password(data.password, user.hashed_password):
-        db.close()
+    try:
+        valid, new_hash = await verify_password_async(data.password, hashed_password)
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": "1"})
+
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    access_token = create_access_token(data={"sub": user.email})
+    if new_hash:
+        # Stored with an older cost factor: upgrade it now that we know the password
+        await asyncio.to_thread(with_session, _upgrade_hash, user_id, new_hash)
+
+    access_token = create_access_token(data={"sub": email})
 
-    db.close()
     return {
         "access_token": access_token,
         "token_type": "bearer"
     }
+
+@router.post("/logout")
+def logout(current_user: str = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Drop the caller's cached wallet and decrypted signing key (tokens are stateless and stay valid until they expire)"""
+    wallet_id = (
+        db.query(Wallet.id)
+        .join(User, Wallet.user_id == User.id)
+        .filter(User.email == current_user)
+        .scalar()
+    )
+    if wallet_id is not None:
+        evict_signer(wallet_id)
+    invalidate_identity(current_user)
+
+    return {"message": "Logged out"}
+
+@router.get("/debug-hasher")
+def debug_hasher(admin: str = Depends(get_admin_user)):
+    """Password hashing pool: admissions, rejections, queue wait and hash latency"""
+    return hasher_stats()
@@ -1,72 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException
-from requests import request
+from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models.user import User
+from app.database import get_db, with_session
 from app.models.wallet import Wallet
-from app.utils.dependencies import get_current_user
-from app.utils.encryption import decrypt_secret
-from app.services.stellar_service import send_xlm
-from app.config import VAULT_PUBLIC_KEY, VAULT_SECRET_KEY
+from app.utils.dependencies import get_current_user, get_current_wallet, get_admin_user
+from app.utils.signer_cache import get_signer
+from app.utils.metrics import connection_stats
+from app.config import (
+    VAULT_PUBLIC_KEY,
+    MY_BALANCE_MAX_AGE,
+    TOTAL_XLM_MAX_AGE,
+    VAULT_READ_SOURCE,
+    BULK_LOOKUP_MAX_KEYS,
+    YIELD_SIMULATION_MAX_USERS,
+    YIELD_SIMULATION_MAX_DAYS,
+    TX_CONFIRM_TIMEOUT,
+)
 from app.services.stellar_service import create_vault_trustline
-from app.services.stellar_service import mint_usdc_to_vault
-from app.services.stellar_service import soroban_deposit
-from app.services.stellar_service import soroban_withdraw
-from app.services.stellar_service import soroban_get_balance
+from app.services.stellar_service_async import (
+    send_xlm,
+    mint_usdc_to_vault,
+    soroban_deposit,
+    soroban_withdraw,
+    soroban_get_total_vault,
+    OutcomeUnknown,
+)
+from app.services.payout_batcher import vault_payout, get_vault_batcher
+from app.services import balance_cache, event_indexer, idempotency, tx_tracker, fee_strategy, channel_pool
+from app.services.roundoff_ledger import pending_amount, request_sweep, ledger_stats, to_xlm
+from app.services.bulk_lookup import stream_summaries
+from app.models.yield_run import YieldRun
+from yield_engine.yield_logic import ANNUAL_APY
+from yield_engine import simulation
+from sqlalchemy import func
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
+import asyncio
+import json
 
 router = APIRouter()
 
 @router.post("/deposit")
-def deposit_to_vault(amount: float, current_user: str = Depends(get_current_user)):
-    db: Session = SessionLocal()
-
-    user = db.query(User).filter(User.email == current_user).first()
-    wallet = db.query(Wallet).filter(Wallet.user_id == user.id).first()
-
-    if not wallet:
-        db.close()
-        raise HTTPException(status_code=404, detail="Wallet not found")
+async def deposit_to_vault(
+    amount: float,
+    idempotency_key: Optional[str] = Header(None),
+    wallet: Wallet = Depends(get_current_wallet)
+):
+    async def submit():
+        signer = get_signer(wallet)
 
-    decrypted_secret = decrypt_secret(wallet.encrypted_secret)
+        # 1️⃣ Move XLM to vault
+        try:
+            send_result = await idempotency.step(
+                "xlm_transfer",
+                send_xlm,
+                source_secret=signer,
+                destination=VAULT_PUBLIC_KEY,
+                amount=amount
+            )
+        except OutcomeUnknown:
+            raise HTTPException(
+                status_code=504,
+                detail="Transfer sent but not confirmed yet, retry with the same Idempotency-Key"
+            )
 
-    # 1️⃣ Move XLM to vault
-    send_result = send_xlm(
-        source_secret=decrypted_secret,
-        destination=VAULT_PUBLIC_KEY,
-        amount = request.amount
+        # 2️⃣ Update smart contract state
+        contract_result = await idempotency.step("contract_deposit", soroban_deposit, signer, int(amount))
+        await balance_cache.watch_confirmation(contract_result, wallet.public_key)
 
-    )
+        # Confirmation is pushed over /wallet/tx-events
+        return {
+            "xlm_transfer_hash": send_result["hash"],
+            "contract_tx_hash": contract_result["hash"],
+            "contract_status": "pending",
+            "amount": amount,
+            "message": "Deposit submitted"
+        }
 
-    # 2️⃣ Update smart contract state
-    contract_result = soroban_deposit(decrypted_secret, int(amount))
+    return await idempotency.idempotent(wallet.id, idempotency_key, "/vault/deposit", {"amount": amount}, submit)
 
-    db.close()
+@router.get("/my-balance")
+async def my_vault_balance(wallet: Wallet = Depends(get_current_wallet)):
+    if VAULT_READ_SOURCE == "index":
+        summary = await asyncio.to_thread(with_session, event_indexer.get_user_summary, wallet.public_key)
+    else:
+        summary = await balance_cache.get_user_summary(wallet.public_key, max_age=MY_BALANCE_MAX_AGE)
+    pending_roundoff = await asyncio.to_thread(with_session, pending_amount, wallet.public_key)
 
     return {
-        "xlm_transfer_hash": send_result["hash"],
-        "contract_tx_hash": contract_result["hash"],
-        "amount": amount,
-        "message": "Deposit successful"
+        "on_chain_vault_balance": summary["xlm_balance"],
+        "pending_roundoff_xlm": to_xlm(pending_roundoff)
     }
 
-@router.get("/my-balance")
-def my_vault_balance(current_user: str = Depends(get_current_user)):
-    db: Session = SessionLocal()
+class BulkSummaryRequest(BaseModel):
+    public_keys: List[str]
+    include_wallet: bool = False
 
-    user = db.query(User).filter(User.email == current_user).first()
-    wallet = db.query(Wallet).filter(Wallet.user_id == user.id).first()
+@router.post("/summaries")
+async def bulk_summaries(
+    request: BulkSummaryRequest,
+    admin: str = Depends(get_admin_user)
+):
+    """Vault summaries for many wallets (any user's: admins only), streamed as NDJSON in completion order"""
+    if len(request.public_keys) > BULK_LOOKUP_MAX_KEYS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_LOOKUP_MAX_KEYS} public keys per request")
 
-    if not wallet:
-        db.close()
-        raise HTTPException(status_code=404, detail="Wallet not found")
+    async def lines():
+        async for result in stream_summaries(request.public_keys, request.include_wallet):
+            yield json.dumps(result) + "\n"
 
-    balance = soroban_get_balance(wallet.public_key)
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
-    db.close()
+@router.get("/total")
+async def vault_total():
+    if VAULT_READ_SOURCE == "index":
+        total = await asyncio.to_thread(with_session, event_indexer.get_total_xlm)
+    else:
+        total = await balance_cache.get_total_xlm(max_age=TOTAL_XLM_MAX_AGE)
 
     return {
-        "on_chain_vault_balance": balance
+        "total_xlm": total
     }
     
 @router.post("/setup-trustline")
@@ -74,52 +127,183 @@ def setup_trustline():
     return create_vault_trustline()
 
 @router.post("/mint-usdc")
-def mint_usdc(amount: float):
-    return mint_usdc_to_vault(amount)
-
-from app.services.stellar_service import soroban_withdraw
+async def mint_usdc(amount: float):
+    return await mint_usdc_to_vault(amount)
 
 class WithdrawRequest(BaseModel):
     amount: float
 
 @router.post("/withdraw")
-def withdraw_from_vault(
+async def withdraw_from_vault(
     request: WithdrawRequest,
-    current_user: str = Depends(get_current_user)
+    idempotency_key: Optional[str] = Header(None),
+    wallet: Wallet = Depends(get_current_wallet)
 ):
-    db: Session = SessionLocal()
+    async def submit():
+        signer = get_signer(wallet)
 
-    user = db.query(User).filter(User.email == current_user).first()
-    wallet = db.query(Wallet).filter(Wallet.user_id == user.id).first()
+        # 1️⃣ Reduce contract balance
+        contract_result = await idempotency.step("contract_withdraw", soroban_withdraw, signer, int(request.amount))
+        await balance_cache.watch_confirmation(contract_result, wallet.public_key)
 
-    if not wallet:
-        db.close()
-        raise HTTPException(status_code=404, detail="Wallet not found")
+        # Only pay out what the contract actually released
+        status = await tx_tracker.wait(contract_result["hash"], TX_CONFIRM_TIMEOUT)
+        if status == "pending":
+            raise HTTPException(
+                status_code=504,
+                detail="Withdrawal not confirmed yet, retry with the same Idempotency-Key"
+            )
+        if status != "success":
+            raise HTTPException(status_code=400, detail=f"Withdrawal {status} on-chain, nothing was paid out")
 
-    decrypted_secret = decrypt_secret(wallet.encrypted_secret)
+        # 2️⃣ Send XLM from vault to user (batched with other payouts)
+        try:
+            vault_send = await idempotency.step("xlm_payout", vault_payout, wallet.public_key, request.amount)
+        except OutcomeUnknown:
+            raise HTTPException(
+                status_code=504,
+                detail="Payout sent but not confirmed yet, retry with the same Idempotency-Key"
+            )
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Payout failed: {e}, retry with the same Idempotency-Key")
+        if not vault_send.get("successful"):
+            raise HTTPException(status_code=502, detail="Payout failed on-chain, retry with the same Idempotency-Key")
 
-    # 1️⃣ Reduce contract balance
-    contract_result = soroban_withdraw(decrypted_secret, int(request.amount))
+        return {
+            "contract_tx_hash": contract_result["hash"],
+            "contract_status": status,
+            "xlm_transfer_hash": vault_send["hash"],
+            "amount": request.amount,
+            "message": "Withdraw successful"
+        }
 
-    # 2️⃣ Send XLM from vault to user
-    vault_send = send_xlm(
-        source_secret=VAULT_SECRET_KEY,
-        destination=wallet.public_key,
-        amount = request.amount
+    return await idempotency.idempotent(wallet.id, idempotency_key, "/vault/withdraw", request, submit)
 
-    )
-
-    db.close()
 
+@router.get("/apy")
+def current_apy(db: Session = Depends(get_db)):
+    distributed = db.query(func.sum(YieldRun.daily_yield)).filter(YieldRun.status == "done").scalar()
     return {
-        "contract_tx_hash": contract_result["hash"],
-        "xlm_transfer_hash": vault_send["hash"],
-        "amount": request.amount,
-        "message": "Withdraw successful"
+        "apy": float(ANNUAL_APY * 100),
+        "total_distributed": (distributed or 0) / 10_000_000,
     }
 
+class RateStep(BaseModel):
+    from_day: int = 0
+    apy: float
+
+class CohortSpec(BaseModel):
+    name: Optional[str] = None
+    source: str = "synthetic"      # or "vault": the indexed principals of current users
+    users: int = 1000
+    principal: float = 100
+    deposit: float = 0
+    deposit_every: int = 7
+    spread: float = 0
+    seed: int = 0
+    schedule: List[RateStep] = []
+
+class YieldSimulationRequest(BaseModel):
+    days: int = 365
+    compounding: str = "daily"
+    sample_every: int = 30
+    cohorts: List[CohortSpec]
+
+@router.post("/yield-simulation")
+def yield_simulation(
+    request: YieldSimulationRequest,
+    current_user: str = Depends(get_current_user)
+):
+    """Project compounded yield for cohorts of users under APY schedules and deposit streams"""
+    if not 1 <= request.days <= YIELD_SIMULATION_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {YIELD_SIMULATION_MAX_DAYS}")
+    if request.compounding not in simulation.COMPOUNDING:
+        raise HTTPException(status_code=400, detail=f"compounding must be one of {', '.join(simulation.COMPOUNDING)}")
+    if any(c.source not in ("synthetic", "vault") for c in request.cohorts):
+        raise HTTPException(status_code=400, detail="source must be synthetic or vault")
+
+    vault_principals = None
+    if any(c.source == "vault" for c in request.cohorts):
+        # Its own session, closed before the simulation runs
+        vault_principals = with_session(event_indexer.get_usdc_principals)
+
+    users = sum(len(vault_principals) if c.source == "vault" else c.users for c in request.cohorts)
+    if users > YIELD_SIMULATION_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {YIELD_SIMULATION_MAX_USERS} users per simulation")
+
+    try:
+        cohorts = []
+        for c in request.cohorts:
+            if c.source == "vault":
+                principals, deposits = vault_principals, c.deposit * simulation.STROOPS
+            else:
+                principals, deposits = simulation.synthetic_cohort(max(0, c.users), c.principal, c.deposit, c.spread, c.seed)
+            cohorts.append({
+                "name": c.name or c.source,
+                "principals": principals,
+                "deposits": deposits,
+                "deposit_every": max(0, c.deposit_every),
+                "schedule": [(step.from_day, step.apy) for step in c.schedule],
+            })
+        return simulation.simulate(cohorts, request.days, request.compounding, max(1, request.sample_every))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
 
 @router.get("/debug-total")
-def debug_total():
-    from app.services.stellar_service import soroban_get_total_vault
-    return soroban_get_total_vault()
\ No newline at end of file
+async def debug_total():
+    return await soroban_get_total_vault()
+
+
+@router.get("/debug-rpc-pool")
+def debug_rpc_pool(admin: str = Depends(get_admin_user)):
+    """Connection reuse of the Horizon / Soroban RPC session the routes use (also on /metrics)"""
+    return connection_stats()
+
+
+@router.get("/debug-payouts")
+def debug_payouts(admin: str = Depends(get_admin_user)):
+    return get_vault_batcher().stats()
+
+
+@router.get("/debug-cache")
+def debug_cache(admin: str = Depends(get_admin_user)):
+    return balance_cache.cache_stats()
+
+
+@router.post("/sweep-roundoffs")
+def sweep_roundoffs(db: Session = Depends(get_db), admin: str = Depends(get_admin_user)):
+    job = request_sweep(db)
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/debug-idempotency")
+def debug_idempotency(admin: str = Depends(get_admin_user)):
+    return idempotency.idempotency_stats()
+
+
+@router.get("/debug-transactions")
+def debug_transactions(admin: str = Depends(get_admin_user)):
+    return tx_tracker.tracker_stats()
+
+
+@router.get("/debug-fees")
+def debug_fees(admin: str = Depends(get_admin_user)):
+    return fee_strategy.fee_strategy_stats()
+
+
+@router.get("/debug-channels")
+def debug_channels(admin: str = Depends(get_admin_user)):
+    return channel_pool.channel_pool_stats()
+
+
+@router.get("/debug-roundoffs")
+def debug_roundoffs(admin: str = Depends(get_admin_user), db: Session = Depends(get_db)):
+    return ledger_stats(db)
+
+
+@router.get("/debug-indexer")
+def debug_indexer(admin: str = Depends(get_admin_user), db: Session = Depends(get_db)):
+    return event_indexer.indexer_status(db)
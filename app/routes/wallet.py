@@ -1,27 +1,38 @@
 """
 Improved wallet.py with automatic Soroban deposit after roundoff payment
+(round-offs are booked locally and swept in bulk, see app/services/roundoff_ledger.py)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from decimal import Decimal
 from pydantic import BaseModel
-from app.database import SessionLocal
-from app.utils.rounding import calculate_roundoff
-from app.services.stellar_service import server
-
+from app.database import get_db, with_session
+from app.utils.rounding import calculate_roundoff, to_stroops
 
 from app.models.user import User
 from app.models.wallet import Wallet
-from app.utils.dependencies import get_current_user
-from app.utils.encryption import decrypt_secret, encrypt_secret
-from app.services.stellar_service import (
-    generate_stellar_wallet,
+from app.utils.dependencies import get_current_user, get_current_wallet, get_stream_wallet, get_admin_user, invalidate_identity
+from app.utils.encryption import encrypt_secret
+from app.utils.signer_cache import get_signer, signer_stats
+from app.utils.tracing import log
+from app.services.stellar_service import generate_stellar_wallet
+from app.services.auth_service import create_stream_token
+from app.services.stellar_service_async import (
     fund_testnet_account,
     atomic_payment_with_roundoff,
-    soroban_deposit,  # Import for auto-deposit
+    OutcomeUnknown,
 )
-from app.config import VAULT_PUBLIC_KEY
+from app.services import provisioning
+from app.services import idempotency
+from app.services import tx_tracker
+from app.services.savings_projection import record_payment, sync_history, project_savings
+from app.services import account_state
+from app.services.roundoff_ledger import record_roundoff, pending_amount, roundoff_report, to_xlm
+from app.config import VAULT_PUBLIC_KEY, PROVISIONING_MAX_EMAILS, TX_EVENTS_TOKEN_SECONDS
+from typing import List, Optional
 
 router = APIRouter()
 
@@ -29,17 +40,26 @@ class PaymentRequest(BaseModel):
     destination: str
     amount: float
     roundoff_option: str = "none"
+
+class ProvisionRequest(BaseModel):
+    emails: List[str]
+    label: Optional[str] = None
+    fund: bool = True
     
 @router.post("/create")
-def create_wallet(current_user: str = Depends(get_current_user)):
+def create_wallet(current_user: str = Depends(get_current_user), db: Session = Depends(get_db)):
     """Create a new Stellar wallet for the user"""
-    db: Session = SessionLocal()
-    
-    user = db.query(User).filter(User.email == current_user).first()
-    existing = db.query(Wallet).filter(Wallet.user_id == user.id).first()
-    
+    row = (
+        db.query(User, Wallet)
+        .outerjoin(Wallet, Wallet.user_id == User.id)
+        .filter(User.email == current_user)
+        .first()
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    user, existing = row
     if existing:
-        db.close()
         raise HTTPException(status_code=400, detail="Wallet already exists")
     
     # Generate new Stellar keypair
@@ -54,8 +74,7 @@ def create_wallet(current_user: str = Depends(get_current_user)):
     )
     db.add(wallet)
     db.commit()
-    db.refresh(wallet)
-    db.close()
+    invalidate_identity(current_user)
     
     return {
         "public_key": keys["public_key"],
@@ -63,13 +82,13 @@ def create_wallet(current_user: str = Depends(get_current_user)):
     }
 
 @router.post("/fund")
-def fund_wallet(
+async def fund_wallet(
     public_key: str = Query(...),
     current_user: str = Depends(get_current_user)
 ):
     """Fund wallet with testnet XLM from Friendbot"""
     try:
-        result = fund_testnet_account(public_key)
+        result = await fund_testnet_account(public_key)
         return {
             "message": "Wallet funded successfully",
             "friendbot_response": result
@@ -78,117 +97,194 @@ def fund_wallet(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/balance")
-def get_balance(current_user: str = Depends(get_current_user)):
-    """Get user's wallet balance"""
-    db: Session = SessionLocal()
-    
-    user = db.query(User).filter(User.email == current_user).first()
-    wallet = db.query(Wallet).filter(Wallet.user_id == user.id).first()
-    
-    if not wallet:
-        db.close()
-        raise HTTPException(status_code=404, detail="Wallet not found")
-    
-    db.close()
+async def get_balance(wallet: Wallet = Depends(get_current_wallet)):
+    """Get user's wallet balance (served from the streamed account state)"""
+    try:
+        state = await account_state.get_account_state(wallet.public_key)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Could not load account: {e}")
     
     return {
         "public_key": wallet.public_key,
-        "message": "Check balance on Stellar Explorer"
+        "xlm_balance": float(state["native"]),
+        "usdc_balance": float(state["usdc"]),
+        "sequence": str(state["sequence"])
     }
 
+def _book_payment(db, wallet: Wallet, merchant_amount: Decimal, roundoff_amount: Decimal, payment_result: dict):
+    """Local records of a payment Horizon accepted: (tx_tracker update, round-off entry id, pending round-off)"""
+    tx_hash = payment_result["hash"]
+    record_payment(db, wallet, to_stroops(merchant_amount), to_stroops(roundoff_amount), tx_hash)
+    # Final once Horizon accepts it; stored so it shows up in /wallet/tx-events
+    update = tx_tracker.record(db, tx_hash, wallet.public_key, "payment", ledger=payment_result.get("ledger"))
+    roundoff_entry_id = None
+    if roundoff_amount > 0:
+        roundoff_entry_id = record_roundoff(db, wallet, roundoff_amount, tx_hash).id
+    return update, roundoff_entry_id, pending_amount(db, wallet.public_key)
+
 @router.post("/pay")
-def pay(
+async def pay(
     payment: PaymentRequest,
-    current_user: str = Depends(get_current_user)
+    idempotency_key: Optional[str] = Header(None),
+    wallet: Wallet = Depends(get_current_wallet)
 ):
-    db: Session = SessionLocal()
+    async def submit():
+        signer = get_signer(wallet)
 
-    user = db.query(User).filter(User.email == current_user).first()
-    wallet = db.query(Wallet).filter(Wallet.user_id == user.id).first()
+        merchant_amount = Decimal(str(payment.amount))
+        roundoff_amount = Decimal("0")
 
-    if not wallet:
-        db.close()
-        raise HTTPException(status_code=404, detail="Wallet not found")
+        if payment.roundoff_option == "invest":
+            roundoff_amount, _ = calculate_roundoff(merchant_amount)
 
-    decrypted_secret = decrypt_secret(wallet.encrypted_secret)
+        # Reject early from memory instead of letting Horizon fail the transaction
+        try:
+            xlm_balance = (await account_state.get_account_state(wallet.public_key))["native"]
+        except Exception as e:
+            log("account_state_failed", error=str(e))
+            xlm_balance = None
 
-    merchant_amount = Decimal(str(payment.amount))
-    roundoff_amount = Decimal("0")
+        if xlm_balance is not None and xlm_balance < merchant_amount + roundoff_amount:
+            # The streamed state may lag: only turn the payment down on Horizon's word
+            try:
+                xlm_balance = (await account_state.refresh(wallet.public_key))["native"]
+            except Exception as e:
+                log("account_state_failed", error=str(e))
+                xlm_balance = None
+        if xlm_balance is not None and xlm_balance < merchant_amount + roundoff_amount:
+            raise HTTPException(status_code=400, detail="Insufficient XLM balance")
 
-    if payment.roundoff_option == "invest":
-        roundoff, _ = calculate_roundoff(float(payment.amount))
-        roundoff_amount = Decimal(str(roundoff))
+        try:
+            try:
+                payment_result = await idempotency.step(
+                    "payment",
+                    atomic_payment_with_roundoff,
+                    source_secret=signer,
+                    merchant_destination=payment.destination,
+                    merchant_amount=merchant_amount,
+                    vault_destination=VAULT_PUBLIC_KEY,
+                    roundoff_amount=roundoff_amount
+                )
+            except OutcomeUnknown as e:
+                raise HTTPException(
+                    status_code=504,
+                    detail=f"Payment {e.tx_hash} sent but not confirmed yet, retry with the same Idempotency-Key"
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            except Exception as e:
+                # Failed before anything was submitted
+                raise HTTPException(status_code=502, detail=f"Payment not sent: {e}")
 
-    try:
-        payment_result = atomic_payment_with_roundoff(
-            source_secret=decrypted_secret,
-            merchant_destination=payment.destination,
-            merchant_amount=merchant_amount,
-            vault_destination=VAULT_PUBLIC_KEY,
-            roundoff_amount=roundoff_amount
-        )
+            if not payment_result.get("successful"):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Payment failed: {payment_result.get('error', 'Unknown error')}"
+                )
 
-        if not payment_result.get("successful"):
-            db.close()
-            raise HTTPException(
-                status_code=400,
-                detail=f"Payment failed: {payment_result.get('error', 'Unknown error')}"
+            # The round-off is already in the vault account; the contract is
+            # credited by the next sweep
+            update, roundoff_entry_id, pending_roundoff = await asyncio.to_thread(
+                with_session, _book_payment, wallet, merchant_amount, roundoff_amount, payment_result
             )
+            tx_tracker.publish(update)
 
-        soroban_result = None
-        if roundoff_amount > 0:
-            try:
-                # Check user balance before deposit
-                account_json = server.accounts().account_id(wallet.public_key).call()
-                xlm_balance = 0
+            return {
+                "successful": True,
+                "payment_hash": payment_result["hash"],
+                "merchant_amount": float(merchant_amount),
+                "roundoff_amount": float(roundoff_amount),
+                "total_spent": float(merchant_amount + roundoff_amount),
+                "roundoff_entry_id": roundoff_entry_id,
+                "pending_roundoff_xlm": to_xlm(pending_roundoff)
+            }
+
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
 
-                for bal in account_json["balances"]:
-                    if bal["asset_type"] == "native":
-                        xlm_balance = float(bal["balance"])
+    return await idempotency.idempotent(wallet.id, idempotency_key, "/wallet/pay", payment, submit)
+
+@router.get("/my-wallet")
+def my_wallet(wallet: Wallet = Depends(get_current_wallet)):
+    """Get current user's wallet info"""
+    return {
+        "public_key": wallet.public_key,
+        "created_at": wallet.created_at.isoformat() if wallet.created_at else None
+    }
 
-                print("Remaining XLM before deposit:", xlm_balance)
+@router.get("/roundoffs")
+def my_roundoffs(wallet: Wallet = Depends(get_current_wallet), db: Session = Depends(get_db)):
+    """Round-off savings: pending (booked locally), sweeping and swept into the vault"""
+    return roundoff_report(db, wallet.public_key)
 
-                if xlm_balance < 0.5:
-                    raise Exception("Not enough XLM left for Soroban fee")
+@router.get("/roundoff-projection")
+async def roundoff_projection(
+    step_xlm: Optional[float] = Query(None, gt=0, description="round up to this step instead of the tiers"),
+    multiplier: int = Query(1, ge=1, le=10),
+    refresh: bool = Query(False, description="import new payments from Horizon first"),
+    wallet: Wallet = Depends(get_current_wallet)
+):
+    """What the user would have saved over their whole payment history, and that pace over a year"""
+    if refresh:
+        try:
+            await sync_history(wallet)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Could not load payment history: {e}")
 
-                soroban_result = soroban_deposit(
-                    user_secret=decrypted_secret,
-                    amount=roundoff_amount
-                )
+    return await asyncio.to_thread(with_session, project_savings, wallet.public_key, step_xlm, multiplier)
 
-            except Exception as e:
-                print(f"Soroban deposit failed: {e}")
+@router.post("/tx-events/token")
+def transaction_events_token(current_user: str = Depends(get_current_user)):
+    """Token for one /wallet/tx-events connection, so the access token stays out of URLs"""
+    return {"token": create_stream_token(current_user), "expires_in": TX_EVENTS_TOKEN_SECONDS}
 
-        db.close()
+@router.get("/tx-events")
+async def transaction_events(wallet: Wallet = Depends(get_stream_wallet)):
+    """Status of the caller's transactions as server-sent events (stream token in ?token=)"""
+    return StreamingResponse(
+        tx_tracker.stream_events(wallet.public_key),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        return {
-            "successful": True,
-            "payment_hash": payment_result["hash"],
-            "merchant_amount": float(merchant_amount),
-            "roundoff_amount": float(roundoff_amount),
-            "total_spent": float(merchant_amount + roundoff_amount),
-            "soroban_deposit_hash": soroban_result.get("hash") if soroban_result else None
-        }
+@router.post("/provision")
+def provision_wallets(
+    request: ProvisionRequest,
+    admin: str = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk-create users and custodial wallets (admins only) in background jobs, then fund the accounts"""
+    if len(request.emails) > PROVISIONING_MAX_EMAILS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {PROVISIONING_MAX_EMAILS} emails per request, use the provisioning CLI for more"
+        )
 
-    except Exception as e:
-        db.close()
-        raise HTTPException(status_code=500, detail=str(e))
+    try:
+        run_id, job = provisioning.queue_run(db, request.emails, label=request.label or f"api:{admin}", fund=request.fund)
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-@router.get("/my-wallet")
-def my_wallet(current_user: str = Depends(get_current_user)):
-    """Get current user's wallet info"""
-    db: Session = SessionLocal()
-    
-    user = db.query(User).filter(User.email == current_user).first()
-    wallet = db.query(Wallet).filter(Wallet.user_id == user.id).first()
-    
-    if not wallet:
-        db.close()
-        raise HTTPException(status_code=404, detail="Wallet not found")
-    
-    db.close()
-    
     return {
-        "public_key": wallet.public_key,
-        "created_at": wallet.created_at.isoformat() if wallet.created_at else None
-    }
\ No newline at end of file
+        **provisioning.run_report(db, run_id),
+        "job_id": job.id
+    }
+
+@router.get("/provision/{run_id}")
+def provisioning_status(
+    run_id: int,
+    admin: str = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Progress and throughput of a provisioning run (admins only, like creating one)"""
+    report = provisioning.run_report(db, run_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Provisioning run not found")
+    return report
+
+@router.get("/debug-signers")
+def debug_signers(admin: str = Depends(get_admin_user)):
+    """Decrypted keypair cache: size, hit rate, evictions and expirations"""
+    return signer_stats()
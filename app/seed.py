@@ -0,0 +1,40 @@
+"""
+Demo users for local development, created by an explicit command rather
+than at every app start:
+
+    python -m app.seed
+"""
+
+import asyncio
+
+from app.database import SessionLocal
+from app.migrations import check_schema
+from app.models.user import User
+from app.utils.security import hash_password_async, shutdown_executor
+
+DEMO_EMAILS = ("demo1@microyield.com", "demo2@microyield.com")
+DEMO_PASSWORD = "password123"
+
+
+async def create_demo_users():
+    """Create the demo users that don't exist yet; returns their emails"""
+    db = SessionLocal()
+    try:
+        missing = [email for email in DEMO_EMAILS if not db.query(User).filter(User.email == email).first()]
+        # Hashed on the password pool, concurrently, off the event loop
+        hashes = await asyncio.gather(*(hash_password_async(DEMO_PASSWORD) for _ in missing))
+        for email, hashed in zip(missing, hashes):
+            db.add(User(email=email, hashed_password=hashed))
+        db.commit()
+        return missing
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    check_schema()
+    try:
+        created = asyncio.run(create_demo_users())
+    finally:
+        shutdown_executor()
+    print(f"Created {', '.join(created)}" if created else "Demo users already exist")
@@ -0,0 +1,174 @@
+"""
+In-memory native / USDC balances and sequence numbers of the custodial
+wallets, kept current by Horizon's effects stream.
+
+An account is loaded from Horizon the first time it is read. After that
+a single streamed effects connection tells us when anything touches it
+(payments in or out, trustline changes, ...); the entry is marked stale
+and reloaded in the background, so reads are served from memory. Soroban
+calls only change the fee / sequence, which balance_cache reports through
+mark_stale() once they are confirmed.
+
+Each process streams from "now": its cache starts empty, so older effects
+would only mark accounts it has not loaded. The paging token is kept in
+memory to resume from after a reconnect.
+Entries are served for at most ACCOUNT_STATE_MAX_AGE seconds while it is
+connected (it can lag behind the ledger) and ACCOUNT_STATE_FALLBACK_TTL
+while it is not. At most ACCOUNT_STATE_MAX_SIZE accounts are kept, least
+recently read first out.
+"""
+
+import asyncio
+import time
+from decimal import Decimal
+
+from app.config import (
+    ISSUER_PUBLIC_KEY,
+    ACCOUNT_STREAM_RETRY_SECONDS,
+    ACCOUNT_STATE_FALLBACK_TTL,
+    ACCOUNT_STATE_MAX_AGE,
+    ACCOUNT_STATE_MAX_SIZE,
+)
+from app.services.stellar_service_async import get_horizon_server
+from app.utils.cache import TTLCache
+from app.utils.singleflight import SingleFlight
+from app.utils.metrics import upstream_call
+from app.utils.tracing import log
+
+_accounts = TTLCache(max_size=ACCOUNT_STATE_MAX_SIZE, ttl=max(ACCOUNT_STATE_MAX_AGE, ACCOUNT_STATE_FALLBACK_TTL))
+# Accounts touched since they were loaded (reloaded on the next read)
+_stale = set()
+_loads = SingleFlight()
+
+_stream_task = None
+_stream_live = False
+_cursor = None
+_stats = {"effects": 0, "matched": 0, "reconnects": 0, "loads": 0}
+
+
+def _parse_account(account_json):
+    native = Decimal("0")
+    usdc = Decimal("0")
+    for bal in account_json["balances"]:
+        if bal["asset_type"] == "native":
+            native = Decimal(bal["balance"])
+        elif bal.get("asset_code") == "USDC" and bal.get("asset_issuer") == ISSUER_PUBLIC_KEY:
+            usdc = Decimal(bal["balance"])
+
+    return {
+        "native": native,
+        "usdc": usdc,
+        "sequence": int(account_json["sequence"]),
+        "updated_at": time.time(),
+    }
+
+
+async def _load(public_key: str):
+    _stale.discard(public_key)
+    _stats["loads"] += 1
+    with upstream_call("horizon", "load_account"):
+        account_json = await get_horizon_server().accounts().account_id(public_key).call()
+    state = _parse_account(account_json)
+    _accounts.set(public_key, state)
+    return state
+
+
+async def refresh(public_key: str):
+    """Reload public_key from Horizon; concurrent callers share one request"""
+    return await _loads.do(public_key, _load, public_key)
+
+
+async def get_account_state(public_key: str):
+    """{"native", "usdc", "sequence", "updated_at"} for public_key"""
+    if public_key not in _stale:
+        state = _accounts.get(public_key, ACCOUNT_STATE_MAX_AGE if _stream_live else ACCOUNT_STATE_FALLBACK_TTL)
+        if state is not None:
+            return state
+    return await refresh(public_key)
+
+
+async def get_native_balance(public_key: str) -> float:
+    return float((await get_account_state(public_key))["native"])
+
+
+def mark_stale(public_key: str):
+    """Reload public_key on its next read"""
+    if public_key in _accounts:
+        _stale.add(public_key)
+        if len(_stale) > ACCOUNT_STATE_MAX_SIZE:
+            # Evicted before their next read
+            _stale.intersection_update([key for key in _stale if key in _accounts])
+
+
+def forget(public_key: str):
+    _accounts.invalidate(public_key)
+    _stale.discard(public_key)
+
+
+# =========================
+# EFFECTS STREAM
+# =========================
+
+async def _background_refresh(public_key: str):
+    try:
+        await refresh(public_key)
+    except Exception as e:
+        log("account_reload_failed", public_key=public_key, error=str(e))
+
+
+def _on_effect(effect):
+    account = effect.get("account")
+    if account in _accounts:
+        _stats["matched"] += 1
+        mark_stale(account)
+        # Reload in the background so the next read is served from memory
+        asyncio.ensure_future(_background_refresh(account))
+
+
+async def _follow_effects():
+    global _stream_live, _cursor
+
+    _cursor = "now"
+
+    while True:
+        try:
+            stream = get_horizon_server().effects().cursor(_cursor).stream()
+            _stream_live = True
+            async for effect in stream:
+                _stats["effects"] += 1
+                _cursor = effect.get("paging_token", _cursor)
+                _on_effect(effect)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log("account_stream_dropped", cursor=_cursor, error=str(e))
+
+        _stream_live = False
+        _stats["reconnects"] += 1
+        await asyncio.sleep(ACCOUNT_STREAM_RETRY_SECONDS)
+
+
+def start_account_stream():
+    global _stream_task
+    if _stream_task is None:
+        _stream_task = asyncio.create_task(_follow_effects())
+
+
+async def stop_account_stream():
+    global _stream_task, _stream_live
+    if _stream_task is not None:
+        _stream_task.cancel()
+        await asyncio.gather(_stream_task, return_exceptions=True)
+    _stream_task = None
+    _stream_live = False
+
+
+def account_state_stats():
+    return {
+        "stream_live": _stream_live,
+        "cursor": _cursor,
+        "accounts": _accounts.stats(),
+        "stale": len(_stale),
+        "shared_loads": _loads.shared,
+        **_stats,
+    }
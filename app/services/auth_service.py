@@ -1,13 +1,10 @@
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, TX_EVENTS_TOKEN_SECONDS
 
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
-ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# "scope" claim of the stream tokens; access tokens have none
+TX_EVENTS_SCOPE = "tx-events"
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -15,3 +12,8 @@ def create_access_token(data: dict):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+def create_stream_token(email: str):
+    """Short-lived token that only opens /wallet/tx-events (it goes in a URL, so it may end up in logs)"""
+    expire = datetime.utcnow() + timedelta(seconds=TX_EVENTS_TOKEN_SECONDS)
+    return jwt.encode({"sub": email, "scope": TX_EVENTS_SCOPE, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
@@ -0,0 +1,130 @@
+"""
+Read-through cache for on-chain vault balances.
+
+User summaries and total_xlm are served from memory for up to
+BALANCE_CACHE_TTL seconds (each endpoint can ask for a tighter max_age).
+Write paths call watch_confirmation() with the result of their Soroban
+call: the user's entry is dropped right away and again once tx_tracker
+has seen the transaction applied, so the next read sees the new on-chain
+state. A fetch that was in flight when its key was invalidated returns
+its result to the callers already waiting but does not cache it.
+"""
+
+from collections import Counter
+
+from app.config import BALANCE_CACHE_TTL, BALANCE_CACHE_MAX_SIZE
+from app.utils.cache import TTLCache
+from app.utils.singleflight import SingleFlight
+from app.utils.tracing import log
+from app.services import footprint_cache, account_state, tx_tracker
+from app.services.stellar_service_async import (
+    get_soroban_server,
+    fetch_user_summary,
+    fetch_total_xlm,
+)
+
+TOTAL_XLM_KEY = "total_xlm"
+
+summary_cache = TTLCache(max_size=BALANCE_CACHE_MAX_SIZE, ttl=BALANCE_CACHE_TTL)
+total_cache = TTLCache(max_size=1, ttl=BALANCE_CACHE_TTL)
+
+# Concurrent misses for the same key share one simulation
+_in_flight = SingleFlight()
+
+# Cache key -> invalidations seen while a fetch for it was running. Kept
+# only while fetches for the key are in flight (counted in _fetching).
+_generations = {}
+_fetching = Counter()
+
+
+async def _fetch_and_cache(cache: TTLCache, key, fetch, *args):
+    generation = _generations.get(key, 0)
+    _fetching[key] += 1
+    try:
+        value = await fetch(*args)
+        # Invalidated under us: the value may predate the write, don't keep it
+        if _generations.get(key, 0) == generation:
+            cache.set(key, value)
+        return value
+    finally:
+        _fetching[key] -= 1
+        if not _fetching[key]:
+            del _fetching[key]
+            _generations.pop(key, None)
+
+
+def _load(cache: TTLCache, key, fetch, *args):
+    # Readers after an invalidation start a new fetch instead of joining the stale one
+    flight_key = (key, _generations.get(key, 0))
+    return _in_flight.do(flight_key, _fetch_and_cache, cache, key, fetch, *args)
+
+
+def _invalidate(cache: TTLCache, key):
+    cache.invalidate(key)
+    if key in _fetching:
+        _generations[key] = _generations.get(key, 0) + 1
+
+
+async def load_user_summary(public_key: str, max_age: float = None):
+    """get_user_summary that raises on RPC / simulation errors"""
+    summary = summary_cache.get(public_key, max_age)
+    if summary is not None:
+        return summary
+
+    return await _load(summary_cache, public_key, fetch_user_summary, public_key)
+
+
+async def get_user_summary(public_key: str, max_age: float = None):
+    try:
+        return await load_user_summary(public_key, max_age)
+    except Exception as e:
+        # Same fallback as soroban_get_user_summary, but never cached
+        log("user_summary_failed", public_key=public_key, error=str(e))
+        return {"xlm_balance": 0, "usdc_principal": 0, "usdc_yield": 0}
+
+
+async def get_total_xlm(max_age: float = None):
+    total = total_cache.get(TOTAL_XLM_KEY, max_age)
+    if total is not None:
+        return total
+
+    try:
+        return await _load(total_cache, TOTAL_XLM_KEY, fetch_total_xlm)
+    except Exception as e:
+        log("total_xlm_failed", error=str(e))
+        return 0
+
+
+def invalidate_user(public_key: str):
+    _invalidate(summary_cache, public_key)
+    _invalidate(total_cache, TOTAL_XLM_KEY)
+
+
+def _on_final(update: dict):
+    public_key = update["public_key"]
+    if update["status"] == "failed":
+        # May have run out of resources on a cached footprint estimate
+        footprint_cache.invalidate_account(public_key)
+    invalidate_user(public_key)
+    # Fee and sequence changed; Soroban calls don't show up as Horizon effects
+    account_state.mark_stale(public_key)
+
+
+tx_tracker.add_listener(_on_final)
+
+
+async def watch_confirmation(result: dict, public_key: str):
+    """Invalidate public_key now and again when the transaction of a soroban_* result is final"""
+    invalidate_user(public_key)
+    await tx_tracker.track(result["hash"], public_key, result.get("function"), result.get("latest_ledger"))
+
+
+def cache_stats():
+    return {
+        "user_summary": summary_cache.stats(),
+        "total_xlm": total_cache.stats(),
+        "footprint": footprint_cache.footprint_cache.stats(),
+        "in_flight": _in_flight.stats(),
+        "pending_confirmations": tx_tracker.pending_count(),
+        "accounts": account_state.account_state_stats(),
+    }
@@ -0,0 +1,59 @@
+"""
+Vault summaries (and optionally wallet balances) for many public keys.
+
+Lookups fan out with at most BULK_LOOKUP_CONCURRENCY upstream calls per
+request and go through balance_cache / account_state, so cached entries
+cost nothing and identical in-flight lookups are shared across requests.
+Results are yielded in completion order.
+"""
+
+import asyncio
+
+from stellar_sdk import StrKey
+
+from app.config import BULK_LOOKUP_CONCURRENCY, MY_BALANCE_MAX_AGE, VAULT_READ_SOURCE
+from app.database import with_session
+from app.services import balance_cache, account_state, event_indexer
+
+
+async def _lookup(public_key: str, include_wallet: bool, semaphore: asyncio.Semaphore):
+    if not StrKey.is_valid_ed25519_public_key(public_key):
+        return {"public_key": public_key, "error": "Invalid public key"}
+
+    try:
+        async with semaphore:
+            if VAULT_READ_SOURCE == "index":
+                summary = await asyncio.to_thread(with_session, event_indexer.get_user_summary, public_key)
+            else:
+                summary = await balance_cache.load_user_summary(public_key, max_age=MY_BALANCE_MAX_AGE)
+
+            result = {"public_key": public_key, "summary": summary}
+
+            if include_wallet:
+                state = await account_state.get_account_state(public_key)
+                result["wallet"] = {
+                    "xlm_balance": float(state["native"]),
+                    "usdc_balance": float(state["usdc"]),
+                }
+    except Exception as e:
+        return {"public_key": public_key, "error": str(e)}
+
+    return result
+
+
+async def stream_summaries(public_keys: list, include_wallet: bool = False,
+                           concurrency: int = BULK_LOOKUP_CONCURRENCY):
+    """Yield one result per distinct public key as soon as it is ready"""
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [
+        asyncio.ensure_future(_lookup(public_key, include_wallet, semaphore))
+        for public_key in dict.fromkeys(public_keys)
+    ]
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away: stop the lookups nobody will read
+        for task in tasks:
+            task.cancel()
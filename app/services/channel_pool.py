@@ -0,0 +1,439 @@
+"""
+Channel accounts for vault and issuer transactions.
+
+Payout batches and USDC mints used the vault (issuer) as transaction
+source, so they queued up behind one sequence number: the network takes
+one transaction per source account per ledger. A channel account only
+lends its sequence number and pays the fee; the vault stays the source of
+every operation and signs next to the channel (see
+stellar_service_async.submit_transaction), so with N channels N
+transactions can land in the same ledger.
+
+Channels are opt-in (CHANNEL_POOL_SIZE, 0 by default) and created as a
+deploy step, not by the app:
+
+    python -m app.services.channel_pool create 16
+
+generates the keys (kept encrypted in channel_accounts) and creates the
+accounts from the vault. At startup each process leases up to
+CHANNEL_POOL_SIZE funded channels for CHANNEL_LEASE_SECONDS and renews
+them while it runs, so no two processes share a channel and its sequence
+number. Every CHANNEL_HEALTH_INTERVAL seconds a process looks its
+channels up on Horizon: balances below CHANNEL_MIN_BALANCE are topped back
+up to CHANNEL_STARTING_BALANCE, missing accounts stay out of rotation. A
+channel is leased to one transaction at a time; one that could not pay
+for its transaction is taken out of rotation until the next check puts
+it back, and the transaction is sent through another one.
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_DOWN
+
+from sqlalchemy import and_, or_
+from stellar_sdk import Asset, Keypair, Network, TransactionBuilder
+from stellar_sdk.exceptions import BadRequestError, NotFoundError
+
+from app.config import (
+    VAULT_SECRET_KEY,
+    CHANNEL_POOL_SIZE,
+    CHANNEL_STARTING_BALANCE,
+    CHANNEL_MIN_BALANCE,
+    CHANNEL_HEALTH_INTERVAL,
+    CHANNEL_LEASE_SECONDS,
+)
+from app.database import SessionLocal
+from app.models.channel_account import ChannelAccount
+from app.services.stellar_service_async import get_horizon_server, set_channel_pool, submit_transaction
+from app.utils.encryption import encrypt_secret, decrypt_secret
+from app.utils.signer_cache import system_keypair
+from app.utils.tracing import log
+
+# Channels are created / topped up with one operation each in a single transaction
+MAX_CHANNELS = 100
+# Transaction results meaning the channel itself is unusable
+CHANNEL_FAULTS = {"tx_insufficient_balance", "tx_no_source_account"}
+
+# Holder of this process's channel leases
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_pool = None
+_task = None
+
+
+def _transaction_code(error):
+    if not isinstance(error, BadRequestError) or not error.extras:
+        return None
+    return error.extras.get("result_codes", {}).get("transaction")
+
+
+class ChannelPool:
+    def __init__(self):
+        self._keypairs = {}
+        self._healthy = set()
+        self._leased = set()
+        self._queued = set()
+        self._idle = asyncio.Queue()
+        self.leases = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.checks = 0
+        self.funded = 0
+        self.taken_out = 0
+        self.faults = 0
+
+    def add(self, keypair: Keypair):
+        self._keypairs[keypair.public_key] = keypair
+
+    def remove(self, public_key: str):
+        """Drop a channel whose lease went to another process"""
+        self._keypairs.pop(public_key, None)
+        self._healthy.discard(public_key)
+
+    def public_keys(self):
+        return list(self._keypairs)
+
+    def available(self) -> bool:
+        return bool(self._healthy)
+
+    def is_fault(self, error) -> bool:
+        """Whether error came from the channel itself, i.e. another channel can send the transaction"""
+        return _transaction_code(error) in CHANNEL_FAULTS
+
+    def mark_healthy(self, public_key: str):
+        if public_key in self._keypairs:
+            self._healthy.add(public_key)
+            self._release(public_key)
+
+    def mark_unhealthy(self, public_key: str, reason: str):
+        if public_key in self._healthy:
+            self._healthy.discard(public_key)
+            self.taken_out += 1
+            log("channel_out_of_rotation", channel=public_key, reason=reason)
+
+    def _release(self, public_key: str):
+        if public_key in self._healthy and public_key not in self._leased and public_key not in self._queued:
+            self._queued.add(public_key)
+            self._idle.put_nowait(public_key)
+
+    @asynccontextmanager
+    async def lease(self):
+        """
+        Keypair of a healthy channel nobody else is using; waits for one
+        to be released if they are all in use.
+        """
+        self.leases += 1
+        if self._idle.empty():
+            self.waits += 1
+        start = time.perf_counter()
+        while True:
+            public_key = await self._idle.get()
+            self._queued.discard(public_key)
+            # Entries of channels taken out of rotation while idle are stale
+            if public_key in self._healthy:
+                break
+        self.wait_seconds += time.perf_counter() - start
+
+        self._leased.add(public_key)
+        try:
+            yield self._keypairs[public_key]
+        except Exception as e:
+            if self.is_fault(e):
+                self.faults += 1
+                self.mark_unhealthy(public_key, _transaction_code(e))
+            raise
+        finally:
+            self._leased.discard(public_key)
+            self._release(public_key)
+
+    def stats(self):
+        return {
+            "owner": OWNER,
+            "size": len(self._keypairs),
+            "healthy": len(self._healthy),
+            "leased": len(self._leased),
+            "leases": self.leases,
+            "waits": self.waits,
+            "avg_wait_ms": round(self.wait_seconds / self.leases * 1000, 2) if self.leases else 0.0,
+            "checks": self.checks,
+            "funded": self.funded,
+            "taken_out": self.taken_out,
+            "faults": self.faults,
+        }
+
+
+# =========================
+# LEASES
+# =========================
+
+def _lease_channels(size: int) -> dict:
+    """
+    Renew this process's channel leases and take free / expired ones up to
+    size; returns {public_key: Keypair} of the channels it holds
+    """
+    now = datetime.utcnow()
+    until = now + timedelta(seconds=CHANNEL_LEASE_SECONDS)
+    free = or_(ChannelAccount.leased_by.is_(None), ChannelAccount.leased_until < now)
+    db = SessionLocal()
+    try:
+        db.query(ChannelAccount).filter(ChannelAccount.leased_by == OWNER).update(
+            {ChannelAccount.leased_until: until}, synchronize_session=False
+        )
+        held = db.query(ChannelAccount.public_key).filter(ChannelAccount.leased_by == OWNER).count()
+
+        if held < size:
+            candidates = (
+                db.query(ChannelAccount.public_key)
+                .filter(ChannelAccount.funded_at.isnot(None), free)
+                .order_by(ChannelAccount.created_at)
+                .limit(size - held)
+                .all()
+            )
+            for (public_key,) in candidates:
+                # Only one process wins each row
+                db.query(ChannelAccount).filter(and_(ChannelAccount.public_key == public_key, free)).update(
+                    {ChannelAccount.leased_by: OWNER, ChannelAccount.leased_until: until},
+                    synchronize_session=False,
+                )
+        db.commit()
+
+        rows = db.query(ChannelAccount).filter(ChannelAccount.leased_by == OWNER).order_by(ChannelAccount.created_at)
+        return {row.public_key: Keypair.from_secret(decrypt_secret(row.encrypted_secret)) for row in rows.limit(size)}
+    finally:
+        db.close()
+
+
+def _release_channels():
+    db = SessionLocal()
+    try:
+        db.query(ChannelAccount).filter(ChannelAccount.leased_by == OWNER).update(
+            {ChannelAccount.leased_by: None, ChannelAccount.leased_until: None}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def renew_leases(pool: ChannelPool, size: int) -> list:
+    """Sync pool with the channels this process holds; returns the newly leased public keys"""
+    keypairs = await asyncio.to_thread(_lease_channels, size)
+    for public_key in pool.public_keys():
+        if public_key not in keypairs:
+            log("channel_lease_lost", channel=public_key)
+            pool.remove(public_key)
+    added = [public_key for public_key in keypairs if public_key not in pool.public_keys()]
+    for public_key in added:
+        pool.add(keypairs[public_key])
+    return added
+
+
+# =========================
+# FUNDING / HEALTH
+# =========================
+
+def _mark_funded(public_keys):
+    db = SessionLocal()
+    try:
+        db.query(ChannelAccount).filter(ChannelAccount.public_key.in_(public_keys)).update(
+            {ChannelAccount.funded_at: datetime.utcnow()}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _native_balance(public_key: str):
+    """Native balance on Horizon, None if the account does not exist"""
+    try:
+        account = await get_horizon_server().accounts().account_id(public_key).call()
+    except NotFoundError:
+        return None
+    return next(Decimal(b["balance"]) for b in account["balances"] if b["asset_type"] == "native")
+
+
+def _build_funding_tx(source_account, base_fee: int, create, top_up):
+    builder = TransactionBuilder(
+        source_account=source_account,
+        network_passphrase=Network.TESTNET_NETWORK_PASSPHRASE,
+        base_fee=base_fee,
+    )
+    for public_key in create:
+        builder.append_create_account_op(destination=public_key, starting_balance=CHANNEL_STARTING_BALANCE)
+    for public_key, amount in top_up:
+        builder.append_payment_op(destination=public_key, amount=str(amount), asset=Asset.native())
+    return builder.set_timeout(30).build()
+
+
+async def _fund(create, top_up):
+    """Create / top up channels in one transaction from the vault, then record them as funded"""
+    await submit_transaction(
+        system_keypair(VAULT_SECRET_KEY),
+        lambda account, fee: _build_funding_tx(account, fee, create, top_up),
+        priority="background",
+    )
+    funded = list(create) + [public_key for public_key, _ in top_up]
+    await asyncio.to_thread(_mark_funded, funded)
+    return funded
+
+
+async def check_channels(pool: ChannelPool, public_keys=None):
+    """Top up this process's low channels and put the healthy ones in rotation"""
+    public_keys = pool.public_keys() if public_keys is None else public_keys
+    balances = await asyncio.gather(*(_native_balance(pk) for pk in public_keys), return_exceptions=True)
+
+    top_up = []
+    for public_key, balance in zip(public_keys, balances):
+        if isinstance(balance, Exception):
+            # Horizon trouble says nothing about the channel, leave it as it is
+            log("channel_check_failed", channel=public_key, error=str(balance))
+        elif balance is None:
+            # Channels are only created by the CLI
+            pool.mark_unhealthy(public_key, "account missing")
+        elif balance < Decimal(str(CHANNEL_MIN_BALANCE)):
+            pool.mark_unhealthy(public_key, f"balance {balance}")
+            amount = (Decimal(CHANNEL_STARTING_BALANCE) - balance).quantize(Decimal("0.0000001"), rounding=ROUND_DOWN)
+            top_up.append((public_key, amount))
+        else:
+            pool.mark_healthy(public_key)
+
+    if top_up:
+        # This process holds the lease, so no other one tops these up as well
+        funded = await _fund([], top_up)
+        pool.funded += len(funded)
+        for public_key in funded:
+            pool.mark_healthy(public_key)
+
+    pool.checks += 1
+
+
+async def open_channels(size: int = CHANNEL_POOL_SIZE) -> ChannelPool:
+    """Lease up to size funded channels and register the pool; check_channels puts them in rotation"""
+    pool = ChannelPool()
+    await renew_leases(pool, min(size, MAX_CHANNELS))
+    set_channel_pool(pool)
+    return pool
+
+
+async def _run_channel_pool(size: int):
+    global _pool
+    size = min(size, MAX_CHANNELS)
+    _pool = await open_channels(size)
+    if not _pool.public_keys():
+        log("channel_pool_empty", size=size, hint="python -m app.services.channel_pool create N")
+
+    last_check = None
+    while True:
+        try:
+            added = await renew_leases(_pool, size)
+            if last_check is None or time.monotonic() - last_check >= CHANNEL_HEALTH_INTERVAL:
+                await check_channels(_pool)
+                last_check = time.monotonic()
+            elif added:
+                await check_channels(_pool, added)
+        except Exception as e:
+            log("channel_health_check_failed", error=str(e))
+        await asyncio.sleep(CHANNEL_LEASE_SECONDS / 3)
+
+
+def start_channel_pool(size: int = CHANNEL_POOL_SIZE):
+    global _task
+    if size > 0 and _task is None:
+        _task = asyncio.create_task(_run_channel_pool(size))
+
+
+async def stop_channel_pool():
+    global _task, _pool
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+    set_channel_pool(None)
+    if _pool is not None:
+        await asyncio.to_thread(_release_channels)
+    _task = None
+    _pool = None
+
+
+def channel_pool_stats():
+    return _pool.stats() if _pool is not None else {"size": 0}
+
+
+# =========================
+# CREATION (CLI)
+# =========================
+
+def _new_channels(count: int) -> list:
+    """Public keys of the channels still to be created: `count` new ones plus any never funded"""
+    db = SessionLocal()
+    try:
+        for _ in range(count):
+            keypair = Keypair.random()
+            db.add(ChannelAccount(public_key=keypair.public_key, encrypted_secret=encrypt_secret(keypair.secret)))
+        db.commit()
+        return [row.public_key for row in db.query(ChannelAccount.public_key).filter(ChannelAccount.funded_at.is_(None))]
+    finally:
+        db.close()
+
+
+def _channel_report() -> dict:
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        total = db.query(ChannelAccount).count()
+        funded = db.query(ChannelAccount).filter(ChannelAccount.funded_at.isnot(None)).count()
+        leased = db.query(ChannelAccount).filter(ChannelAccount.leased_until >= now).count()
+        return {"channels": total, "funded": funded, "leased": leased}
+    finally:
+        db.close()
+
+
+async def create_channels(count: int) -> list:
+    """
+    Generate count channels and create their accounts from the vault; also
+    finishes channels an interrupted run stored but did not create.
+    Returns the public keys funded.
+    """
+    pending = await asyncio.to_thread(_new_channels, count)
+    funded = []
+    for i in range(0, len(pending), MAX_CHANNELS):
+        chunk = pending[i:i + MAX_CHANNELS]
+        # Created by a transaction whose response was lost
+        balances = await asyncio.gather(*(_native_balance(pk) for pk in chunk))
+        exists = [pk for pk, balance in zip(chunk, balances) if balance is not None]
+        if exists:
+            await asyncio.to_thread(_mark_funded, exists)
+        create = [pk for pk, balance in zip(chunk, balances) if balance is None]
+        if create:
+            await _fund(create, [])
+        funded += chunk
+    return funded
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from app.migrations import upgrade
+    from app.services.stellar_service_async import close_clients
+
+    parser = argparse.ArgumentParser(prog="python -m app.services.channel_pool")
+    commands = parser.add_subparsers(dest="command", required=True)
+    create = commands.add_parser("create", help="create channel accounts from the vault")
+    create.add_argument("count", type=int, help="new channels (0 only finishes an interrupted run)")
+    commands.add_parser("status", help="count stored, funded and leased channels")
+    args = parser.parse_args()
+
+    upgrade()
+    if args.command == "create":
+        async def run():
+            try:
+                return await create_channels(args.count)
+            finally:
+                await close_clients()
+
+        print(f"{len(asyncio.run(run()))} channels created")
+    print(json.dumps(_channel_report(), indent=2))
@@ -0,0 +1,323 @@
+"""
+Incremental indexer for the vault contract's events.
+
+Pulls deposit / invest / yield / withdraw events from Soroban RPC
+getEvents, stores each one in contract_events and folds it into the
+user's row in vault_positions, committing the RPC cursor in the same
+transaction. Positions and vault totals can then be read with a local
+query instead of a simulate_transaction round trip.
+
+rewind(db, ledger) undoes everything indexed from that ledger on, so the
+next sync replays it; apply_events() takes the same EventInfo objects
+RPC returns, so recorded getEvents responses can be replayed offline:
+
+    python -m app.services.event_indexer --fixture benchmarks/fixtures/contract_events.json
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from stellar_sdk import scval, xdr as stellar_xdr
+from stellar_sdk.soroban_rpc import EventFilter, EventFilterType, GetEventsResponse
+
+from app.config import (
+    SOROBAN_CONTRACT_ID,
+    INDEXER_START_LEDGER,
+    INDEXER_POLL_INTERVAL,
+    INDEXER_PAGE_SIZE,
+    INDEXER_LEASE_SECONDS,
+    VAULT_READ_SOURCE,
+)
+from app.database import SessionLocal
+from app.models.contract_event import ContractEvent, VaultPosition, IndexerCursor
+from app.services.channel_pool import OWNER
+from app.services.stellar_service import get_soroban_server
+from app.utils.tracing import log
+
+CURSOR_NAME = "vault_contract"
+
+# Change to each position column per event topic, as applied by the contract
+EFFECTS = {
+    "deposit": {"xlm_balance": 1},
+    "withdraw": {"xlm_balance": -1},
+    "invest": {"xlm_balance": -1, "usdc_principal": 1},
+    "yield": {"usdc_yield": 1},
+}
+
+
+def decode_event(event):
+    """(topic, public_key, stroops) for a vault event, None for anything else"""
+    if len(event.topic) < 2:
+        return None
+
+    topic = stellar_xdr.SCVal.from_xdr(event.topic[0])
+    if topic.type != stellar_xdr.SCValType.SCV_SYMBOL:
+        return None
+
+    name = scval.from_symbol(topic)
+    if name not in EFFECTS:
+        return None
+
+    user = scval.from_address(stellar_xdr.SCVal.from_xdr(event.topic[1])).address
+    amount = scval.from_int128(stellar_xdr.SCVal.from_xdr(event.value))
+    return name, user, amount
+
+
+def _apply(db, topic: str, public_key: str, amount: int, ledger: int, sign: int = 1):
+    position = db.get(VaultPosition, public_key)
+    if position is None:
+        position = VaultPosition(public_key=public_key, xlm_balance=0, usdc_principal=0, usdc_yield=0)
+        db.add(position)
+        db.flush()
+
+    for column, direction in EFFECTS[topic].items():
+        setattr(position, column, getattr(position, column) + sign * direction * amount)
+    position.updated_ledger = ledger
+
+
+def apply_events(db, events) -> int:
+    """Fold events into vault_positions (not committed). Already indexed ids are skipped."""
+    applied = 0
+    for event in events:
+        decoded = decode_event(event)
+        if decoded is None or db.get(ContractEvent, event.id) is not None:
+            continue
+
+        topic, public_key, amount = decoded
+        db.add(ContractEvent(
+            id=event.id,
+            ledger=event.ledger,
+            tx_hash=event.transaction_hash,
+            topic=topic,
+            public_key=public_key,
+            amount=amount,
+        ))
+        _apply(db, topic, public_key, amount, event.ledger)
+        applied += 1
+
+    db.flush()
+    return applied
+
+
+def _get_cursor(db) -> IndexerCursor:
+    row = db.get(IndexerCursor, CURSOR_NAME)
+    if row is None:
+        row = IndexerCursor(name=CURSOR_NAME, start_ledger=INDEXER_START_LEDGER or None)
+        db.add(row)
+        db.flush()
+    return row
+
+
+def rewind(db, from_ledger: int) -> int:
+    """Undo every indexed event at or after from_ledger; the next sync replays from there"""
+    events = (
+        db.query(ContractEvent)
+        .filter(ContractEvent.ledger >= from_ledger)
+        .order_by(ContractEvent.ledger.desc())
+        .all()
+    )
+    for event in events:
+        _apply(db, event.topic, event.public_key, event.amount, event.ledger, sign=-1)
+        db.delete(event)
+
+    row = _get_cursor(db)
+    row.cursor = None
+    row.start_ledger = from_ledger
+    db.commit()
+    return len(events)
+
+
+def index_once(db, soroban_server=None, limit: int = INDEXER_PAGE_SIZE) -> dict:
+    """Fetch and apply one getEvents page, then commit it together with the new cursor"""
+    soroban_server = soroban_server or get_soroban_server()
+    row = _get_cursor(db)
+
+    filters = [EventFilter(event_type=EventFilterType.CONTRACT, contract_ids=[SOROBAN_CONTRACT_ID])]
+    if row.cursor:
+        response = soroban_server.get_events(filters=filters, cursor=row.cursor, limit=limit)
+    else:
+        start_ledger = row.start_ledger or soroban_server.get_health().oldest_ledger
+        response = soroban_server.get_events(start_ledger=start_ledger, filters=filters, limit=limit)
+
+    applied = apply_events(db, response.events)
+
+    row.cursor = response.cursor or (response.events[-1].id if response.events else row.cursor)
+    row.latest_ledger = response.latest_ledger
+    db.commit()
+
+    return {"events": len(response.events), "applied": applied, "latest_ledger": response.latest_ledger}
+
+
+def sync(soroban_server=None, limit: int = INDEXER_PAGE_SIZE) -> dict:
+    """Index pages until RPC returns a short one"""
+    db = SessionLocal()
+    try:
+        total = {"events": 0, "applied": 0, "latest_ledger": None}
+        while True:
+            page = index_once(db, soroban_server, limit)
+            total["events"] += page["events"]
+            total["applied"] += page["applied"]
+            total["latest_ledger"] = page["latest_ledger"]
+            if page["events"] < limit:
+                return total
+    finally:
+        db.close()
+
+
+# =========================
+# READS
+# =========================
+
+def get_user_summary(db, public_key: str):
+    """Same shape as stellar_service.parse_user_summary, from the local index"""
+    position = db.get(VaultPosition, public_key)
+    if position is None:
+        return {"xlm_balance": 0, "usdc_principal": 0, "usdc_yield": 0}
+
+    return {
+        "xlm_balance": position.xlm_balance / 10_000_000,
+        "usdc_principal": position.usdc_principal / 10_000_000,
+        "usdc_yield": position.usdc_yield / 10_000_000,
+    }
+
+
+def get_total_xlm(db):
+    total = db.query(func.sum(VaultPosition.xlm_balance)).scalar()
+    return (total or 0) / 10_000_000
+
+
+def get_usdc_principals(db):
+    """Indexed USDC principal of every position holding some, in stroops"""
+    return [
+        principal for (principal,) in
+        db.query(VaultPosition.usdc_principal).filter(VaultPosition.usdc_principal > 0)
+    ]
+
+
+def indexer_status(db):
+    row = db.get(IndexerCursor, CURSOR_NAME)
+    return {
+        "cursor": row.cursor if row else None,
+        "start_ledger": row.start_ledger if row else INDEXER_START_LEDGER,
+        "latest_ledger": row.latest_ledger if row else None,
+        "leased_by": row.leased_by if row else None,
+        "indexed_ledger": db.query(func.max(ContractEvent.ledger)).scalar(),
+        "events": db.query(func.count(ContractEvent.id)).scalar(),
+        "positions": db.query(func.count(VaultPosition.public_key)).scalar(),
+        "total_xlm": get_total_xlm(db),
+        "total_usdc_principal": (db.query(func.sum(VaultPosition.usdc_principal)).scalar() or 0) / 10_000_000,
+    }
+
+
+def load_fixture(path: str):
+    """EventInfo list from a recorded getEvents result (JSON-RPC "result" object)"""
+    with open(path) as f:
+        data = json.load(f)
+    return GetEventsResponse.model_validate(data.get("result", data)).events
+
+
+# =========================
+# BACKGROUND SYNC
+# =========================
+
+_indexer = None
+
+
+def _hold_lease() -> bool:
+    """Take or renew the indexer lease; only the process holding it syncs"""
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        _get_cursor(db)
+        db.commit()
+
+        # Only one process wins the update
+        held = (
+            db.query(IndexerCursor)
+            .filter(
+                IndexerCursor.name == CURSOR_NAME,
+                or_(
+                    IndexerCursor.leased_by.is_(None),
+                    IndexerCursor.leased_by == OWNER,
+                    IndexerCursor.leased_until < now,
+                ),
+            )
+            .update(
+                {"leased_by": OWNER, "leased_until": now + timedelta(seconds=INDEXER_LEASE_SECONDS)},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(held)
+    except IntegrityError:
+        # Another process created the cursor row first
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+def _release_lease():
+    db = SessionLocal()
+    try:
+        db.query(IndexerCursor).filter(IndexerCursor.leased_by == OWNER).update(
+            {"leased_by": None, "leased_until": None}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _run_indexer(interval: float):
+    while True:
+        try:
+            if await asyncio.to_thread(_hold_lease):
+                await asyncio.to_thread(sync)
+        except Exception as e:
+            log("event_indexer_sync_failed", error=str(e))
+        await asyncio.sleep(interval)
+
+
+def start_indexer(interval: float = INDEXER_POLL_INTERVAL):
+    """Only needed when reads are served from the index"""
+    global _indexer
+    if _indexer is None and interval > 0 and VAULT_READ_SOURCE == "index":
+        _indexer = asyncio.create_task(_run_indexer(interval))
+
+
+async def stop_indexer():
+    global _indexer
+    if _indexer is not None:
+        _indexer.cancel()
+        await asyncio.gather(_indexer, return_exceptions=True)
+        await asyncio.to_thread(_release_lease)
+    _indexer = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.migrations import upgrade
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixture", help="apply a recorded getEvents result instead of calling RPC")
+    parser.add_argument("--replay-from", type=int, help="rewind to this ledger before syncing")
+    args = parser.parse_args()
+
+    upgrade()
+    db = SessionLocal()
+
+    if args.replay_from is not None:
+        print(f"Rewound {rewind(db, args.replay_from)} events")
+
+    if args.fixture:
+        print(f"Applied {apply_events(db, load_fixture(args.fixture))} events")
+        db.commit()
+    else:
+        print(sync())
+
+    print(indexer_status(db))
+    db.close()
@@ -0,0 +1,126 @@
+"""
+Per-transaction fees from Horizon fee_stats.
+
+Builders used to bid base_fee=100, which leaves transactions waiting as
+soon as the network surges. The latest fee_stats are kept here (fetched
+by stellar_service / stellar_service_async, refreshed every
+FEE_STATS_TTL seconds) and pick_fee() bids the percentile of recently
+charged fees that fits the transaction: "user" for payments and payouts
+someone is waiting on, "background" for batches that can wait a ledger
+or two.
+
+A submission that has not landed after FEE_BUMP_AFTER seconds is not
+rebuilt: build_fee_bump() wraps the same signed transaction in a
+fee-bump paid by the sponsor account. Both share one sequence number, so
+at most one of them can apply. stellar-core only replaces a queued
+transaction with a fee-bump bidding at least 10x its fee.
+"""
+
+import time
+
+from stellar_sdk import Network, TransactionBuilder
+
+from app.config import FEE_STATS_TTL, FEE_PERCENTILE, FEE_BACKGROUND_PERCENTILE, FEE_MAX, FEE_BUMP_MAX
+from app.utils.tracing import log
+
+# Network minimum, stroops per operation
+BASE_FEE = 100
+PERCENTILES = (10, 20, 30, 40, 50, 60, 70, 80, 90, 95, 99)
+PRIORITIES = {"user": FEE_PERCENTILE, "background": FEE_BACKGROUND_PERCENTILE}
+REPLACE_BY_FEE_MULTIPLIER = 10
+
+_latest = None
+_fetched_at = 0.0
+_failed_at = 0.0
+_stats = {"fetches": 0, "fetch_errors": 0, "bumps": 0, "bumps_landed": 0}
+
+
+# =========================
+# FEE STATS
+# =========================
+
+def parse_fee_stats(fee_stats: dict) -> dict:
+    """The parts of a Horizon /fee_stats response used here, as ints"""
+    charged = fee_stats["fee_charged"]
+    return {
+        "last_ledger": int(fee_stats["last_ledger"]),
+        "base_fee": int(fee_stats["last_ledger_base_fee"]),
+        "capacity_usage": float(fee_stats["ledger_capacity_usage"]),
+        "fee_charged": {p: int(charged[f"p{p}"]) for p in PERCENTILES},
+    }
+
+
+def store_fee_stats(fee_stats: dict) -> dict:
+    global _latest, _fetched_at
+    _latest = parse_fee_stats(fee_stats)
+    _fetched_at = time.monotonic()
+    _stats["fetches"] += 1
+    return _latest
+
+
+def fetch_failed(error):
+    """Keep the last stats; the next fetch is tried FEE_STATS_TTL later"""
+    global _failed_at
+    _failed_at = time.monotonic()
+    _stats["fetch_errors"] += 1
+    log("fee_stats_failed", error=str(error))
+
+
+def needs_refresh() -> bool:
+    return time.monotonic() - max(_fetched_at, _failed_at) > FEE_STATS_TTL
+
+
+def latest():
+    """Last parsed fee_stats, None if none could be loaded yet"""
+    return _latest
+
+
+# =========================
+# FEES
+# =========================
+
+def percentile_fee(stats: dict, percentile: int) -> int:
+    p = next((p for p in PERCENTILES if p >= percentile), PERCENTILES[-1])
+    return max(stats["fee_charged"][p], stats["base_fee"])
+
+
+def pick_fee(stats, priority: str = "user") -> int:
+    """Base fee (stroops per operation) for a transaction of this priority"""
+    if stats is None:
+        return BASE_FEE
+    return min(percentile_fee(stats, PRIORITIES[priority]), max(FEE_MAX, stats["base_fee"]))
+
+
+def fee_bump_fee(inner_envelope, stats) -> int:
+    """Per-operation bid of a fee-bump around inner_envelope: enough to replace it in the queue"""
+    tx = inner_envelope.transaction
+    inner_fee = tx.fee // max(len(tx.operations), 1)
+    top = percentile_fee(stats, PERCENTILES[-1]) if stats is not None else BASE_FEE
+    return min(max(inner_fee * REPLACE_BY_FEE_MULTIPLIER, top), FEE_BUMP_MAX)
+
+
+def build_fee_bump(inner_envelope, sponsor_keypair, stats,
+                   network_passphrase: str = Network.TESTNET_NETWORK_PASSPHRASE):
+    """Signed fee-bump paying for the (already signed) inner_envelope"""
+    envelope = TransactionBuilder.build_fee_bump_transaction(
+        fee_source=sponsor_keypair,
+        base_fee=fee_bump_fee(inner_envelope, stats),
+        inner_transaction_envelope=inner_envelope,
+        network_passphrase=network_passphrase,
+    )
+    envelope.sign(sponsor_keypair)
+    _stats["bumps"] += 1
+    return envelope
+
+
+def bump_landed():
+    _stats["bumps_landed"] += 1
+
+
+def fee_strategy_stats():
+    return {
+        **_stats,
+        "fee_stats": _latest,
+        "age_seconds": round(time.monotonic() - _fetched_at, 1) if _latest is not None else None,
+        "fees": {priority: pick_fee(_latest, priority) for priority in PRIORITIES},
+    }
@@ -0,0 +1,54 @@
+"""
+Cache of Soroban simulation results (footprint, resources, resource fee,
+auth) for user contract calls.
+
+Entries are keyed by function, user and amount: prepare_transaction
+copies the simulation's auth entries into the transaction, and those
+carry the invocation arguments, amount included, so a simulation can
+only be reused for the exact same call. A repeat of that call (a user
+depositing the same amount again) is assembled from the cached
+simulation without another simulateTransaction round trip. Cached
+estimates are padded by FOOTPRINT_FEE_MARGIN; if the network still
+rejects the transaction the entry is dropped and the caller falls back
+to a full simulation, and a transaction that fails on-chain drops the
+user's entries (balance_cache).
+"""
+
+from stellar_sdk import xdr as stellar_xdr
+
+from app.config import FOOTPRINT_CACHE_TTL, FOOTPRINT_CACHE_MAX_SIZE, FOOTPRINT_FEE_MARGIN
+from app.utils.cache import TTLCache
+
+footprint_cache = TTLCache(max_size=FOOTPRINT_CACHE_MAX_SIZE, ttl=FOOTPRINT_CACHE_TTL)
+
+
+def pad_simulation(simulation, margin: float = FOOTPRINT_FEE_MARGIN):
+    """Copy of a simulation response with instructions and fees padded by margin"""
+    soroban_data = stellar_xdr.SorobanTransactionData.from_xdr(simulation.transaction_data)
+
+    instructions = soroban_data.resources.instructions.uint32
+    soroban_data.resources.instructions.uint32 = int(instructions * (1 + margin))
+
+    resource_fee = int(soroban_data.resource_fee.int64 * (1 + margin))
+    soroban_data.resource_fee.int64 = resource_fee
+
+    return simulation.model_copy(update={
+        "transaction_data": soroban_data.to_xdr(),
+        "min_resource_fee": max(resource_fee, int(simulation.min_resource_fee * (1 + margin))),
+    })
+
+
+def get_simulation(function_name: str, public_key: str, amount: int):
+    return footprint_cache.get((function_name, public_key, amount))
+
+
+def store_simulation(function_name: str, public_key: str, amount: int, simulation):
+    footprint_cache.set((function_name, public_key, amount), pad_simulation(simulation))
+
+
+def invalidate(function_name: str, public_key: str, amount: int):
+    footprint_cache.invalidate((function_name, public_key, amount))
+
+
+def invalidate_account(public_key: str):
+    footprint_cache.invalidate_where(lambda key: key[1] == public_key)
@@ -0,0 +1,321 @@
+"""
+Idempotency-Key support for the endpoints that move money.
+
+The first request with a key claims it by inserting an in_progress row
+(unique per wallet + key) holding a fingerprint of the endpoint and
+body. When it finishes, its status code, JSON response and transaction
+hashes are stored, and any retry with the same key gets that response
+replayed without touching Horizon / Soroban. A retry that arrives while
+the original is still running waits for it: in this process it shares
+the original's call, from another process it polls the row. A key reused
+for a different request is rejected with 422.
+
+Each on-chain submission inside a handler goes through step(), which
+stores its result on the key. Only successful submissions are stored: a
+result with "successful" False is handed back to the handler but not
+kept. A submission whose outcome is unknown (OutcomeUnknown) is stored as
+unresolved with its transaction hash, and a retry looks that transaction
+up on Horizon before it sends anything again. Client errors (4xx) are
+stored like successes, unless a step of the request failed. After that,
+or after a server error, the key is unlocked and a retry resumes it,
+reusing the steps that already went through instead of moving the money
+again and resubmitting the one that failed. A request whose process died
+holds its key until IDEMPOTENCY_LOCK_SECONDS have passed. Keys are
+forgotten after IDEMPOTENCY_KEY_TTL.
+"""
+
+import asyncio
+import contextvars
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+
+from app.config import IDEMPOTENCY_KEY_TTL, IDEMPOTENCY_LOCK_SECONDS, IDEMPOTENCY_WAIT_SECONDS
+from app.database import SessionLocal
+from app.models.idempotency import IdempotencyKey
+from app.services.stellar_service_async import OutcomeUnknown, resolve_transaction
+from app.utils.singleflight import SingleFlight
+
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1
+PURGE_INTERVAL = 600
+
+_flights = SingleFlight()
+# {"wallet_id", "key", "steps" done, "failed" step} of the keyed request running in this task
+_current = contextvars.ContextVar("idempotency_request", default=None)
+_last_purge = 0.0
+_stats = {"requests": 0, "replayed": 0, "shared": 0, "waited": 0, "conflicts": 0,
+          "resumed": 0, "steps_reused": 0, "steps_failed": 0, "steps_unknown": 0, "steps_resolved": 0,
+          "unlocked": 0, "purged": 0}
+
+
+def fingerprint(endpoint: str, body) -> str:
+    canonical = json.dumps({"endpoint": endpoint, "body": jsonable_encoder(body)}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _tx_hashes(body, steps: dict) -> list:
+    hashes = [result["hash"] for result in steps.values() if isinstance(result, dict) and result.get("hash")]
+    if isinstance(body, dict):
+        hashes += [value for name, value in body.items() if name.endswith("hash") and isinstance(value, str)]
+    return list(dict.fromkeys(hashes))
+
+
+# =========================
+# KEY TABLE
+# =========================
+
+def _claim(wallet_id: int, key: str, endpoint: str, request_fingerprint: str):
+    """("claimed", steps) | ("replay", (status, body)) | ("conflict" | "wait", None)"""
+    db = SessionLocal()
+    try:
+        for _ in range(3):
+            now = datetime.utcnow()
+            db.add(IdempotencyKey(
+                wallet_id=wallet_id,
+                key=key,
+                endpoint=endpoint,
+                fingerprint=request_fingerprint,
+                locked_until=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+            ))
+            try:
+                db.commit()
+                return "claimed", {}
+            except IntegrityError:
+                db.rollback()
+
+            row = db.query(IdempotencyKey).filter(
+                IdempotencyKey.wallet_id == wallet_id, IdempotencyKey.key == key
+            ).first()
+            if row is None:
+                continue  # released or purged in between
+            if row.expires_at < now:
+                db.query(IdempotencyKey).filter(
+                    IdempotencyKey.id == row.id, IdempotencyKey.expires_at < now
+                ).delete(synchronize_session=False)
+                db.commit()
+                continue
+            if row.fingerprint != request_fingerprint:
+                return "conflict", None
+            if row.status == "completed":
+                return "replay", (row.response_status, json.loads(row.response_body))
+            if row.locked_until < now:
+                # Failed (unlocked) or its process died; only one retry takes over
+                steps = json.loads(row.steps or "{}")
+                taken = db.query(IdempotencyKey).filter(
+                    IdempotencyKey.id == row.id,
+                    IdempotencyKey.status == "in_progress",
+                    IdempotencyKey.locked_until == row.locked_until,
+                ).update(
+                    {"locked_until": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)},
+                    synchronize_session=False,
+                )
+                db.commit()
+                if taken:
+                    _stats["resumed"] += 1
+                    return "claimed", steps
+            return "wait", None
+        return "wait", None
+    finally:
+        db.close()
+
+
+def _save_step(wallet_id: int, key: str, steps: dict):
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.wallet_id == wallet_id, IdempotencyKey.key == key
+        ).update({"steps": json.dumps(steps)}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _complete(wallet_id: int, key: str, status_code: int, body, steps: dict):
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.wallet_id == wallet_id, IdempotencyKey.key == key
+        ).update({
+            "status": "completed",
+            "response_status": status_code,
+            "response_body": json.dumps(body),
+            "tx_hashes": json.dumps(_tx_hashes(body, steps)),
+            "completed_at": datetime.utcnow(),
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _unlock(wallet_id: int, key: str):
+    """Let the next retry take the key over right away (its steps are kept)"""
+    _stats["unlocked"] += 1
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.wallet_id == wallet_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status == "in_progress",
+        ).update({"locked_until": datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def purge_expired() -> int:
+    db = SessionLocal()
+    try:
+        purged = db.query(IdempotencyKey).filter(
+            IdempotencyKey.expires_at < datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    _stats["purged"] += purged
+    return purged
+
+
+# =========================
+# EXECUTION
+# =========================
+
+async def _run(wallet_id: int, key: str, endpoint: str, request_fingerprint: str, handler):
+    """(status_code, body, replayed) for the request, running handler at most once per key"""
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    waited = False
+    while True:
+        outcome, stored = await asyncio.to_thread(_claim, wallet_id, key, endpoint, request_fingerprint)
+        if outcome == "claimed":
+            steps = stored
+            break
+        if outcome == "replay":
+            _stats["replayed"] += 1
+            return stored[0], stored[1], True
+        if outcome == "conflict":
+            _stats["conflicts"] += 1
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+
+        if not waited:
+            _stats["waited"] += 1
+            waited = True
+        if time.monotonic() > deadline:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still in progress",
+                headers={"Retry-After": "1"},
+            )
+        await asyncio.sleep(POLL_INTERVAL)
+
+    current = {"wallet_id": wallet_id, "key": key, "steps": steps, "failed": None}
+    _current.set(current)
+    try:
+        body = jsonable_encoder(await handler())
+    except HTTPException as e:
+        # A rejected submission is not final: the retry submits it again
+        if 400 <= e.status_code < 500 and e.status_code not in (409, 429) and current["failed"] is None:
+            await asyncio.to_thread(_complete, wallet_id, key, e.status_code, {"detail": e.detail}, steps)
+        else:
+            await asyncio.to_thread(_unlock, wallet_id, key)
+        raise
+    except BaseException:
+        # Also on cancellation (client gone), so not off the loop: the
+        # await could be cancelled before the key is unlocked
+        _unlock(wallet_id, key)
+        raise
+
+    await asyncio.to_thread(_complete, wallet_id, key, 200, body, steps)
+    return 200, body, False
+
+
+async def step(name: str, func, *args, **kwargs):
+    """
+    await func(*args, **kwargs) once per keyed request: a retry resuming
+    the key gets the stored result back. The result must be JSON-able; one
+    with "successful" False is returned but not stored. After
+    OutcomeUnknown, func runs again only once its transaction can no
+    longer apply; until then the retry raises OutcomeUnknown too.
+    """
+    current = _current.get()
+    if current is None:
+        return await func(*args, **kwargs)
+
+    steps = current["steps"]
+    result = None
+    if name in steps:
+        stored = steps[name]
+        if not (isinstance(stored, dict) and "unresolved" in stored):
+            _stats["steps_reused"] += 1
+            return stored
+
+        _stats["steps_resolved"] += 1
+        result = await resolve_transaction(stored["unresolved"], stored["max_time"])
+        if result is None:
+            del steps[name]
+
+    if result is None:
+        try:
+            result = await func(*args, **kwargs)
+        except OutcomeUnknown as e:
+            _stats["steps_unknown"] += 1
+            steps[name] = {"unresolved": e.tx_hash, "max_time": e.max_time}
+            await asyncio.to_thread(_save_step, current["wallet_id"], current["key"], steps)
+            raise
+
+    if isinstance(result, dict) and result.get("successful") is False:
+        _stats["steps_failed"] += 1
+        current["failed"] = name
+        if steps.pop(name, None) is not None:
+            await asyncio.to_thread(_save_step, current["wallet_id"], current["key"], steps)
+        return result
+
+    steps[name] = jsonable_encoder(result)
+    await asyncio.to_thread(_save_step, current["wallet_id"], current["key"], steps)
+    return result
+
+
+async def idempotent(wallet_id: int, key, endpoint: str, body, handler):
+    """
+    Run handler() (returning the JSON response body) once per key. Without
+    a key it just runs; with one the result is a JSONResponse, marked with
+    Idempotent-Replayed when it is not this request's own.
+    """
+    if not key:
+        return await handler()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters")
+
+    global _last_purge
+    if time.monotonic() - _last_purge > PURGE_INTERVAL:
+        _last_purge = time.monotonic()
+        await asyncio.to_thread(purge_expired)
+
+    _stats["requests"] += 1
+    request_fingerprint = fingerprint(endpoint, body)
+    flight = (wallet_id, key, request_fingerprint)
+    shared = flight in _flights
+    if shared:
+        _stats["shared"] += 1
+
+    status_code, response_body, replayed = await _flights.do(
+        flight, _run, wallet_id, key, endpoint, request_fingerprint, handler
+    )
+    headers = {"Idempotent-Replayed": "true"} if replayed or shared else {}
+    return JSONResponse(status_code=status_code, content=response_body, headers=headers)
+
+
+def idempotency_stats():
+    db = SessionLocal()
+    try:
+        stored = db.query(IdempotencyKey).count()
+        in_progress = db.query(IdempotencyKey).filter(IdempotencyKey.status == "in_progress").count()
+    finally:
+        db.close()
+    return {**_stats, "in_flight_here": len(_flights), "stored_keys": stored, "in_progress": in_progress}
@@ -0,0 +1,227 @@
+"""
+Durable background jobs stored in the `jobs` table.
+
+Request handlers enqueue() a job and return; a pool of asyncio workers
+claims pending jobs, runs the registered handler and retries failures
+with exponential backoff up to the job's max_attempts. While a handler
+runs, its lease (JOB_LEASE_SECONDS) is renewed every third of the lease;
+a job left in "running" by a crashed process is picked up again once
+the lease has expired. A handler can checkpoint() progress into its
+job's payload so the next attempt sees it.
+"""
+
+import asyncio
+import contextvars
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, and_
+
+from app.config import JOB_WORKERS, JOB_POLL_INTERVAL, JOB_RETRY_BASE_SECONDS, JOB_LEASE_SECONDS
+from app.database import SessionLocal
+from app.models.job import Job
+from app.utils.tracing import log
+
+_handlers = {}
+# (job id, payload) of the job running in this task
+_current = contextvars.ContextVar("job", default=None)
+
+
+def job_handler(kind: str):
+    """Register an async handler(payload: dict) -> dict for a job kind"""
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def enqueue(db, kind: str, payload: dict, max_attempts: int = 5) -> Job:
+    """Add a job using the caller's session (committed by this call)"""
+    job = Job(kind=kind, payload=json.dumps(payload), max_attempts=max_attempts)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    if _pool is not None:
+        _pool.notify()
+    return job
+
+
+def get_job(db, job_id: int):
+    return db.query(Job).filter(Job.id == job_id).first()
+
+
+def _save_payload(job_id: int, payload: dict):
+    db = SessionLocal()
+    try:
+        db.query(Job).filter(Job.id == job_id).update({"payload": json.dumps(payload)}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def checkpoint(**fields):
+    """Merge fields into the running job's payload (a None value removes the field)"""
+    job_id, payload = _current.get()
+    for name, value in fields.items():
+        if value is None:
+            payload.pop(name, None)
+        else:
+            payload[name] = value
+    await asyncio.to_thread(_save_payload, job_id, payload)
+
+
+def _claim_next():
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        lease_expired = now - timedelta(seconds=JOB_LEASE_SECONDS)
+
+        job = (
+            db.query(Job)
+            .filter(Job.kind.in_(list(_handlers)))
+            .filter(or_(
+                and_(Job.status == "pending", Job.run_after <= now),
+                and_(Job.status == "running", Job.updated_at < lease_expired),
+            ))
+            .order_by(Job.run_after)
+            .first()
+        )
+        if job is None:
+            return None
+
+        # Read everything before commit() expires the instance
+        claimed_job = (job.id, job.kind, json.loads(job.payload), job.attempts + 1, job.max_attempts)
+
+        # Only one worker / process wins the update
+        claimed = (
+            db.query(Job)
+            .filter(Job.id == job.id, Job.status == job.status, Job.attempts == job.attempts)
+            .update(
+                {"status": "running", "attempts": job.attempts + 1, "updated_at": now},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        if not claimed:
+            return None
+
+        return claimed_job
+    finally:
+        db.close()
+
+
+def _extend_lease(job_id: int, attempts: int) -> bool:
+    """Renew a running job's lease; False if another worker has taken it over"""
+    db = SessionLocal()
+    try:
+        extended = (
+            db.query(Job)
+            .filter(Job.id == job_id, Job.status == "running", Job.attempts == attempts)
+            .update({"updated_at": datetime.utcnow()}, synchronize_session=False)
+        )
+        db.commit()
+        return bool(extended)
+    finally:
+        db.close()
+
+
+def _finish(job_id: int, result: dict = None, error: str = None, attempts: int = 0, max_attempts: int = 0):
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+
+        if error is None:
+            job.status = "done"
+            job.result = json.dumps(result)
+            job.last_error = None
+        elif attempts >= max_attempts:
+            job.status = "failed"
+            job.last_error = error
+        else:
+            job.status = "pending"
+            job.last_error = error
+            backoff = JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+            job.run_after = datetime.utcnow() + timedelta(seconds=backoff)
+
+        db.commit()
+    finally:
+        db.close()
+
+
+class JobWorkerPool:
+    def __init__(self, workers: int = JOB_WORKERS, poll_interval: float = JOB_POLL_INTERVAL):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._loop = None
+        self._tasks = []
+        self._running = False
+
+    def notify(self):
+        """Wake an idle worker; safe to call from request threads"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._running = True
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        self._running = False
+        self._wakeup.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        while self._running:
+            self._wakeup.clear()
+            claimed = await asyncio.to_thread(_claim_next)
+
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, kind, payload, attempts, max_attempts = claimed
+            _current.set((job_id, payload))
+            heartbeat = asyncio.create_task(self._heartbeat(job_id, kind, attempts))
+            try:
+                result = await _handlers[kind](payload)
+                await asyncio.to_thread(_finish, job_id, result)
+            except Exception as e:
+                log("job_failed", job_id=job_id, kind=kind, attempt=attempts, error=str(e))
+                await asyncio.to_thread(_finish, job_id, None, str(e), attempts, max_attempts)
+            finally:
+                heartbeat.cancel()
+
+    @staticmethod
+    async def _heartbeat(job_id: int, kind: str, attempts: int):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                if not await asyncio.to_thread(_extend_lease, job_id, attempts):
+                    log("job_lease_lost", job_id=job_id, kind=kind, attempt=attempts)
+                    return
+            except Exception as e:
+                log("job_lease_renewal_failed", job_id=job_id, kind=kind, error=str(e))
+
+
+_pool = None
+
+
+def start_workers():
+    global _pool
+    if _pool is None:
+        _pool = JobWorkerPool()
+        _pool.start()
+
+
+async def stop_workers():
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+    _pool = None
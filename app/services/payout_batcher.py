@@ -0,0 +1,148 @@
+"""
+Coalescing queue for vault-sourced XLM payouts.
+
+Payouts are queued and flushed either when PAYOUT_BATCH_WINDOW_MS has
+passed since the first queued payout or when PAYOUT_BATCH_MAX_OPS payouts
+are waiting. Each flush is one multi-operation transaction from the vault
+(Stellar allows up to 100 operations per transaction); every caller gets
+the hash of the transaction that carried its payment.
+"""
+
+import asyncio
+from decimal import Decimal, ROUND_DOWN
+
+from stellar_sdk import TransactionBuilder, Network, Asset
+from stellar_sdk.exceptions import BadRequestError
+
+from app.config import VAULT_SECRET_KEY, PAYOUT_BATCH_WINDOW_MS, PAYOUT_BATCH_MAX_OPS
+from app.services.stellar_service import is_valid_stellar_address
+from app.utils.signer_cache import system_keypair
+from app.services.stellar_service_async import submit_transaction
+
+MAX_OPERATIONS_PER_TX = 100
+
+
+class PayoutBatcher:
+    def __init__(self, source_secret: str, window_ms: int = PAYOUT_BATCH_WINDOW_MS,
+                 max_ops: int = PAYOUT_BATCH_MAX_OPS):
+        self.source_keypair = system_keypair(source_secret)
+        self.window = window_ms / 1000
+        self.max_ops = min(max_ops, MAX_OPERATIONS_PER_TX)
+        self._pending = []
+        self._timer = None
+        self._flushes = set()
+        self.payouts = 0
+        self.submissions = 0
+
+    async def pay(self, destination: str, amount: Decimal):
+        if not is_valid_stellar_address(destination):
+            raise ValueError(f"Invalid destination address: {destination}")
+
+        amount = Decimal(str(amount)).quantize(Decimal("0.0000001"), rounding=ROUND_DOWN)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((destination, amount, future))
+        self.payouts += 1
+
+        if len(self._pending) >= self.max_ops:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._start_flush)
+
+        return await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending[:self.max_ops], self._pending[self.max_ops:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._start_flush)
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch):
+        while batch:
+            try:
+                self.submissions += 1
+                response = await submit_transaction(self.source_keypair, lambda account, fee: self._build_tx(account, batch, fee))
+            except BadRequestError as e:
+                # tx_failed reports one result code per operation: fail the
+                # payouts that were rejected and resubmit the rest.
+                op_codes = (e.extras or {}).get("result_codes", {}).get("operations") or []
+                if len(op_codes) != len(batch) or all(code != "op_success" for code in op_codes):
+                    self._fail(batch, e)
+                    return
+
+                retry = []
+                for item, code in zip(batch, op_codes):
+                    if code == "op_success":
+                        retry.append(item)
+                    elif not item[2].done():
+                        item[2].set_exception(ValueError(f"Payout failed: {code}"))
+                batch = retry
+                continue
+            except Exception as e:
+                self._fail(batch, e)
+                return
+
+            result = {"successful": response["successful"], "hash": response["hash"], "batch_size": len(batch)}
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result(result)
+            return
+
+    def _build_tx(self, source_account, batch, base_fee: int):
+        builder = TransactionBuilder(
+            source_account=source_account,
+            network_passphrase=Network.TESTNET_NETWORK_PASSPHRASE,
+            base_fee=base_fee,
+        )
+        for destination, amount, _ in batch:
+            builder.append_payment_op(destination=destination, amount=str(amount), asset=Asset.native())
+        return builder.set_timeout(30).build()
+
+    def _fail(self, batch, error):
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def close(self):
+        """Flush whatever is still queued and wait for in-flight batches"""
+        while self._pending:
+            self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self):
+        return {
+            "payouts": self.payouts,
+            "submissions": self.submissions,
+            "pending": len(self._pending),
+        }
+
+
+_vault_batcher = None
+
+
+def get_vault_batcher() -> PayoutBatcher:
+    global _vault_batcher
+    if _vault_batcher is None:
+        _vault_batcher = PayoutBatcher(VAULT_SECRET_KEY)
+    return _vault_batcher
+
+
+async def vault_payout(destination: str, amount: Decimal):
+    """Queue an XLM payment from the vault, returns once its batch is submitted"""
+    return await get_vault_batcher().pay(destination, amount)
+
+
+async def close_vault_batcher():
+    global _vault_batcher
+    if _vault_batcher is not None:
+        await _vault_batcher.close()
+    _vault_batcher = None
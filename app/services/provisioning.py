@@ -0,0 +1,405 @@
+"""
+Bulk provisioning of custodial wallets for partner onboarding.
+
+create_run() takes a list of emails and, PROVISIONING_CHUNK_SIZE at a
+time, creates the missing users and wallets with bulk INSERTs. Keypairs
+are generated and Fernet-encrypted across a process pool, and each chunk
+is committed on its own. fund_run() then creates the accounts on-chain from
+the treasury with up to PROVISIONING_OPS_PER_TX create_account
+operations per transaction.
+
+API requests only queue a run: create_run() then runs as a
+"provision_create" job without a process pool, so the API workers never
+spawn one. The CLI runs it in place with PROVISIONING_PROCESSES. Funding
+needs TREASURY_SECRET_KEY; there is no fallback to the vault.
+
+Both steps can be resumed. Running create_run() again with the same emails
+(and run_id) only creates what is still missing. fund_run() only picks up
+accounts still marked pending. An account that turns out to exist already
+(op_already_exists, e.g. its transaction landed but the response was lost)
+is marked funded, and the rest of its transaction is resubmitted.
+
+    python -m app.services.provisioning emails.txt [--resume RUN_ID] [--no-fund]
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import insert, update
+from stellar_sdk import TransactionBuilder, Network, Keypair
+from stellar_sdk.exceptions import BadRequestError
+
+from app.config import (
+    TREASURY_SECRET_KEY,
+    PROVISIONING_PROCESSES,
+    PROVISIONING_CHUNK_SIZE,
+    PROVISIONING_OPS_PER_TX,
+    PROVISIONING_TX_PER_JOB,
+    PROVISIONING_STARTING_BALANCE,
+)
+from app.database import SessionLocal
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.models.provisioning import ProvisioningRun, ProvisionedAccount
+from app.utils.encryption import encrypt_secret
+from app.utils.signer_cache import system_keypair
+from app.services.job_queue import job_handler, enqueue
+from app.services.stellar_service_async import submit_transaction
+
+PROVISION_CREATE = "provision_create"
+PROVISION_FUNDING = "provision_funding"
+
+MAX_OPERATIONS_PER_TX = 100
+
+
+# =========================
+# KEYS
+# =========================
+
+def _generate_keys(count: int):
+    """[(public_key, encrypted_secret)] - runs in the provisioning worker processes"""
+    keys = []
+    for _ in range(count):
+        keypair = Keypair.random()
+        keys.append((keypair.public_key, encrypt_secret(keypair.secret)))
+    return keys
+
+
+def generate_keys(count: int, pool: ProcessPoolExecutor = None, workers: int = 1):
+    if pool is None or count < 2 * workers:
+        return _generate_keys(count)
+
+    share, extra = divmod(count, workers)
+    sizes = [share + (1 if i < extra else 0) for i in range(workers)]
+    return [key for keys in pool.map(_generate_keys, sizes) for key in keys]
+
+
+def _process_pool(processes: int):
+    if processes <= 1:
+        return None
+    # spawn, not fork: the API process has event-loop and pool threads running
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+
+
+# =========================
+# USERS + WALLETS
+# =========================
+
+def _provision_chunk(db, run_id: int, emails, pool, workers: int) -> int:
+    """Create the users / wallets still missing for emails (not committed); returns wallets created"""
+    user_ids = dict(db.query(User.email, User.id).filter(User.email.in_(emails)).all())
+    with_wallet = {
+        user_id for (user_id,) in
+        db.query(Wallet.user_id).filter(Wallet.user_id.in_(list(user_ids.values())))
+    }
+
+    new_emails = [email for email in emails if email not in user_ids]
+    if new_emails:
+        # Imported users have no password until they set one
+        rows = db.execute(
+            insert(User).returning(User.id, User.email, sort_by_parameter_order=True),
+            [{"email": email, "hashed_password": None} for email in new_emails],
+        ).all()
+        user_ids.update({email: user_id for user_id, email in rows})
+
+    needs_wallet = [user_ids[email] for email in emails if user_ids[email] not in with_wallet]
+    if not needs_wallet:
+        return 0
+
+    now = datetime.utcnow()
+    keys = generate_keys(len(needs_wallet), pool, workers)
+    wallets = db.execute(
+        insert(Wallet).returning(Wallet.id, Wallet.public_key, sort_by_parameter_order=True),
+        [
+            {"user_id": user_id, "public_key": public_key, "encrypted_secret": encrypted, "created_at": now}
+            for user_id, (public_key, encrypted) in zip(needs_wallet, keys)
+        ],
+    ).all()
+    db.execute(
+        insert(ProvisionedAccount),
+        [{"wallet_id": wallet_id, "run_id": run_id, "public_key": public_key, "status": "pending"}
+         for wallet_id, public_key in wallets],
+    )
+    return len(wallets)
+
+
+def create_run(emails, label: str = None, run_id: int = None,
+               processes: int = PROVISIONING_PROCESSES,
+               starting_balance: str = PROVISIONING_STARTING_BALANCE) -> int:
+    """Create users and wallets for emails; pass run_id to continue an interrupted run"""
+    emails = list(dict.fromkeys(email.strip() for email in emails if email and email.strip()))
+
+    db = SessionLocal()
+    try:
+        if run_id is None:
+            run = ProvisioningRun(label=label, requested=len(emails), starting_balance=str(Decimal(starting_balance)))
+            db.add(run)
+            db.commit()
+        else:
+            run = db.get(ProvisioningRun, run_id)
+            if run is None:
+                raise ValueError(f"Provisioning run {run_id} not found")
+            run.status = "creating"
+        run_id = run.id
+
+        start = time.perf_counter()
+        pool = _process_pool(processes)
+        try:
+            for i in range(0, len(emails), PROVISIONING_CHUNK_SIZE):
+                created = _provision_chunk(db, run_id, emails[i:i + PROVISIONING_CHUNK_SIZE], pool, processes)
+                run.wallets_created += created
+                db.commit()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        run.create_seconds += time.perf_counter() - start
+        run.status = "funding"
+        db.commit()
+        return run_id
+    finally:
+        db.close()
+
+
+# =========================
+# FUNDING
+# =========================
+
+def _pending_accounts(run_id: int, limit: int):
+    db = SessionLocal()
+    try:
+        return db.query(ProvisionedAccount.wallet_id, ProvisionedAccount.public_key).filter(
+            ProvisionedAccount.run_id == run_id,
+            ProvisionedAccount.status == "pending",
+        ).limit(limit).all()
+    finally:
+        db.close()
+
+
+def _mark_funded(run_id: int, wallet_ids, tx_hash: str = None, transactions: int = 0):
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(ProvisionedAccount)
+            .where(ProvisionedAccount.wallet_id.in_(wallet_ids))
+            .values(status="funded", funding_tx_hash=tx_hash, funded_at=datetime.utcnow())
+        )
+        db.execute(
+            update(ProvisioningRun)
+            .where(ProvisioningRun.id == run_id)
+            .values(
+                accounts_funded=ProvisioningRun.accounts_funded + len(wallet_ids),
+                transactions=ProvisioningRun.transactions + transactions,
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _build_tx(source_account, batch, starting_balance: str, base_fee: int):
+    builder = TransactionBuilder(
+        source_account=source_account,
+        network_passphrase=Network.TESTNET_NETWORK_PASSPHRASE,
+        base_fee=base_fee,
+    )
+    for _, public_key in batch:
+        builder.append_create_account_op(destination=public_key, starting_balance=starting_balance)
+    return builder.set_timeout(30).build()
+
+
+async def _fund_batch(run_id: int, treasury: Keypair, batch, starting_balance: str):
+    while batch:
+        try:
+            # Wallets nobody is waiting on yet: bid the background fee
+            response = await submit_transaction(
+                treasury, lambda account, fee: _build_tx(account, batch, starting_balance, fee), priority="background"
+            )
+        except BadRequestError as e:
+            # tx_failed reports one code per operation. Accounts that already
+            # exist were funded by an earlier (lost) submission; anything
+            # other than that fails the whole batch.
+            op_codes = (e.extras or {}).get("result_codes", {}).get("operations") or []
+            if len(op_codes) != len(batch) or any(code not in ("op_success", "op_already_exists") for code in op_codes):
+                raise Exception(f"Funding transaction failed: {(e.extras or {}).get('result_codes', e)}")
+
+            exists = [wallet_id for (wallet_id, _), code in zip(batch, op_codes) if code == "op_already_exists"]
+            await asyncio.to_thread(_mark_funded, run_id, exists)
+            batch = [item for item, code in zip(batch, op_codes) if code == "op_success"]
+            continue
+
+        await asyncio.to_thread(_mark_funded, run_id, [wallet_id for wallet_id, _ in batch], response["hash"], 1)
+        return
+
+
+def _finish_funding(run_id: int, elapsed: float, error: str = None):
+    db = SessionLocal()
+    try:
+        run = db.get(ProvisioningRun, run_id)
+        run.fund_seconds += elapsed
+        run.last_error = error
+        pending = db.query(ProvisionedAccount).filter(
+            ProvisionedAccount.run_id == run_id,
+            ProvisionedAccount.status == "pending",
+        ).count()
+        if not pending and not error and run.status == "funding":
+            run.status = "completed"
+            run.completed_at = datetime.utcnow()
+        db.commit()
+        return pending
+    finally:
+        db.close()
+
+
+def treasury_keypair() -> Keypair:
+    if not TREASURY_SECRET_KEY:
+        raise ValueError("TREASURY_SECRET_KEY is not set, accounts cannot be funded")
+    return system_keypair(TREASURY_SECRET_KEY)
+
+
+async def fund_run(run_id: int, max_transactions: int = None) -> int:
+    """Create pending accounts on-chain from the treasury; returns how many are still pending"""
+    treasury = treasury_keypair()
+    ops_per_tx = min(PROVISIONING_OPS_PER_TX, MAX_OPERATIONS_PER_TX)
+
+    db = SessionLocal()
+    try:
+        starting_balance = db.get(ProvisioningRun, run_id).starting_balance
+    finally:
+        db.close()
+
+    start = time.perf_counter()
+    sent = 0
+    try:
+        while max_transactions is None or sent < max_transactions:
+            batch = await asyncio.to_thread(_pending_accounts, run_id, ops_per_tx)
+            if not batch:
+                break
+            await _fund_batch(run_id, treasury, batch, starting_balance)
+            sent += 1
+    except Exception as e:
+        await asyncio.to_thread(_finish_funding, run_id, time.perf_counter() - start, str(e))
+        raise
+
+    return await asyncio.to_thread(_finish_funding, run_id, time.perf_counter() - start)
+
+
+def enqueue_funding(db, run_id: int):
+    return enqueue(db, PROVISION_FUNDING, {"run_id": run_id})
+
+
+def queue_run(db, emails, label: str = None, fund: bool = True):
+    """Record a run and queue its creation (and funding) as jobs; returns (run_id, job)"""
+    if fund:
+        treasury_keypair()
+    emails = list(dict.fromkeys(email.strip() for email in emails if email and email.strip()))
+    run = ProvisioningRun(
+        label=label,
+        requested=len(emails),
+        starting_balance=str(Decimal(PROVISIONING_STARTING_BALANCE)),
+        status="queued",
+    )
+    db.add(run)
+    db.commit()
+    job = enqueue(db, PROVISION_CREATE, {"run_id": run.id, "emails": emails, "fund": fund})
+    return run.id, job
+
+
+@job_handler(PROVISION_CREATE)
+async def run_provision_create(payload: dict):
+    # No process pool: this runs in an API worker
+    run_id = await asyncio.to_thread(create_run, payload["emails"], run_id=payload["run_id"], processes=1)
+    if payload["fund"]:
+        db = SessionLocal()
+        try:
+            enqueue_funding(db, run_id)
+        finally:
+            db.close()
+    return {"run_id": run_id}
+
+
+@job_handler(PROVISION_FUNDING)
+async def run_provision_funding(payload: dict):
+    # A bounded slice per job keeps each run well inside the job lease;
+    # the next slice is queued as a new job
+    pending = await fund_run(payload["run_id"], max_transactions=PROVISIONING_TX_PER_JOB)
+    if pending:
+        db = SessionLocal()
+        try:
+            enqueue_funding(db, payload["run_id"])
+        finally:
+            db.close()
+    return {"run_id": payload["run_id"], "pending": pending}
+
+
+# =========================
+# REPORT
+# =========================
+
+def run_report(db, run_id: int):
+    run = db.get(ProvisioningRun, run_id)
+    if run is None:
+        return None
+
+    pending = db.query(ProvisionedAccount).filter(
+        ProvisionedAccount.run_id == run_id,
+        ProvisionedAccount.status == "pending",
+    ).count()
+
+    return {
+        "run_id": run.id,
+        "label": run.label,
+        "status": run.status,
+        "requested": run.requested,
+        "wallets_created": run.wallets_created,
+        "accounts_funded": run.accounts_funded,
+        "accounts_pending": pending,
+        "transactions": run.transactions,
+        "starting_balance_xlm": run.starting_balance,
+        "create_seconds": round(run.create_seconds, 3),
+        "fund_seconds": round(run.fund_seconds, 3),
+        "wallets_per_second": round(run.wallets_created / run.create_seconds, 1) if run.create_seconds else None,
+        "accounts_funded_per_second": round(run.accounts_funded / run.fund_seconds, 1) if run.fund_seconds else None,
+        "last_error": run.last_error,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from app.migrations import upgrade
+    from app.services.stellar_service_async import close_clients
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("emails", help="file with one email per line")
+    parser.add_argument("--label")
+    parser.add_argument("--resume", type=int, help="continue this provisioning run")
+    parser.add_argument("--processes", type=int, default=PROVISIONING_PROCESSES)
+    parser.add_argument("--no-fund", action="store_true", help="only create users and wallets")
+    args = parser.parse_args()
+
+    upgrade()
+    if not args.no_fund:
+        treasury_keypair()
+    with open(args.emails) as f:
+        emails = f.read().splitlines()
+
+    run_id = create_run(emails, label=args.label or args.emails, run_id=args.resume, processes=args.processes)
+
+    if not args.no_fund:
+        async def fund():
+            try:
+                await fund_run(run_id)
+            finally:
+                await close_clients()
+
+        asyncio.run(fund())
+
+    db = SessionLocal()
+    print(json.dumps(run_report(db, run_id), indent=2))
+    db.close()
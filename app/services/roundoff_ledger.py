@@ -0,0 +1,363 @@
+"""
+Local ledger of round-off savings, swept into the Soroban vault in bulk.
+
+/wallet/pay already moves the round-off XLM to the vault account in the
+payment transaction; record_roundoff() only books it as a pending entry.
+A sweep credits all pending entries on-chain with credit_xlm_batch,
+ROUNDOFF_SWEEP_BATCH_SIZE users per transaction. Sweeps run as
+"roundoff_sweep" jobs, requested when a user's pending total reaches
+ROUNDOFF_SWEEP_THRESHOLD and every ROUNDOFF_SWEEP_INTERVAL seconds.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from app.config import (
+    ROUNDOFF_SWEEP_THRESHOLD,
+    ROUNDOFF_SWEEP_INTERVAL,
+    ROUNDOFF_SWEEP_BATCH_SIZE,
+    JOB_LEASE_SECONDS,
+)
+from app.database import SessionLocal
+from app.models.job import Job
+from app.models.roundoff import RoundoffEntry, RoundoffSweep
+from app.services.job_queue import job_handler, enqueue
+from app.services.stellar_service_async import (
+    NotSubmitted,
+    batch_id,
+    soroban_batch_applied,
+    soroban_credit_xlm_batch,
+    wait_for_transaction,
+)
+from app.services import balance_cache
+from app.utils.tracing import log
+
+ROUNDOFF_SWEEP = "roundoff_sweep"
+
+STROOPS_PER_XLM = Decimal("10000000")
+
+
+def to_stroops(amount: Decimal) -> int:
+    return int((Decimal(str(amount)) * STROOPS_PER_XLM).to_integral_value())
+
+
+def to_xlm(stroops: int) -> float:
+    return float(Decimal(stroops or 0) / STROOPS_PER_XLM)
+
+
+# =========================
+# LEDGER
+# =========================
+
+def pending_amount(db, public_key: str) -> int:
+    """Stroops booked for public_key that are not yet credited on-chain"""
+    total = (
+        db.query(func.sum(RoundoffEntry.amount))
+        .filter(RoundoffEntry.public_key == public_key)
+        .filter(RoundoffEntry.status.in_(["pending", "sweeping"]))
+        .scalar()
+    )
+    return total or 0
+
+
+def record_roundoff(db, wallet, amount: Decimal, payment_hash: str) -> RoundoffEntry:
+    """Book a round-off paid to the vault; requests a sweep once over the threshold"""
+    entry = RoundoffEntry(
+        wallet_id=wallet.id,
+        public_key=wallet.public_key,
+        amount=to_stroops(amount),
+        payment_hash=payment_hash,
+    )
+    db.add(entry)
+    db.commit()
+    db.refresh(entry)
+
+    if pending_amount(db, wallet.public_key) >= to_stroops(ROUNDOFF_SWEEP_THRESHOLD):
+        request_sweep(db)
+
+    return entry
+
+
+def request_sweep(db):
+    """Enqueue a sweep unless one is already waiting to run"""
+    waiting = (
+        db.query(Job)
+        .filter(Job.kind == ROUNDOFF_SWEEP, Job.status == "pending")
+        .first()
+    )
+    if waiting is not None:
+        return waiting
+    return enqueue(db, ROUNDOFF_SWEEP, {})
+
+
+def roundoff_report(db, public_key: str, limit: int = 20):
+    totals = dict(
+        db.query(RoundoffEntry.status, func.sum(RoundoffEntry.amount))
+        .filter(RoundoffEntry.public_key == public_key)
+        .group_by(RoundoffEntry.status)
+        .all()
+    )
+
+    recent = (
+        db.query(RoundoffEntry)
+        .filter(RoundoffEntry.public_key == public_key)
+        .order_by(RoundoffEntry.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+    return {
+        "pending_xlm": to_xlm(totals.get("pending", 0)),
+        "sweeping_xlm": to_xlm(totals.get("sweeping", 0)),
+        "swept_xlm": to_xlm(totals.get("swept", 0)),
+        "sweep_threshold_xlm": ROUNDOFF_SWEEP_THRESHOLD,
+        "entries": [
+            {
+                "amount": to_xlm(e.amount),
+                "status": e.status,
+                "payment_hash": e.payment_hash,
+                "sweep_tx_hash": e.sweep.tx_hash if e.sweep else None,
+                "created_at": e.created_at.isoformat() if e.created_at else None,
+            }
+            for e in recent
+        ],
+    }
+
+
+def ledger_stats(db):
+    totals = (
+        db.query(RoundoffEntry.status, func.count(RoundoffEntry.id), func.sum(RoundoffEntry.amount))
+        .group_by(RoundoffEntry.status)
+        .all()
+    )
+    return {
+        "entries": {status: {"count": count, "xlm": to_xlm(amount)} for status, count, amount in totals},
+        "sweeps": dict(
+            db.query(RoundoffSweep.status, func.count(RoundoffSweep.id))
+            .group_by(RoundoffSweep.status)
+            .all()
+        ),
+    }
+
+
+# =========================
+# SWEEP
+# =========================
+
+def _release(db, sweep: RoundoffSweep, status: str):
+    """Put a sweep's entries back to pending so the next sweep picks them up"""
+    db.query(RoundoffEntry).filter(RoundoffEntry.sweep_id == sweep.id).update(
+        {"status": "pending", "sweep_id": None}, synchronize_session=False
+    )
+    sweep.status = status
+    sweep.completed_at = datetime.utcnow()
+    db.commit()
+
+
+def _complete(db, sweep: RoundoffSweep):
+    """Mark a sweep credited on-chain; returns its users"""
+    users = [
+        public_key for (public_key,) in
+        db.query(RoundoffEntry.public_key).filter(RoundoffEntry.sweep_id == sweep.id).distinct()
+    ]
+    db.query(RoundoffEntry).filter(RoundoffEntry.sweep_id == sweep.id).update(
+        {"status": "swept"}, synchronize_session=False
+    )
+    sweep.status = "done"
+    sweep.completed_at = datetime.utcnow()
+    db.commit()
+    return users
+
+
+def _sweep_batch(sweep: RoundoffSweep) -> bytes:
+    return batch_id("credit_xlm_batch", sweep.id)
+
+
+def _stale_sweeps(db):
+    stale = datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS)
+    return (
+        db.query(RoundoffSweep)
+        .filter(RoundoffSweep.status.in_(["pending", "submitted"]))
+        .filter(RoundoffSweep.created_at < stale)
+        .all()
+    )
+
+
+async def _recover(db):
+    """
+    Finish sweeps a crashed or timed-out run left behind. They are older
+    than JOB_LEASE_SECONDS, well past the transaction's 30 s time bounds,
+    so the contract's batch record is final: applied means swept, anything
+    else goes back to pending. A sweep without a tx hash may still have
+    been sent just before the crash, so it is checked too.
+
+    Returns the users of the sweeps found credited.
+    """
+    credited = []
+    for sweep in await asyncio.to_thread(_stale_sweeps, db):
+        if await soroban_batch_applied(_sweep_batch(sweep)):
+            credited.extend(await asyncio.to_thread(_complete, db, sweep))
+        else:
+            await asyncio.to_thread(_release, db, sweep, "expired")
+    return credited
+
+
+def _claim_chunk(db, entry_ids: list):
+    """New sweep owning entry_ids that are still pending; returns it with {public_key: stroops}"""
+    sweep = RoundoffSweep()
+    db.add(sweep)
+    db.flush()
+
+    # Entries another sweep claimed in the meantime are skipped
+    db.query(RoundoffEntry).filter(
+        RoundoffEntry.id.in_(entry_ids), RoundoffEntry.status == "pending"
+    ).update({"status": "sweeping", "sweep_id": sweep.id}, synchronize_session=False)
+
+    amounts = dict(
+        db.query(RoundoffEntry.public_key, func.sum(RoundoffEntry.amount))
+        .filter(RoundoffEntry.sweep_id == sweep.id)
+        .group_by(RoundoffEntry.public_key)
+        .all()
+    )
+    sweep.user_count = len(amounts)
+    sweep.total_amount = sum(amounts.values())
+    if not amounts:
+        sweep.status = "done"
+    db.commit()
+    return sweep, amounts
+
+
+def _mark_submitted(db, sweep: RoundoffSweep, tx_hash: str):
+    sweep.tx_hash = tx_hash
+    sweep.status = "submitted"
+    db.commit()
+
+
+async def _sweep_chunk(db, entry_ids: list):
+    sweep, amounts = await asyncio.to_thread(_claim_chunk, db, entry_ids)
+    if not amounts:
+        return sweep, []
+
+    try:
+        result = await soroban_credit_xlm_batch(_sweep_batch(sweep), sorted(amounts.items()))
+    except NotSubmitted:
+        # Never accepted by RPC, so it cannot apply
+        await asyncio.to_thread(_release, db, sweep, "failed")
+        raise
+    except Exception:
+        # Sent but the response was lost: it may land, so the entries stay
+        # claimed under this batch id until _recover settles the sweep
+        await asyncio.to_thread(_mark_submitted, db, sweep, None)
+        raise
+
+    await asyncio.to_thread(_mark_submitted, db, sweep, result["hash"])
+
+    tx_status = await wait_for_transaction(sweep.tx_hash)
+    if tx_status == "SUCCESS":
+        await asyncio.to_thread(_complete, db, sweep)
+    elif tx_status == "FAILED":
+        await asyncio.to_thread(_release, db, sweep, "failed")
+    # NOT_FOUND: it may still land, so the entries stay claimed until
+    # _recover settles the sweep from the contract's batch record
+    return sweep, list(amounts)
+
+
+def _pending_by_user(db):
+    by_user = {}
+    for entry_id, public_key in (
+        db.query(RoundoffEntry.id, RoundoffEntry.public_key)
+        .filter(RoundoffEntry.status == "pending")
+        .order_by(RoundoffEntry.id)
+    ):
+        by_user.setdefault(public_key, []).append(entry_id)
+    return by_user
+
+
+async def sweep_pending(batch_size: int = ROUNDOFF_SWEEP_BATCH_SIZE):
+    """
+    Credit every pending round-off on-chain, batch_size users per
+    credit_xlm_batch transaction. Failed chunks go back to pending and
+    are listed in "errors"; the remaining chunks are still tried.
+
+    Each sweep's batch id is derived from its row id and the contract
+    applies a batch id once, so a sweep is never credited twice.
+    """
+    db = SessionLocal()
+    try:
+        swept_users, sweeps, errors = await _recover(db), [], []
+
+        by_user = await asyncio.to_thread(_pending_by_user, db)
+        users = sorted(by_user)
+
+        for i in range(0, len(users), batch_size):
+            entry_ids = [entry_id for user in users[i:i + batch_size] for entry_id in by_user[user]]
+            try:
+                sweep, chunk_users = await _sweep_chunk(db, entry_ids)
+            except Exception as e:
+                errors.append(str(e))
+                continue
+
+            sweeps.append({"sweep_id": sweep.id, "tx_hash": sweep.tx_hash, "status": sweep.status,
+                           "users": sweep.user_count, "amount": to_xlm(sweep.total_amount)})
+            if sweep.status == "done":
+                swept_users.extend(chunk_users)
+            else:
+                errors.append(f"sweep {sweep.id} ended with {sweep.status}")
+
+        return {"sweeps": sweeps, "swept_users": swept_users, "errors": errors}
+    finally:
+        db.close()
+
+
+@job_handler(ROUNDOFF_SWEEP)
+async def run_roundoff_sweep(payload: dict):
+    result = await sweep_pending()
+
+    for public_key in result["swept_users"]:
+        balance_cache.invalidate_user(public_key)
+
+    if result["errors"]:
+        raise Exception("; ".join(result["errors"]))
+
+    return {"sweeps": result["sweeps"]}
+
+
+# =========================
+# SCHEDULE
+# =========================
+
+_scheduler = None
+
+
+def _request_sweep_now():
+    db = SessionLocal()
+    try:
+        request_sweep(db)
+    finally:
+        db.close()
+
+
+async def _schedule_sweeps(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_request_sweep_now)
+        except Exception as e:
+            log("roundoff_sweep_schedule_failed", error=str(e))
+
+
+def start_sweep_scheduler(interval: float = ROUNDOFF_SWEEP_INTERVAL):
+    global _scheduler
+    if _scheduler is None and interval > 0:
+        _scheduler = asyncio.create_task(_schedule_sweeps(interval))
+
+
+async def stop_sweep_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.cancel()
+        await asyncio.gather(_scheduler, return_exceptions=True)
+    _scheduler = None
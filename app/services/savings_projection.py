@@ -0,0 +1,242 @@
+"""
+"What would I have saved" projections over a user's payment history.
+
+Every /wallet/pay is recorded in payment_history (merchant amount and the
+round-off actually paid, in stroops). Payments made before that, or from
+elsewhere, can be imported from Horizon with sync_history(). A projection
+loads the user's amounts in one index-only read, keeps them in memory for
+PROJECTION_CACHE_TTL and runs them through the batch round-off engine
+(app/utils/rounding.py), so trying other rules over a full history takes
+milliseconds.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import select, func
+
+from app.config import (
+    VAULT_PUBLIC_KEY,
+    PAYMENT_HISTORY_PAGE_SIZE,
+    PAYMENT_HISTORY_SYNC_PAGES,
+    PROJECTION_CACHE_TTL,
+    PROJECTION_CACHE_MAX_SIZE,
+)
+from app.database import with_session
+from app.models.contract_event import IndexerCursor
+from app.models.payment_history import PaymentRecord
+from app.services.stellar_service_async import get_horizon_server
+from app.utils.cache import TTLCache
+from app.utils.rounding import STROOPS_PER_XLM, to_stroops, roundoffs_stroops, load_numpy
+from yield_engine.yield_logic import ANNUAL_APY
+
+DAYS_IN_YEAR = 365
+
+# public_key -> loaded history, so what-if variations (step, multiplier)
+# over the same history skip the database
+history_cache = TTLCache(max_size=PROJECTION_CACHE_MAX_SIZE, ttl=PROJECTION_CACHE_TTL)
+
+
+def record_payment(db, wallet, amount_stroops: int, roundoff_stroops: int, tx_hash: str) -> PaymentRecord:
+    record = PaymentRecord(
+        wallet_id=wallet.id,
+        public_key=wallet.public_key,
+        amount=amount_stroops,
+        roundoff=roundoff_stroops,
+        tx_hash=tx_hash,
+    )
+    db.add(record)
+    db.commit()
+    history_cache.invalidate(wallet.public_key)
+    return record
+
+
+# =========================
+# HORIZON IMPORT
+# =========================
+
+def _cursor_name(public_key: str) -> str:
+    return f"payments:{public_key}"
+
+
+def _sync_state(db, public_key: str):
+    """(saved Horizon cursor, hashes of payments recorded by /wallet/pay)"""
+    cursor_row = db.get(IndexerCursor, _cursor_name(public_key))
+    local_hashes = {
+        tx_hash for (tx_hash,) in
+        db.query(PaymentRecord.tx_hash).filter(
+            PaymentRecord.public_key == public_key,
+            PaymentRecord.operation_id.is_(None),
+        )
+    }
+    return (cursor_row.cursor if cursor_row else None), local_hashes
+
+
+def _save_page(db, wallet_id: int, public_key: str, cursor: str, merchant: dict, roundoffs: dict) -> int:
+    """Add a page's payments not imported yet and commit them with the cursor; returns payments added"""
+    known = {
+        operation_id for (operation_id,) in
+        db.query(PaymentRecord.operation_id).filter(
+            PaymentRecord.operation_id.in_([record["id"] for record in merchant.values()])
+        )
+    }
+    added = 0
+    for tx_hash, record in merchant.items():
+        if record["id"] in known:
+            continue
+        db.add(PaymentRecord(
+            wallet_id=wallet_id,
+            public_key=public_key,
+            amount=to_stroops(record["amount"]),
+            roundoff=roundoffs.get(tx_hash, 0),
+            tx_hash=tx_hash,
+            operation_id=record["id"],
+            created_at=datetime.strptime(record["created_at"], "%Y-%m-%dT%H:%M:%SZ"),
+        ))
+        added += 1
+
+    db.merge(IndexerCursor(name=_cursor_name(public_key), cursor=cursor))
+    db.commit()
+    return added
+
+
+async def sync_history(wallet, max_pages: int = PAYMENT_HISTORY_SYNC_PAGES) -> int:
+    """
+    Import the wallet's outgoing native payments from Horizon; returns
+    payments added. Database work runs in threads, each in its own session.
+    """
+    wallet_id, public_key = wallet.id, wallet.public_key
+    cursor, local_hashes = await asyncio.to_thread(with_session, _sync_state, public_key)
+
+    added = 0
+    server = get_horizon_server()
+    for _ in range(max_pages):
+        builder = server.payments().for_account(public_key).limit(PAYMENT_HISTORY_PAGE_SIZE).order(desc=False)
+        if cursor:
+            builder = builder.cursor(cursor)
+        records = (await builder.call())["_embedded"]["records"]
+
+        merchant = {}
+        roundoffs = {}
+        for record in records:
+            cursor = record["paging_token"]
+            if (record.get("type") != "payment" or record.get("asset_type") != "native"
+                    or record.get("from") != public_key
+                    or record["transaction_hash"] in local_hashes):
+                continue
+            if record["to"] == VAULT_PUBLIC_KEY:
+                roundoffs[record["transaction_hash"]] = to_stroops(record["amount"])
+            elif record["transaction_hash"] not in merchant:
+                merchant[record["transaction_hash"]] = record
+
+        page_added = await asyncio.to_thread(
+            with_session, _save_page, wallet_id, public_key, cursor, merchant, roundoffs
+        )
+        added += page_added
+        if added:
+            history_cache.invalidate(public_key)
+
+        if len(records) < PAYMENT_HISTORY_PAGE_SIZE:
+            break
+
+    return added
+
+
+# =========================
+# PROJECTION
+# =========================
+
+def _xlm(stroops) -> float:
+    return float(Decimal(int(stroops)) / STROOPS_PER_XLM)
+
+
+def _fetch_rows(db, public_key: str):
+    """
+    [(amount, roundoff)] in stroops. Read through the DBAPI cursor: building
+    a Row per payment costs more than the whole projection on a long history.
+    """
+    statement = select(PaymentRecord.amount, PaymentRecord.roundoff).where(PaymentRecord.public_key == public_key)
+    compiled = statement.compile(dialect=db.get_bind().dialect)
+    params = compiled.construct_params()
+    if compiled.positiontup is not None:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(str(compiled), params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _history(db, public_key: str):
+    """(amounts, roundoffs, first_at, last_at) - int64 arrays when NumPy is installed"""
+    if PROJECTION_CACHE_TTL > 0:
+        cached = history_cache.get(public_key)
+        if cached is not None:
+            return cached
+
+    rows = _fetch_rows(db, public_key)
+    np = load_numpy()
+    if np is not None:
+        history = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        amounts, roundoffs = history[:, 0], history[:, 1]
+    else:
+        amounts, roundoffs = [amount for amount, _ in rows], [roundoff for _, roundoff in rows]
+
+    # Separate MIN and MAX so each is a single seek on the covering index
+    mine = PaymentRecord.public_key == public_key
+    first_at = db.execute(select(func.min(PaymentRecord.created_at)).where(mine)).scalar()
+    last_at = db.execute(select(func.max(PaymentRecord.created_at)).where(mine)).scalar()
+
+    entry = (amounts, roundoffs, first_at, last_at)
+    if PROJECTION_CACHE_TTL > 0:
+        history_cache.set(public_key, entry)
+    return entry
+
+
+def project_savings(db, public_key: str, step_xlm: float = None, multiplier: int = 1) -> dict:
+    """
+    Round-offs the user would have saved over their whole payment history
+    under the tiered rule (or a fixed step_xlm), times multiplier, compared
+    with what they actually put in, and that pace projected over a year.
+    """
+    start = time.perf_counter()
+
+    amounts, actual, first_at, last_at = _history(db, public_key)
+    step = to_stroops(step_xlm) if step_xlm else None
+    roundoffs = roundoffs_stroops(amounts, step)
+    if load_numpy() is not None:
+        total_spent, actual_saved = int(amounts.sum()), int(actual.sum())
+        would_have_saved = int(roundoffs.sum()) * multiplier
+        rounded_payments = int((roundoffs > 0).sum())
+    else:
+        total_spent, actual_saved = sum(amounts), sum(actual)
+        would_have_saved = sum(roundoffs) * multiplier
+        rounded_payments = sum(1 for roundoff in roundoffs if roundoff > 0)
+
+    # Savings pace over the history's span, projected over the next year:
+    # plain, and deposited daily into the vault at ANNUAL_APY
+    days = max(1.0, (last_at - first_at).total_seconds() / 86400) if first_at else 1.0
+    per_day = would_have_saved / days
+    daily_rate = float(ANNUAL_APY) / DAYS_IN_YEAR
+    with_yield = per_day * ((1 + daily_rate) ** DAYS_IN_YEAR - 1) / daily_rate
+
+    return {
+        "payments": len(amounts),
+        "first_payment_at": first_at.isoformat() if first_at else None,
+        "last_payment_at": last_at.isoformat() if last_at else None,
+        "rule": f"round up to {step_xlm} XLM" if step else "tiered (1 / 10 / 100 XLM)",
+        "multiplier": multiplier,
+        "total_spent_xlm": _xlm(total_spent),
+        "payments_rounded": rounded_payments,
+        "would_have_saved_xlm": _xlm(would_have_saved),
+        "actually_saved_xlm": _xlm(actual_saved),
+        "missed_xlm": _xlm(max(0, would_have_saved - actual_saved)),
+        "projected_next_year_xlm": round(per_day * DAYS_IN_YEAR / STROOPS_PER_XLM, 7),
+        "projected_next_year_with_yield_xlm": round(with_yield / STROOPS_PER_XLM, 7),
+        "annual_apy": float(ANNUAL_APY),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
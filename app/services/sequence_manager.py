@@ -0,0 +1,69 @@
+"""
+In-process sequence numbers for system accounts (vault, issuer).
+
+Instead of calling load_account before every transaction, the sequence is
+loaded once per account and incremented locally under a per-account lock.
+When Horizon rejects a transaction with tx_bad_seq the cached value is
+dropped and reloaded on the next allocation.
+"""
+
+import asyncio
+
+from stellar_sdk import Account
+from stellar_sdk.exceptions import BadRequestError
+
+
+def is_bad_sequence(error: Exception) -> bool:
+    if not isinstance(error, BadRequestError) or not error.extras:
+        return False
+
+    result_codes = error.extras.get("result_codes", {})
+    return result_codes.get("transaction") == "tx_bad_seq"
+
+
+class SequenceManager:
+    def __init__(self, load_account):
+        # load_account: async callable(account_id) -> stellar_sdk.Account
+        self._load_account = load_account
+        self._sequences = {}
+        self._locks = {}
+        self.allocations = 0
+        self.loads = 0
+        self.resyncs = 0
+
+    def _lock(self, account_id: str) -> asyncio.Lock:
+        if account_id not in self._locks:
+            self._locks[account_id] = asyncio.Lock()
+        return self._locks[account_id]
+
+    async def next_account(self, account_id: str) -> Account:
+        """
+        Reserve the next sequence number for account_id.
+
+        The returned Account carries the previous sequence, so the
+        TransactionBuilder bumps it to the reserved one on build().
+        """
+        async with self._lock(account_id):
+            if account_id not in self._sequences:
+                account = await self._load_account(account_id)
+                self._sequences[account_id] = account.sequence
+                self.loads += 1
+
+            sequence = self._sequences[account_id]
+            self._sequences[account_id] = sequence + 1
+            self.allocations += 1
+
+        return Account(account_id, sequence)
+
+    def invalidate(self, account_id: str):
+        """Forget the cached sequence, the next allocation reloads it"""
+        if self._sequences.pop(account_id, None) is not None:
+            self.resyncs += 1
+
+    def stats(self):
+        return {
+            "accounts": len(self._sequences),
+            "allocations": self.allocations,
+            "loads": self.loads,
+            "resyncs": self.resyncs,
+        }
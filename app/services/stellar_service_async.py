@@ -0,0 +1,757 @@
+"""
+Async variant of stellar_service.
+
+Horizon and Soroban RPC calls go through one shared aiohttp session so that
+async routes never hold a worker thread while waiting on the network.
+"""
+
+import asyncio
+import hashlib
+import time
+from decimal import Decimal, ROUND_DOWN
+
+from stellar_sdk import (
+    TransactionBuilder,
+    Network,
+    Asset,
+    Keypair,
+    MuxedAccount,
+    AiohttpClient,
+    ServerAsync,
+    SorobanServerAsync,
+    scval,
+)
+from stellar_sdk import xdr as stellar_xdr
+from stellar_sdk.exceptions import BadRequestError, BadResponseError, NotFoundError
+from stellar_sdk.soroban_rpc import SendTransactionStatus
+
+from app.config import (
+    HORIZON_URL,
+    ISSUER_SECRET_KEY,
+    ISSUER_PUBLIC_KEY,
+    VAULT_PUBLIC_KEY,
+    CONTRACT_ADMIN_SECRET,
+    SEQUENCE_RETRY_LIMIT,
+    SOROBAN_CONTRACT_ID,
+    SOROBAN_RPC_URL,
+    FRIENDBOT_URL,
+    STELLAR_HTTP_POOL_SIZE,
+    STELLAR_HTTP_TIMEOUT,
+    STELLAR_HTTP_POST_TIMEOUT,
+    FEE_STATS_TTL,
+    FEE_BUMP_AFTER,
+    FEE_SPONSOR_SECRET,
+)
+from app.utils.signer_cache import to_keypair, system_keypair
+from app.services.stellar_service import (
+    is_valid_stellar_address,
+    parse_user_summary,
+    parse_total_xlm,
+    _address_amount_vec,
+    _simulation_return_value,
+)
+from app.services.sequence_manager import SequenceManager, is_bad_sequence
+from app.services import footprint_cache, fee_strategy
+from app.utils.singleflight import SingleFlight
+from app.utils.metrics import instrument, upstream_call, connection_trace_config, HORIZON_PHASES, SOROBAN_PHASES
+from app.utils.tracing import log
+
+# Accounts whose sequence numbers are managed locally (see sequence_manager)
+SYSTEM_ACCOUNTS = {VAULT_PUBLIC_KEY, ISSUER_PUBLIC_KEY}
+
+_http_client = None
+_horizon_server = None
+_soroban_server = None
+_sequence_manager = None
+_fee_stats_flight = SingleFlight()
+_fee_refresher = None
+# Channel accounts lending their sequence numbers to system-account
+# transactions (see channel_pool), registered once some are funded
+_channel_pool = None
+# Ledger close times trail the wall clock a little: this long after its
+# max_time, a transaction Horizon does not know can no longer be included
+TIME_BOUNDS_SLACK = 10
+
+
+# =========================
+# SHARED CLIENTS
+# =========================
+
+def get_http_client() -> AiohttpClient:
+    """Pooled HTTP client shared by Horizon and Soroban RPC"""
+    global _http_client
+    if _http_client is None:
+        _http_client = AiohttpClient(
+            pool_size=STELLAR_HTTP_POOL_SIZE,
+            request_timeout=STELLAR_HTTP_TIMEOUT,
+            post_timeout=STELLAR_HTTP_POST_TIMEOUT,
+            trace_configs=[connection_trace_config()],
+        )
+    return _http_client
+
+
+def get_horizon_server() -> ServerAsync:
+    global _horizon_server
+    if _horizon_server is None:
+        _horizon_server = instrument(ServerAsync(HORIZON_URL, client=get_http_client()), "horizon", HORIZON_PHASES)
+    return _horizon_server
+
+
+def get_soroban_server() -> SorobanServerAsync:
+    global _soroban_server
+    if _soroban_server is None:
+        _soroban_server = instrument(
+            SorobanServerAsync(SOROBAN_RPC_URL, client=get_http_client()), "soroban", SOROBAN_PHASES
+        )
+    return _soroban_server
+
+
+def get_sequence_manager() -> SequenceManager:
+    global _sequence_manager
+    if _sequence_manager is None:
+        _sequence_manager = SequenceManager(get_horizon_server().load_account)
+    return _sequence_manager
+
+
+async def close_clients():
+    """Release the shared HTTP session (called on app shutdown)"""
+    global _http_client, _horizon_server, _soroban_server, _sequence_manager
+    if _http_client is not None:
+        await _http_client.close()
+    _http_client = None
+    _horizon_server = None
+    _soroban_server = None
+    _sequence_manager = None
+
+
+# =========================
+# FEES
+# =========================
+
+async def _fetch_fee_stats():
+    with upstream_call("horizon", "fee_stats"):
+        fee_stats = await get_horizon_server().fee_stats().call()
+    return fee_strategy.store_fee_stats(fee_stats)
+
+
+async def get_fee_stats():
+    """Latest Horizon fee_stats (parsed), refetched once FEE_STATS_TTL old"""
+    if fee_strategy.needs_refresh():
+        try:
+            await _fee_stats_flight.do("fee_stats", _fetch_fee_stats)
+        except Exception as e:
+            fee_strategy.fetch_failed(e)
+    return fee_strategy.latest()
+
+
+async def get_base_fee(priority: str = "user") -> int:
+    """Stroops per operation to bid, see fee_strategy.pick_fee"""
+    return fee_strategy.pick_fee(await get_fee_stats(), priority)
+
+
+async def _refresh_fee_stats(interval: float):
+    # Refreshing ahead of the TTL keeps fee lookups off the request path
+    while True:
+        try:
+            await _fetch_fee_stats()
+        except Exception as e:
+            fee_strategy.fetch_failed(e)
+        await asyncio.sleep(interval)
+
+
+def start_fee_refresher(interval: float = FEE_STATS_TTL / 2):
+    global _fee_refresher
+    if _fee_refresher is None:
+        _fee_refresher = asyncio.create_task(_refresh_fee_stats(interval))
+
+
+async def stop_fee_refresher():
+    global _fee_refresher
+    if _fee_refresher is not None:
+        _fee_refresher.cancel()
+        await asyncio.gather(_fee_refresher, return_exceptions=True)
+    _fee_refresher = None
+
+
+def _is_timeout(error) -> bool:
+    """Horizon stopped waiting for the transaction; it may still be included"""
+    return isinstance(error, BadResponseError) and error.status == 504
+
+
+class OutcomeUnknown(Exception):
+    """Submitted, but no answer says whether it applied (timeout, lost response)"""
+
+    def __init__(self, tx_hash: str, max_time: int, error: str):
+        super().__init__(f"transaction {tx_hash} not confirmed: {error}")
+        self.tx_hash = tx_hash
+        self.max_time = max_time
+
+
+async def resolve_transaction(tx_hash: str, max_time: int):
+    """
+    Outcome of a transaction that raised OutcomeUnknown: {"successful",
+    "hash", "ledger"} once Horizon has it, None once its time bounds have
+    passed without it (it can never apply), else OutcomeUnknown again.
+    """
+    try:
+        record = await get_horizon_server().transactions().transaction(tx_hash).call()
+    except NotFoundError:
+        if max_time and time.time() > max_time + TIME_BOUNDS_SLACK:
+            return None
+        raise OutcomeUnknown(tx_hash, max_time, "not in a ledger yet")
+    return {"successful": record["successful"], "hash": record["hash"], "ledger": record.get("ledger")}
+
+
+def _ignore_result(task):
+    if not task.cancelled():
+        task.exception()
+
+
+async def _first_landed(original, bumped):
+    """Result of whichever of the two submissions succeeds, else the more telling error"""
+    pending = {original, bumped}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                if task is bumped:
+                    fee_strategy.bump_landed()
+                for other in pending:
+                    other.add_done_callback(_ignore_result)
+                return task.result()
+
+    # A rejection of one says nothing about the other: the transaction
+    # failed for sure only if both were turned down. tx_bad_seq on the bump
+    # means the original (or something else) used the sequence; it must not
+    # look like a stale sequence to the caller, which would rebuild and pay twice
+    original_error, bumped_error = original.exception(), bumped.exception()
+    if not isinstance(original_error, BadRequestError):
+        raise original_error
+    if not isinstance(bumped_error, BadRequestError) or not is_bad_sequence(bumped_error):
+        raise bumped_error
+    raise original_error
+
+
+async def _submit(server: ServerAsync, tx, **kwargs):
+    """
+    Submit a signed transaction. Raises BadRequestError when Horizon turned
+    it down, OutcomeUnknown on any other error: it may still apply, so it
+    must be resolved (resolve_transaction) before anything is resubmitted.
+    """
+    try:
+        return await _submit_or_bump(server, tx, **kwargs)
+    except BadRequestError:
+        raise
+    except Exception as e:
+        raise OutcomeUnknown(tx.hash_hex(), tx.transaction.preconditions.time_bounds.max_time,
+                             str(e) or type(e).__name__) from e
+
+
+async def _submit_or_bump(server: ServerAsync, tx, **kwargs):
+    """
+    If tx is not in a ledger within FEE_BUMP_AFTER seconds (or Horizon
+    times out waiting), the same transaction is also submitted inside a
+    fee-bump paid by the fee sponsor. They share a sequence number, so
+    only one can apply.
+    """
+    if FEE_BUMP_AFTER <= 0:
+        return await server.submit_transaction(tx, **kwargs)
+
+    original = asyncio.ensure_future(server.submit_transaction(tx, **kwargs))
+    try:
+        return await asyncio.wait_for(asyncio.shield(original), FEE_BUMP_AFTER)
+    except asyncio.TimeoutError:
+        pass
+    except BadResponseError as e:
+        if not _is_timeout(e):
+            raise
+    except asyncio.CancelledError:
+        original.add_done_callback(_ignore_result)
+        raise
+
+    bump = fee_strategy.build_fee_bump(tx, system_keypair(FEE_SPONSOR_SECRET), await get_fee_stats())
+    log("fee_bump", hash=tx.hash_hex(), fee=bump.transaction.fee)
+    bumped = asyncio.ensure_future(server.submit_transaction(bump, skip_memo_required_check=True))
+    return await _first_landed(original, bumped)
+
+
+def set_channel_pool(pool):
+    global _channel_pool
+    _channel_pool = pool
+
+
+def _set_operation_source(tx, account_id: str):
+    """Operations without a source would otherwise act for the channel account"""
+    for op in tx.transaction.operations:
+        if op.source is None:
+            op.source = MuxedAccount.from_account(account_id)
+
+
+async def submit_transaction(source_keypair: Keypair, build_tx, priority: str = "user"):
+    """
+    Build, sign and submit a transaction.
+
+    build_tx(source_account, base_fee) returns the unsigned transaction;
+    base_fee comes from fee_stats for the given priority. System
+    accounts take their sequence from the SequenceManager and are rebuilt
+    with a fresh sequence if Horizon answers tx_bad_seq; when channel
+    accounts are available one of them is the transaction source instead,
+    with the system account as source of every operation (sent again
+    through another channel, or the account itself, if that channel could
+    not pay for it). Other accounts are loaded from Horizon as usual.
+    """
+    server = get_horizon_server()
+    account_id = source_keypair.public_key
+    base_fee = await get_base_fee(priority)
+
+    if account_id not in SYSTEM_ACCOUNTS:
+        tx = build_tx(await server.load_account(account_id), base_fee)
+        tx.sign(source_keypair)
+        return await _submit(server, tx)
+
+    pool = _channel_pool
+    while pool is not None and pool.available():
+        try:
+            async with pool.lease() as channel:
+                return await _submit_sequenced(server, channel, build_tx, base_fee, operation_source=source_keypair)
+        except Exception as e:
+            # Rejected before it was applied; the lease took that channel out of rotation
+            if not pool.is_fault(e):
+                raise
+            log("channel_fault_retry", channel=channel.public_key, error=str(e))
+    return await _submit_sequenced(server, source_keypair, build_tx, base_fee)
+
+
+async def _submit_sequenced(server: ServerAsync, source_keypair: Keypair, build_tx, base_fee: int,
+                            operation_source: Keypair = None):
+    # System payouts only go to our own custodial wallets, so the SEP-29
+    # memo check (one extra account lookup per destination) is skipped.
+    # That also keeps submissions in the order sequences were allocated.
+    manager = get_sequence_manager()
+    account_id = source_keypair.public_key
+    for attempt in range(SEQUENCE_RETRY_LIMIT):
+        tx = build_tx(await manager.next_account(account_id), base_fee)
+        if operation_source is not None:
+            _set_operation_source(tx, operation_source.public_key)
+            tx.sign(operation_source)
+        tx.sign(source_keypair)
+        try:
+            return await _submit(server, tx, skip_memo_required_check=True)
+        except Exception as e:
+            manager.invalidate(account_id)
+            if not is_bad_sequence(e) or attempt == SEQUENCE_RETRY_LIMIT - 1:
+                raise
+
+
+# =========================
+# BASIC WALLET FUNCTIONS
+# =========================
+
+async def fund_testnet_account(public_key: str):
+    if not is_valid_stellar_address(public_key):
+        raise ValueError(f"Invalid Stellar address: {public_key}")
+
+    response = await get_http_client().get(FRIENDBOT_URL, params={"addr": public_key})
+    return response.json()
+
+
+async def get_native_balance(public_key: str) -> float:
+    account_json = await get_horizon_server().accounts().account_id(public_key).call()
+
+    for bal in account_json["balances"]:
+        if bal["asset_type"] == "native":
+            return float(bal["balance"])
+
+    return 0
+
+
+async def send_xlm(source_secret: str | Keypair, destination: str, amount: Decimal):
+    if not is_valid_stellar_address(destination):
+        raise ValueError(f"Invalid destination address: {destination}")
+
+    amount = Decimal(str(amount))
+    source_keypair = to_keypair(source_secret)
+
+    def build_tx(source_account, base_fee):
+        return (
+            TransactionBuilder(
+                source_account=source_account,
+                network_passphrase=Network.TESTNET_NETWORK_PASSPHRASE,
+                base_fee=base_fee,
+            )
+            .append_payment_op(
+                destination=destination,
+                amount=str(amount.quantize(Decimal("0.0000001"), rounding=ROUND_DOWN)),
+                asset=Asset.native(),
+            )
+            .set_timeout(30)
+            .build()
+        )
+
+    response = await submit_transaction(source_keypair, build_tx)
+
+    return {
+        "successful": response["successful"],
+        "hash": response["hash"],
+    }
+
+
+# =========================
+# VAULT MINT
+# =========================
+
+async def mint_usdc_to_vault(amount: Decimal):
+    amount = Decimal(str(amount))
+    issuer_keypair = system_keypair(ISSUER_SECRET_KEY)
+
+    def build_tx(source_account, base_fee):
+        return (
+            TransactionBuilder(
+                source_account=source_account,
+                network_passphrase=Network.TESTNET_NETWORK_PASSPHRASE,
+                base_fee=base_fee,
+            )
+            .append_payment_op(
+                destination=VAULT_PUBLIC_KEY,
+                amount=str(amount),
+                asset=Asset("USDC", ISSUER_PUBLIC_KEY),
+            )
+            .set_timeout(30)
+            .build()
+        )
+
+    response = await submit_transaction(issuer_keypair, build_tx)
+
+    return {
+        "successful": response["successful"],
+        "hash": response["hash"],
+    }
+
+
+# =========================
+# ATOMIC PAYMENT
+# =========================
+
+async def atomic_payment_with_roundoff(
+    source_secret: str | Keypair,
+    merchant_destination: str,
+    merchant_amount: Decimal,
+    vault_destination: str,
+    roundoff_amount: Decimal,
+):
+    """Async version of stellar_service.atomic_payment_with_roundoff"""
+    if not is_valid_stellar_address(merchant_destination):
+        raise ValueError(f"Invalid merchant destination address: {merchant_destination}")
+
+    if roundoff_amount > 0 and not is_valid_stellar_address(vault_destination):
+        raise ValueError(f"Invalid vault destination address: {vault_destination}")
+
+    merchant_amount = Decimal(str(merchant_amount))
+    roundoff_amount = Decimal(str(roundoff_amount))
+    server = get_horizon_server()
+
+    source_keypair = to_keypair(source_secret)
+    source_account = await server.load_account(source_keypair.public_key)
+
+    tx_builder = TransactionBuilder(
+        source_account=source_account,
+        network_passphrase=Network.TESTNET_NETWORK_PASSPHRASE,
+        base_fee=await get_base_fee(),
+    )
+
+    tx_builder.append_payment_op(
+        destination=merchant_destination,
+        amount=str(merchant_amount.quantize(Decimal("0.0000001"), rounding=ROUND_DOWN)),
+        asset=Asset.native(),
+    )
+
+    if roundoff_amount > 0:
+        tx_builder.append_payment_op(
+            destination=vault_destination,
+            amount=str(roundoff_amount.quantize(Decimal("0.0000001"), rounding=ROUND_DOWN)),
+            asset=Asset.native(),
+        )
+
+    tx = tx_builder.set_timeout(30).build()
+    tx.sign(source_keypair)
+
+    # Only Horizon's rejection is a failed payment; OutcomeUnknown and
+    # errors before the submission are raised
+    try:
+        response = await _submit(server, tx)
+        return {
+            "successful": response["successful"],
+            "hash": response["hash"],
+            "ledger": response.get("ledger"),
+        }
+    except BadRequestError as e:
+        error_msg = str(e)
+        if hasattr(e, 'extras') and e.extras:
+            error_msg = e.extras.get('result_codes', {})
+
+        return {
+            "successful": False,
+            "error": error_msg
+        }
+
+
+# =========================
+# SOROBAN FUNCTIONS
+# =========================
+
+def _build_invoke_tx(source_account, function_name: str, parameters: list,
+                     base_fee: int = fee_strategy.BASE_FEE):
+    # base_fee is the inclusion fee; prepare_transaction adds the resource fee
+    return (
+        TransactionBuilder(
+            source_account=source_account,
+            network_passphrase=Network.TESTNET_NETWORK_PASSPHRASE,
+            base_fee=base_fee,
+        )
+        .append_invoke_contract_function_op(
+            contract_id=SOROBAN_CONTRACT_ID,
+            function_name=function_name,
+            parameters=parameters,
+        )
+        .set_timeout(30)
+        .build()
+    )
+
+
+# sendTransaction statuses meaning the transaction is queued for a ledger
+ACCEPTED = (SendTransactionStatus.PENDING, SendTransactionStatus.DUPLICATE)
+
+
+class NotSubmitted(Exception):
+    """The transaction never reached the network, or RPC refused it: it cannot apply"""
+
+
+def _sent(function_name: str, response):
+    """Result of a queued transaction: not applied yet, see tx_tracker"""
+    return {
+        "hash": response.hash,
+        "function": function_name,
+        "status": "pending",
+        "latest_ledger": response.latest_ledger,
+    }
+
+
+async def _invoke_user_function(user_secret: str | Keypair, function_name: str, amount: int):
+    """
+    Invoke a user contract function with a single simulation.
+
+    If the footprint cache has a simulation of this exact call (function,
+    user and amount: its auth entries embed the arguments) the
+    transaction is assembled from it and sent without simulating. Should
+    the network reject it, the entry is dropped and the call falls back to
+    simulate -> assemble from that same simulation -> send.
+
+    Returns once the transaction is queued ("status": "pending"); raises
+    if the network did not accept it.
+    """
+    soroban_server = get_soroban_server()
+
+    keypair = to_keypair(user_secret)
+    source_account = await soroban_server.load_account(keypair.public_key)
+
+    tx = _build_invoke_tx(
+        source_account,
+        function_name,
+        [
+            scval.to_address(keypair.public_key),
+            scval.to_int128(amount),
+        ],
+        await get_base_fee(),
+    )
+
+    cached = footprint_cache.get_simulation(function_name, keypair.public_key, amount)
+    if cached is not None:
+        prepared_tx = await soroban_server.prepare_transaction(tx, cached)
+        prepared_tx.sign(keypair)
+        response = await soroban_server.send_transaction(prepared_tx)
+
+        if response.status in ACCEPTED:
+            return _sent(function_name, response)
+        if response.status != SendTransactionStatus.ERROR:
+            raise Exception(f"{function_name} not accepted: {response.status.value}")
+
+        log("footprint_rejected", function=function_name)
+        footprint_cache.invalidate(function_name, keypair.public_key, amount)
+
+    simulation = await soroban_server.simulate_transaction(tx)
+    if simulation.error:
+        raise Exception(simulation.error)
+    footprint_cache.store_simulation(function_name, keypair.public_key, amount, simulation)
+
+    prepared_tx = await soroban_server.prepare_transaction(tx, simulation)
+    prepared_tx.sign(keypair)
+    response = await soroban_server.send_transaction(prepared_tx)
+    if response.status not in ACCEPTED:
+        raise Exception(f"{function_name} not accepted: {response.status.value} {response.error_result_xdr or ''}".strip())
+
+    return _sent(function_name, response)
+
+
+async def soroban_deposit_xlm(user_secret: str | Keypair, amount: Decimal):
+    """Call deposit_xlm on the contract (amount in XLM)"""
+    amount_stroops = int((Decimal(str(amount)) * Decimal("10000000")).to_integral_value())
+    result = await _invoke_user_function(user_secret, "deposit_xlm", amount_stroops)
+    log("deposit_sent", hash=result["hash"])
+    return result
+
+
+async def soroban_invest_usdc(user_secret: str | Keypair, amount: int):
+    return await _invoke_user_function(user_secret, "invest_usdc", amount)
+
+
+async def soroban_withdraw_xlm(user_secret: str | Keypair, amount: int):
+    return await _invoke_user_function(user_secret, "withdraw_xlm", amount)
+
+
+async def _simulate_view(source_public_key: str, function_name: str, parameters: list):
+    soroban_server = get_soroban_server()
+    source_account = await soroban_server.load_account(source_public_key)
+    tx = _build_invoke_tx(source_account, function_name, parameters)
+    return await soroban_server.simulate_transaction(tx)
+
+
+async def fetch_user_summary(user_public_key: str):
+    """get_user_summary that raises on RPC / simulation errors"""
+    simulation = await _simulate_view(
+        user_public_key,
+        "get_user_summary",
+        [scval.to_address(user_public_key)],
+    )
+    if simulation.error:
+        raise Exception(simulation.error)
+    return parse_user_summary(simulation)
+
+
+async def fetch_total_xlm():
+    """total_xlm that raises on RPC / simulation errors"""
+    simulation = await _simulate_view(VAULT_PUBLIC_KEY, "total_xlm", [])
+    if simulation.error:
+        raise Exception(simulation.error)
+    return parse_total_xlm(simulation)
+
+
+# =========================
+# SOROBAN ADMIN (YIELD, ROUND-OFF SWEEPS)
+# =========================
+
+def batch_id(*parts) -> bytes:
+    """32-byte id under which the contract records an applied batch, e.g. batch_id("sweep", 42)"""
+    return hashlib.sha256(":".join(str(part) for part in parts).encode()).digest()
+
+
+def _is_bad_sequence_result(response) -> bool:
+    if not response.error_result_xdr:
+        return False
+    result = stellar_xdr.TransactionResult.from_xdr(response.error_result_xdr)
+    return result.result.code == stellar_xdr.TransactionResultCode.txBAD_SEQ
+
+
+async def _admin_invoke(function_name: str, parameters: list):
+    """
+    Simulate, sign with the contract admin key and send. The admin is the
+    vault by default, so its sequence comes from the SequenceManager like
+    every other vault transaction, rebuilt with a fresh one on txBAD_SEQ.
+
+    Returns once the transaction is queued ("status": "pending"). Raises
+    NotSubmitted when it definitely cannot apply; any other error (e.g. a
+    lost sendTransaction response) leaves the outcome unknown.
+    """
+    soroban_server = get_soroban_server()
+    manager = get_sequence_manager()
+    admin_keypair = system_keypair(CONTRACT_ADMIN_SECRET)
+    account_id = admin_keypair.public_key
+
+    for attempt in range(SEQUENCE_RETRY_LIMIT):
+        try:
+            base_fee = await get_base_fee("background")
+            tx = _build_invoke_tx(await manager.next_account(account_id), function_name, parameters, base_fee)
+            prepared_tx = await soroban_server.prepare_transaction(tx)
+            prepared_tx.sign(admin_keypair)
+        except Exception as e:
+            manager.invalidate(account_id)
+            raise NotSubmitted(f"{function_name} not sent: {e}") from e
+
+        try:
+            response = await soroban_server.send_transaction(prepared_tx)
+        except Exception:
+            manager.invalidate(account_id)
+            raise
+
+        if response.status in ACCEPTED:
+            return _sent(function_name, response)
+        manager.invalidate(account_id)
+        if not _is_bad_sequence_result(response) or attempt == SEQUENCE_RETRY_LIMIT - 1:
+            raise NotSubmitted(f"{function_name} not accepted: {response.status.value} {response.error_result_xdr or ''}".strip())
+
+
+async def soroban_add_yield_batch(batch: bytes, entries: list):
+    """
+    add_yield_batch with [(user_public_key, stroops), ...]. The contract
+    ignores a batch id it has already applied, so resending is safe.
+    """
+    return await _admin_invoke("add_yield_batch", [scval.to_bytes(batch), _address_amount_vec(entries)])
+
+
+async def soroban_credit_xlm_batch(batch: bytes, entries: list):
+    """credit_xlm_batch for round-offs already paid to the vault account; idempotent per batch id"""
+    return await _admin_invoke("credit_xlm_batch", [scval.to_bytes(batch), _address_amount_vec(entries)])
+
+
+async def soroban_batch_applied(batch: bytes) -> bool:
+    """Whether the contract has applied this batch id (on-chain state, not our records)"""
+    simulation = await _simulate_view(VAULT_PUBLIC_KEY, "batch_applied", [scval.to_bytes(batch)])
+    sc_val = _simulation_return_value(simulation)
+    if sc_val is None:
+        raise Exception(simulation.error or "batch_applied returned nothing")
+    return scval.from_bool(sc_val)
+
+
+async def wait_for_transaction(tx_hash: str, max_attempts: int = 30) -> str:
+    """Poll a Soroban transaction, returns SUCCESS / FAILED / NOT_FOUND"""
+    response = await get_soroban_server().poll_transaction(tx_hash, max_attempts=max_attempts)
+    return response.status.value
+
+
+async def soroban_get_user_summary(user_public_key: str):
+    try:
+        return await fetch_user_summary(user_public_key)
+
+    except Exception as e:
+        log("user_summary_failed", error=str(e))
+        return {
+            "xlm_balance": 0,
+            "usdc_principal": 0,
+            "usdc_yield": 0
+        }
+
+
+async def soroban_get_total_xlm():
+    try:
+        return await fetch_total_xlm()
+
+    except Exception as e:
+        log("total_xlm_failed", error=str(e))
+        return 0
+
+
+# Legacy function names, matching stellar_service
+async def soroban_deposit(user_secret: str | Keypair, amount: int):
+    return await soroban_deposit_xlm(user_secret, amount)
+
+
+async def soroban_withdraw(user_secret: str | Keypair, amount: int):
+    return await soroban_withdraw_xlm(user_secret, amount)
+
+
+async def soroban_get_balance(user_public_key: str):
+    summary = await soroban_get_user_summary(user_public_key)
+    return summary["xlm_balance"]
+
+
+async def soroban_get_total_vault():
+    return await _simulate_view(VAULT_PUBLIC_KEY, "total_xlm", [])
@@ -0,0 +1,458 @@
+"""
+Confirmation tracker for submitted Soroban transactions.
+
+sendTransaction only queues a transaction (PENDING); whether it was
+applied is known a ledger or two later. track() stores the hash in
+tracked_transactions as pending, and a background loop confirms all
+pending hashes in rounds. With up to TX_TRACKER_HASH_POLL_MAX pending, a
+round looks each of them up with getTransaction. With more, it reads the
+ledgers they were sent in with getTransactions (TX_TRACKER_PAGE_SIZE
+transactions per request), at most TX_TRACKER_SCAN_LEDGERS ledgers per
+round, so a backlog never has the node page through the whole network
+at once. A hash still not seen TX_TRACKER_EXPIRE_LEDGERS ledgers after
+it was sent is looked up on its own one last time and otherwise marked
+expired.
+
+Final statuses are stored and handed to listeners (balance_cache drops
+the user's cached balances), to wait() callers and to the user's open
+/wallet/tx-events streams. Transactions that are final on submission
+(Horizon payments) go through record() so they show up in the same
+stream. Pending rows left by a previous run are resumed on startup.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+from sqlalchemy import func, or_
+from stellar_sdk.exceptions import SorobanRpcErrorResponse
+
+from app.config import (
+    TX_TRACKER_POLL_INTERVAL,
+    TX_TRACKER_HASH_POLL_MAX,
+    TX_TRACKER_PAGE_SIZE,
+    TX_TRACKER_SCAN_LEDGERS,
+    TX_TRACKER_EXPIRE_LEDGERS,
+    TX_EVENTS_HEARTBEAT,
+    TX_EVENTS_RECENT,
+)
+from app.database import SessionLocal, with_session
+from app.models.tracked_tx import TrackedTransaction
+from app.services.stellar_service_async import get_soroban_server
+from app.utils.tracing import log
+
+FINAL = {"SUCCESS": "success", "FAILED": "failed"}
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# hash -> {"public_key", "kind", "submitted_ledger", "scan_from"} of the hashes this process confirms
+_pending = {}
+# hash -> futures of wait() callers
+_waiters = {}
+_listeners = []
+# public_key -> queues of open event streams
+_subscribers = {}
+_ledgers = {"latest": None, "oldest": 0}
+_task = None
+_wake = None
+_stats = {"rounds": 0, "requests": 0, "ledgers_scanned": 0, "success": 0, "failed": 0, "expired": 0,
+          "checked_individually": 0}
+
+
+def _as_update(row: TrackedTransaction) -> dict:
+    return {"hash": row.hash, "public_key": row.public_key, "kind": row.kind, "status": row.status, "ledger": row.ledger}
+
+
+def _entry(public_key: str, kind: str, submitted_ledger) -> dict:
+    return {"public_key": public_key, "kind": kind, "submitted_ledger": submitted_ledger, "scan_from": submitted_ledger}
+
+
+def _resume(row: TrackedTransaction):
+    _pending.setdefault(row.hash, _entry(row.public_key, row.kind, row.submitted_ledger))
+
+
+# =========================
+# UPDATES
+# =========================
+
+def add_listener(func):
+    """func(update) is called with every final status seen by this process"""
+    _listeners.append(func)
+
+
+def subscribe(public_key: str) -> asyncio.Queue:
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    _subscribers.setdefault(public_key, set()).add(queue)
+    return queue
+
+
+def unsubscribe(public_key: str, queue: asyncio.Queue):
+    queues = _subscribers.get(public_key)
+    if queues is not None:
+        queues.discard(queue)
+        if not queues:
+            del _subscribers[public_key]
+
+
+def _publish(update: dict):
+    if update["status"] != "pending":
+        for listener in _listeners:
+            try:
+                listener(update)
+            except Exception as e:
+                log("tx_listener_failed", hash=update["hash"], error=str(e))
+        for future in _waiters.pop(update["hash"], []):
+            if not future.done():
+                future.set_result(update["status"])
+
+    for queue in _subscribers.get(update["public_key"], ()):
+        if queue.full():
+            # A client that stopped reading loses its oldest update
+            queue.get_nowait()
+        queue.put_nowait(update)
+
+
+# =========================
+# TRACKING
+# =========================
+
+def _store_pending(db, tx_hash: str, public_key: str, kind: str, submitted_ledger) -> tuple:
+    """(update, submitted_ledger) of the tracked row, inserted as pending if new"""
+    row = db.get(TrackedTransaction, tx_hash)
+    if row is None:
+        db.add(TrackedTransaction(hash=tx_hash, public_key=public_key, kind=kind, submitted_ledger=submitted_ledger))
+        db.commit()
+        return {"hash": tx_hash, "public_key": public_key, "kind": kind, "status": "pending", "ledger": None}, submitted_ledger
+    # Tracked before, e.g. by a request resuming its Idempotency-Key
+    return _as_update(row), row.submitted_ledger
+
+
+async def track(tx_hash: str, public_key: str, kind: str, submitted_ledger: int = None) -> str:
+    """Store a sent transaction as pending; returns its status ("pending" unless already final)"""
+    update, submitted_ledger = await asyncio.to_thread(
+        with_session, _store_pending, tx_hash, public_key, kind, submitted_ledger
+    )
+
+    if update["status"] != "pending":
+        return update["status"]
+
+    _pending.setdefault(tx_hash, _entry(public_key, kind, submitted_ledger))
+    _publish(update)
+    _ensure_running()
+    return "pending"
+
+
+def record(db, tx_hash: str, public_key: str, kind: str, status: str = "success", ledger: int = None) -> dict:
+    """
+    Store a transaction that was final on submission (caller's session,
+    committed). Returns its update, for publish() on the event loop.
+    """
+    db.merge(TrackedTransaction(
+        hash=tx_hash,
+        public_key=public_key,
+        kind=kind,
+        status=status,
+        ledger=ledger,
+        confirmed_at=datetime.utcnow(),
+    ))
+    db.commit()
+    return {"hash": tx_hash, "public_key": public_key, "kind": kind, "status": status, "ledger": ledger}
+
+
+def publish(update: dict):
+    """Hand a record()ed update to listeners, waiters and subscribers (event loop only)"""
+    _publish(update)
+
+
+def _get_tracked(db, tx_hash: str):
+    """(update, submitted_ledger) of a tracked hash, None if it is not tracked"""
+    row = db.get(TrackedTransaction, tx_hash)
+    return (_as_update(row), row.submitted_ledger) if row is not None else None
+
+
+async def wait(tx_hash: str, timeout: float) -> str:
+    """Final status of a tracked hash, or "pending" if it is not final within timeout"""
+    if tx_hash not in _pending:
+        tracked = await asyncio.to_thread(with_session, _get_tracked, tx_hash)
+        if tracked is None:
+            raise KeyError(f"{tx_hash} is not tracked")
+        update, submitted_ledger = tracked
+        if update["status"] != "pending":
+            return update["status"]
+        # Pending but confirmed by no one here (another process, or a previous run)
+        _pending.setdefault(tx_hash, _entry(update["public_key"], update["kind"], submitted_ledger))
+        _ensure_running()
+
+    future = asyncio.get_running_loop().create_future()
+    _waiters.setdefault(tx_hash, []).append(future)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        return "pending"
+    finally:
+        futures = _waiters.get(tx_hash)
+        if futures and future in futures:
+            futures.remove(future)
+            if not futures:
+                del _waiters[tx_hash]
+
+
+# =========================
+# CONFIRMATION
+# =========================
+
+async def _scan(soroban_server, start_ledger: int, pending: dict):
+    """
+    ({hash: Transaction} of the pending hashes applied in the
+    TX_TRACKER_SCAN_LEDGERS ledgers from start_ledger on, last ledger read)
+    """
+    found, cursor = {}, None
+    while True:
+        _stats["requests"] += 1
+        if cursor:
+            response = await soroban_server.get_transactions(cursor=cursor, limit=TX_TRACKER_PAGE_SIZE)
+        else:
+            try:
+                response = await soroban_server.get_transactions(start_ledger=start_ledger, limit=TX_TRACKER_PAGE_SIZE)
+            except SorobanRpcErrorResponse:
+                # start_ledger is older than the node keeps; those hashes get checked on their own
+                oldest = (await soroban_server.get_health()).oldest_ledger
+                if start_ledger >= oldest:
+                    raise
+                _ledgers["oldest"] = start_ledger = oldest
+                continue
+
+        _ledgers["latest"] = response.latest_ledger
+        _ledgers["oldest"] = response.oldest_ledger
+        end_ledger = start_ledger + TX_TRACKER_SCAN_LEDGERS - 1
+        for tx in response.transactions:
+            if tx.ledger > end_ledger:
+                # The rest is left to the next round
+                _stats["ledgers_scanned"] += TX_TRACKER_SCAN_LEDGERS
+                return found, end_ledger
+            if tx.transaction_hash in pending:
+                found[tx.transaction_hash] = tx
+
+        if len(response.transactions) < TX_TRACKER_PAGE_SIZE or len(found) == len(pending):
+            _stats["ledgers_scanned"] += max(response.latest_ledger - start_ledger + 1, 0)
+            return found, response.latest_ledger
+        cursor = response.cursor
+
+
+async def _check_one(soroban_server, tx_hash: str, entry: dict) -> dict:
+    _stats["checked_individually"] += 1
+    response = await soroban_server.get_transaction(tx_hash)
+    return {
+        "hash": tx_hash,
+        "public_key": entry["public_key"],
+        "kind": entry["kind"],
+        "status": FINAL.get(response.status.value, "expired"),
+        "ledger": response.ledger,
+    }
+
+
+async def _poll_hashes(soroban_server, pending: dict) -> list:
+    """getTransaction for each pending hash; updates for those that are final or expired"""
+    hashes = list(pending)
+    _stats["requests"] += len(hashes)
+    responses = await asyncio.gather(*(soroban_server.get_transaction(tx_hash) for tx_hash in hashes))
+
+    updates = []
+    for tx_hash, response in zip(hashes, responses):
+        entry = pending[tx_hash]
+        _ledgers["latest"] = max(_ledgers["latest"] or 0, response.latest_ledger)
+        status = FINAL.get(response.status.value)
+        if status is None:
+            if response.latest_ledger <= entry["submitted_ledger"] + TX_TRACKER_EXPIRE_LEDGERS:
+                continue
+            status = "expired"
+        updates.append({
+            "hash": tx_hash,
+            "public_key": entry["public_key"],
+            "kind": entry["kind"],
+            "status": status,
+            "ledger": response.ledger,
+        })
+    return updates
+
+
+def _store_final(db, updates: list):
+    now = datetime.utcnow()
+    for update in updates:
+        db.query(TrackedTransaction).filter(
+            TrackedTransaction.hash == update["hash"], TrackedTransaction.status == "pending"
+        ).update(
+            {"status": update["status"], "ledger": update["ledger"], "confirmed_at": now},
+            synchronize_session=False,
+        )
+    db.commit()
+
+
+async def _finish(updates: list):
+    """Store final statuses, then drop the hashes from _pending and publish them"""
+    if not updates:
+        return
+
+    await asyncio.to_thread(with_session, _store_final, updates)
+
+    for update in updates:
+        _pending.pop(update["hash"], None)
+        _stats[update["status"]] += 1
+        _publish(update)
+
+
+async def confirm_pending(soroban_server=None) -> int:
+    """One round over every pending hash; returns how many became final"""
+    if not _pending:
+        return 0
+
+    soroban_server = soroban_server or get_soroban_server()
+    pending = dict(_pending)
+    _stats["rounds"] += 1
+
+    if any(entry["scan_from"] is None for entry in pending.values()):
+        # Sent without a ledger number (e.g. a stored step from before tracking)
+        latest = _ledgers["latest"] or (await soroban_server.get_latest_ledger()).sequence
+        for entry in pending.values():
+            if entry["scan_from"] is None:
+                entry["submitted_ledger"] = entry["scan_from"] = max(latest - TX_TRACKER_EXPIRE_LEDGERS, 1)
+
+    if len(pending) <= TX_TRACKER_HASH_POLL_MAX:
+        updates = await _poll_hashes(soroban_server, pending)
+        await _finish(updates)
+        return len(updates)
+
+    start_ledger = max(min(entry["scan_from"] for entry in pending.values()), _ledgers["oldest"])
+    found, latest = await _scan(soroban_server, start_ledger, pending)
+
+    updates = []
+    for tx_hash, entry in pending.items():
+        tx = found.get(tx_hash)
+        if tx is not None:
+            updates.append({
+                "hash": tx_hash,
+                "public_key": entry["public_key"],
+                "kind": entry["kind"],
+                "status": FINAL.get(tx.status, "failed"),
+                "ledger": tx.ledger,
+            })
+            continue
+
+        # Everything up to latest has been read (the tip, or the end of this
+        # round's ledgers); the next round starts after it
+        entry["scan_from"] = max(entry["scan_from"], latest + 1)
+        if latest > entry["submitted_ledger"] + TX_TRACKER_EXPIRE_LEDGERS:
+            updates.append(await _check_one(soroban_server, tx_hash, entry))
+
+    await _finish(updates)
+    return len(updates)
+
+
+# =========================
+# EVENT STREAM
+# =========================
+
+def recent_updates(db, public_key: str, since: datetime = None, limit: int = TX_EVENTS_RECENT) -> list:
+    """The user's latest tracked transactions, oldest first; with since, only those created or final after it"""
+    query = db.query(TrackedTransaction).filter(TrackedTransaction.public_key == public_key)
+    if since is not None:
+        query = query.filter(or_(TrackedTransaction.created_at > since, TrackedTransaction.confirmed_at > since))
+    rows = query.order_by(TrackedTransaction.created_at.desc()).limit(limit).all()
+    return [_as_update(row) for row in reversed(rows)]
+
+
+def _event(update: dict) -> str:
+    return f"event: tx\ndata: {json.dumps(update)}\n\n"
+
+
+async def stream_events(public_key: str):
+    """Server-sent events: the user's recent transactions, then every status change"""
+    queue = subscribe(public_key)
+    try:
+        since = datetime.utcnow()
+        for update in await asyncio.to_thread(with_session, recent_updates, public_key):
+            yield _event(update)
+
+        while True:
+            try:
+                yield _event(await asyncio.wait_for(queue.get(), TX_EVENTS_HEARTBEAT))
+                continue
+            except asyncio.TimeoutError:
+                pass
+
+            # Transactions confirmed by another process only reach this stream through the table
+            checked = datetime.utcnow()
+            for update in await asyncio.to_thread(with_session, recent_updates, public_key, since):
+                yield _event(update)
+            since = checked
+            yield ": keep-alive\n\n"
+    finally:
+        unsubscribe(public_key, queue)
+
+
+# =========================
+# BACKGROUND LOOP
+# =========================
+
+async def _run_tracker(interval: float):
+    while True:
+        if not _pending:
+            _wake.clear()
+            await _wake.wait()
+        # Transactions sent in the meantime are confirmed in the same round
+        await asyncio.sleep(interval)
+        try:
+            await confirm_pending()
+        except Exception as e:
+            log("tx_tracker_round_failed", pending=len(_pending), error=str(e))
+
+
+def _ensure_running():
+    global _task, _wake
+    loop = asyncio.get_running_loop()
+    if _task is None or _task.done() or _task.get_loop() is not loop:
+        _wake = asyncio.Event()
+        _task = loop.create_task(_run_tracker(TX_TRACKER_POLL_INTERVAL))
+    _wake.set()
+
+
+def start_tracker():
+    """Resume the transactions a previous run left pending"""
+    db = SessionLocal()
+    try:
+        for row in db.query(TrackedTransaction).filter(TrackedTransaction.status == "pending"):
+            _resume(row)
+    finally:
+        db.close()
+    _ensure_running()
+
+
+async def stop_tracker():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+    _task = None
+
+
+def pending_count() -> int:
+    return len(_pending)
+
+
+def tracker_stats():
+    db = SessionLocal()
+    try:
+        stored = dict(
+            db.query(TrackedTransaction.status, func.count(TrackedTransaction.hash))
+            .group_by(TrackedTransaction.status)
+            .all()
+        )
+    finally:
+        db.close()
+    return {
+        **_stats,
+        "pending_here": len(_pending),
+        "waiting": sum(len(futures) for futures in _waiters.values()),
+        "subscribers": sum(len(queues) for queues in _subscribers.values()),
+        "latest_ledger": _ledgers["latest"],
+        "stored": stored,
+    }
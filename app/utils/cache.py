@@ -0,0 +1,82 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after ttl seconds.
+
+    get() also takes a max_age so callers with a tighter staleness bound
+    than the cache-wide ttl can share the same entries.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    def get(self, key, max_age: float = None):
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        entry = self._data.get(key)
+
+        if entry is None or time.monotonic() - entry[0] > max_age:
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        if self._data.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_where(self, predicate):
+        """Drop every entry whose key matches predicate"""
+        for key in [k for k in self._data if predicate(k)]:
+            del self._data[key]
+            self.invalidations += 1
+
+    def purge_expired(self):
+        """Drop every entry older than ttl (get() only skips them)"""
+        cutoff = time.monotonic() - self.ttl
+        for key in [k for k, (stored_at, _) in self._data.items() if stored_at < cutoff]:
+            del self._data[key]
+            self.expirations += 1
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        """Whether key has an entry, expired or not (no hit / miss counted)"""
+        return key in self._data
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "expirations": self.expirations,
+        }
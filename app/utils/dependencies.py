@@ -1,24 +1,80 @@
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-
-SECRET_KEY = os.getenv("SECRET_KEY")
-ALGORITHM = os.getenv("ALGORITHM")
+from app.config import SECRET_KEY, ALGORITHM, IDENTITY_CACHE_TTL, IDENTITY_CACHE_MAX_SIZE, ADMIN_EMAILS
+from app.database import with_session
+from app.services.auth_service import TX_EVENTS_SCOPE
+from app.models.user import User
+from app.models.wallet import Wallet
+from app.utils.cache import TTLCache
 
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
+# email -> detached Wallet, so repeat requests skip the lookup entirely
+identity_cache = TTLCache(max_size=IDENTITY_CACHE_MAX_SIZE, ttl=IDENTITY_CACHE_TTL)
 
+def _decode_subject(token: str, scope: str = None):
+    """Subject of a token issued for scope (None: an access token)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("scope") != scope:
             raise HTTPException(status_code=401, detail="Invalid token")
         return email
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return _decode_subject(credentials.credentials)
+
+def get_admin_user(current_user: str = Depends(get_current_user)):
+    """get_current_user for operator endpoints: 403 unless listed in ADMIN_EMAILS"""
+    if current_user not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin only")
+    return current_user
+
+def get_query_user(token: str = Query(...)):
+    """
+    get_current_user for EventSource requests, which cannot send an
+    Authorization header: takes a stream token (POST /wallet/tx-events/token),
+    never an access token
+    """
+    return _decode_subject(token, TX_EVENTS_SCOPE)
+
+def _load_wallet(db, email: str):
+    wallet = (
+        db.query(Wallet)
+        .join(User, Wallet.user_id == User.id)
+        .filter(User.email == email)
+        .first()
+    )
+    if wallet is not None:
+        # Detached: read-only, shared between requests, never expired by a commit
+        db.expunge(wallet)
+    return wallet
+
+def get_current_wallet(current_user: str = Depends(get_current_user)) -> Wallet:
+    """
+    The caller's wallet, resolved from the JWT subject in one joined query.
+    Read in a session of its own, so no connection is held while the
+    handler awaits Horizon / Soroban.
+    """
+    if IDENTITY_CACHE_TTL > 0:
+        wallet = identity_cache.get(current_user)
+        if wallet is not None:
+            return wallet
+
+    wallet = with_session(_load_wallet, current_user)
+    if not wallet:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+
+    if IDENTITY_CACHE_TTL > 0:
+        identity_cache.set(current_user, wallet)
+    return wallet
+
+def get_stream_wallet(current_user: str = Depends(get_query_user)) -> Wallet:
+    return get_current_wallet(current_user)
+
+def invalidate_identity(email: str):
+    identity_cache.invalidate(email)
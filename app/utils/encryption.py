@@ -1,15 +1,19 @@
 from cryptography.fernet import Fernet
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.config import ENCRYPTION_KEY
 
-ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
+# Built on first use, not at import (see get_fernet)
+_fernet = None
 
-fernet = Fernet(ENCRYPTION_KEY)
+
+def get_fernet() -> Fernet:
+    global _fernet
+    if _fernet is None:
+        _fernet = Fernet(ENCRYPTION_KEY)
+    return _fernet
 
 def encrypt_secret(secret: str):
-    return fernet.encrypt(secret.encode()).decode()
+    return get_fernet().encrypt(secret.encode()).decode()
 
 def decrypt_secret(encrypted_secret: str):
-    return fernet.decrypt(encrypted_secret.encode()).decode()
+    return get_fernet().decrypt(encrypted_secret.encode()).decode()
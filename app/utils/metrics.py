@@ -0,0 +1,275 @@
+"""
+Latency histograms and counters, served on /metrics in the Prometheus
+text format.
+
+- upstream calls per phase (load_account, simulate_transaction,
+  prepare_transaction, send_transaction, submit_transaction, ...): the
+  SDK server objects are wrapped by instrument()
+- DB statements, by statement type (instrument_engine)
+- HTTP requests per route, with status counts (RequestMetricsMiddleware)
+- requests on the shared aiohttp session by connection, new or reused
+  (connection_trace_config)
+
+Values are per process: each worker reports its own.
+"""
+
+import bisect
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+import aiohttp
+from sqlalchemy import event
+
+from app.config import LOG_TIMINGS
+from app.utils.tracing import log, new_trace_id, set_trace_id, reset_trace_id, current_trace_id
+
+# Seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HORIZON_PHASES = ("load_account", "submit_transaction")
+SOROBAN_PHASES = (
+    "load_account",
+    "simulate_transaction",
+    "prepare_transaction",
+    "send_transaction",
+    "get_transaction",
+    "get_transactions",
+    "get_events",
+    "get_health",
+    "get_latest_ledger",
+    "get_ledger_entries",
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket (not cumulative)..., sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, values, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, values)} {series[-2]}")
+                lines.append(f"{self.name}_count{_labels(self.labels, values)} {series[-1]}")
+        return lines
+
+
+UPSTREAM_SECONDS = Histogram(
+    "microyield_upstream_seconds", "Horizon / Soroban RPC call latency", ("upstream", "phase", "outcome")
+)
+DB_QUERY_SECONDS = Histogram("microyield_db_query_seconds", "Database statement latency", ("statement",))
+HTTP_REQUEST_SECONDS = Histogram("microyield_http_request_seconds", "HTTP request latency", ("method", "route"))
+HTTP_REQUESTS = Counter("microyield_http_requests_total", "HTTP requests by status", ("method", "route", "status"))
+HTTP_ERRORS = Counter("microyield_http_errors_total", "HTTP requests answered with 5xx", ("method", "route"))
+UPSTREAM_CONNECTIONS = Counter(
+    "microyield_upstream_connections_total", "Horizon / Soroban RPC requests by connection (new, reused)", ("connection",)
+)
+
+REGISTRY = [UPSTREAM_SECONDS, DB_QUERY_SECONDS, HTTP_REQUEST_SECONDS, HTTP_REQUESTS, HTTP_ERRORS, UPSTREAM_CONNECTIONS]
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# =========================
+# UPSTREAM CALLS
+# =========================
+
+@contextmanager
+def upstream_call(upstream: str, phase: str):
+    """Time one Horizon / Soroban RPC call (works around an await too)"""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_SECONDS.observe(elapsed, upstream, phase, outcome)
+        # Only calls made for a request are logged, not background polling
+        if LOG_TIMINGS and current_trace_id() is not None:
+            log("upstream", upstream=upstream, phase=phase, outcome=outcome, ms=round(elapsed * 1000, 1))
+
+
+def _timed(method, upstream: str, phase: str):
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def timed(*args, **kwargs):
+            with upstream_call(upstream, phase):
+                return await method(*args, **kwargs)
+    else:
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            with upstream_call(upstream, phase):
+                return method(*args, **kwargs)
+    return timed
+
+
+def instrument(server, upstream: str, phases):
+    """Time the given methods of an SDK server object (on this instance only)"""
+    for phase in phases:
+        setattr(server, phase, _timed(getattr(server, phase), upstream, phase))
+    return server
+
+
+def connection_trace_config() -> aiohttp.TraceConfig:
+    """Counts, on the session it is passed to, requests that opened a connection vs reused one"""
+    async def created(session, context, params):
+        UPSTREAM_CONNECTIONS.inc("new")
+
+    async def reused(session, context, params):
+        UPSTREAM_CONNECTIONS.inc("reused")
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(created)
+    trace_config.on_connection_reuseconn.append(reused)
+    return trace_config
+
+
+def connection_stats():
+    """Connection reuse of the shared Horizon / Soroban RPC session"""
+    opened = UPSTREAM_CONNECTIONS.value("new")
+    reused = UPSTREAM_CONNECTIONS.value("reused")
+    requests = opened + reused
+    return {
+        "requests": requests,
+        "connections_opened": opened,
+        "reuse_ratio": round(reused / requests, 4) if requests else 0.0,
+    }
+
+
+# =========================
+# DATABASE
+# =========================
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        DB_QUERY_SECONDS.observe(elapsed, statement.lstrip().split(None, 1)[0].upper())
+
+
+# =========================
+# HTTP
+# =========================
+
+def _route_template(scope) -> str:
+    """Request path with its path parameters put back as {name}, so ids don't make new series"""
+    if scope.get("route") is None:
+        return "unmatched"
+    params = {str(value): name for name, value in (scope.get("path_params") or {}).items()}
+    return "/".join("{%s}" % params[part] if part in params else part for part in scope["path"].split("/"))
+
+
+class RequestMetricsMiddleware:
+    """
+    Gives each request a trace id (X-Request-ID in, or a new one; always
+    echoed in the response) and records its latency and status under the
+    matched route's path template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        trace_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or new_trace_id()
+        token = set_trace_id(trace_id)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", trace_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            elapsed = time.perf_counter() - start
+            path = _route_template(scope)
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(elapsed, method, path)
+            HTTP_REQUESTS.inc(method, path, str(status))
+            if status >= 500:
+                HTTP_ERRORS.inc(method, path)
+            if LOG_TIMINGS:
+                log("request", method=method, route=path, status=status, ms=round(elapsed * 1000, 1))
+            reset_trace_id(token)
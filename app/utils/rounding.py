@@ -1,12 +1,115 @@
-import math
+"""
+Round-off rules, computed exactly in integer stroops (1 XLM = 10^7 stroops).
+
+A payment is rounded up to the next whole step for its tier: 1 XLM under
+500 XLM, 10 XLM up to 10,000 XLM, 100 XLM above that. calculate_roundoff()
+is the scalar path used for single payments; roundoffs_stroops() does the
+same for a whole array of amounts (NumPy when installed, for large
+batches), e.g. a user's payment history. NumPy is imported on the first
+large batch, not with the app (~85 ms).
+"""
+
+from decimal import Decimal
+from functools import lru_cache
+
+STROOPS_PER_XLM = 10_000_000
+
+# (upper bound in stroops, inclusive?, step in stroops), checked in order
+TIERS = (
+    (500 * STROOPS_PER_XLM, False, 1 * STROOPS_PER_XLM),
+    (10_000 * STROOPS_PER_XLM, True, 10 * STROOPS_PER_XLM),
+    (None, True, 100 * STROOPS_PER_XLM),
+)
+
+# Below this many amounts the plain Python loop beats NumPy's overhead
+NUMPY_MIN_BATCH = 256
+
+
+@lru_cache(maxsize=None)
+def load_numpy():
+    """The numpy module, None when it is not installed"""
+    try:
+        import numpy
+    except ImportError:  # the scalar path and small batches don't need it
+        return None
+    return numpy
+
+
+def to_stroops(amount) -> int:
+    """Exact stroops for an XLM amount (str, Decimal, int or float, via its shortest repr)"""
+    if isinstance(amount, float):
+        amount = repr(amount)
+    return int((Decimal(amount) * STROOPS_PER_XLM).to_integral_value())
+
+
+def from_stroops(stroops: int) -> Decimal:
+    return Decimal(int(stroops)) / STROOPS_PER_XLM
 
-def calculate_roundoff(amount: float):
-    if amount < 500:
-        rounded = math.ceil(amount)
-    elif amount <= 10000:
-        rounded = math.ceil(amount / 10) * 10
-    else:
-        rounded = math.ceil(amount / 100) * 100
 
-    roundoff = rounded - amount
-    return roundoff, rounded
\ No newline at end of file
+def step_stroops(amount: int) -> int:
+    for bound, inclusive, step in TIERS:
+        if bound is None or amount < bound or (inclusive and amount == bound):
+            return step
+    raise AssertionError("unreachable")
+
+
+def roundoff_stroops(amount: int, step: int = None) -> int:
+    """Stroops needed to round amount up to its tier step (or to a fixed step)"""
+    step = step or step_stroops(amount)
+    return -amount % step
+
+
+def calculate_roundoff(amount):
+    """(roundoff, rounded) in XLM as exact Decimals"""
+    stroops = to_stroops(amount)
+    roundoff = roundoff_stroops(stroops)
+    return from_stroops(roundoff), from_stroops(stroops + roundoff)
+
+
+# =========================
+# BATCH
+# =========================
+
+def to_stroops_array(amounts):
+    """
+    Stroops for many amounts. Numeric arrays are scaled and rounded to the
+    nearest stroop, exact for any amount with at most 7 decimals below
+    ~900 million XLM; strings (Horizon's "12.3400000") are parsed exactly.
+    """
+    np = None if isinstance(amounts, (list, tuple)) else load_numpy()
+    if np is not None:
+        array = np.asarray(amounts)
+        if array.dtype.kind in "iu":
+            return array.astype(np.int64) * STROOPS_PER_XLM
+        if array.dtype.kind == "f":
+            return np.rint(array * STROOPS_PER_XLM).astype(np.int64)
+        amounts = array.tolist()
+
+    stroops = [to_stroops(amount) for amount in amounts]
+    np = load_numpy() if len(stroops) >= NUMPY_MIN_BATCH else None
+    if np is not None:
+        return np.asarray(stroops, dtype=np.int64)
+    return stroops
+
+
+def roundoffs_stroops(amounts, step: int = None):
+    """
+    Round-off in stroops for each amount (stroops). Uses the tiers unless a
+    fixed step is given; returns an int64 array for NumPy input or large
+    batches, a list otherwise.
+    """
+    small = isinstance(amounts, (list, tuple)) and len(amounts) < NUMPY_MIN_BATCH
+    np = None if small else load_numpy()
+    if np is None:
+        return [roundoff_stroops(int(amount), step) for amount in amounts]
+
+    amounts = np.asarray(amounts, dtype=np.int64)
+    if step:
+        steps = np.int64(step)
+    else:
+        # Tiers in reverse so the first matching one wins
+        steps = np.full(amounts.shape, TIERS[-1][2], dtype=np.int64)
+        for bound, inclusive, tier_step in reversed(TIERS[:-1]):
+            below = amounts <= bound if inclusive else amounts < bound
+            steps = np.where(below, tier_step, steps)
+    return -amounts % steps
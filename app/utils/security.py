@@ -1,9 +1,166 @@
-from passlib.context import CryptContext
+"""
+Password hashing with bcrypt.
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+A bcrypt hash costs tens of milliseconds of CPU, so request handlers use
+the async variants, which run on a small dedicated thread pool
+(PASSWORD_HASH_WORKERS) instead of the threadpool every other `def`
+route shares. Admission is bounded: once workers + PASSWORD_HASH_MAX_QUEUE
+calls are outstanding new ones are refused straight away (429), and a
+call that sat in the queue longer than PASSWORD_HASH_QUEUE_TIMEOUT is
+dropped without hashing (503), since its client has most likely given up.
+"""
 
-def hash_password(password: str):
-    return pwd_context.hash(password)
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+import bcrypt
+
+from app.config import (
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_MAX_QUEUE,
+    PASSWORD_HASH_QUEUE_TIMEOUT,
+)
+
+
+class PasswordHasherBusy(Exception):
+    """The hashing pool can't take the call; status_code is 429 (full) or 503 (timed out in queue)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _secret(password: str) -> bytes:
+    # bcrypt only uses the first 72 bytes; newer bcrypt releases refuse longer input
+    return password.encode("utf-8")[:72]
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds)).decode()
+
+
+def verify_password(plain_password, hashed_password) -> bool:
+    if not hashed_password:
+        # Provisioned users that have not set a password yet
+        return False
+    try:
+        return bcrypt.checkpw(_secret(plain_password), hashed_password.encode())
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True for hashes made with a lower cost than BCRYPT_ROUNDS ("$2b$<rounds>$...")"""
+    try:
+        return int(hashed_password.split("$")[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def _verify_and_update(plain_password, hashed_password):
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, hash_password(plain_password)
+    return True, None
+
+
+# =========================
+# BOUNDED EXECUTOR
+# =========================
+
+_executor = None
+_outstanding = 0
+_stats = {"accepted": 0, "completed": 0, "rejected_full": 0, "expired": 0, "rehashed": 0}
+_queue_wait = deque(maxlen=1000)
+_run_time = deque(maxlen=1000)
+# Returned by _timed for a call that expired in the queue
+_expired = object()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash",
+        )
+    return _executor
+
+
+def _timed(submitted: float, func, *args):
+    started = time.perf_counter()
+    _queue_wait.append(started - submitted)
+    if started - submitted > PASSWORD_HASH_QUEUE_TIMEOUT:
+        return _expired
+
+    result = func(*args)
+    _run_time.append(time.perf_counter() - started)
+    return result
+
+
+async def _run(func, *args):
+    global _outstanding
+    if _outstanding >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE:
+        _stats["rejected_full"] += 1
+        raise PasswordHasherBusy(429, "Too many concurrent logins, retry shortly")
+
+    _outstanding += 1
+    _stats["accepted"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(get_executor(), _timed, time.perf_counter(), func, *args)
+    finally:
+        _outstanding -= 1
+
+    if result is _expired:
+        _stats["expired"] += 1
+        raise PasswordHasherBusy(503, "Login service overloaded, retry shortly")
+
+    _stats["completed"] += 1
+    return result
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(hash_password, password)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    """(valid, new_hash) - new_hash is set when the stored hash should be upgraded"""
+    valid, new_hash = await _run(_verify_and_update, plain_password, hashed_password)
+    if new_hash:
+        _stats["rehashed"] += 1
+    return valid, new_hash
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+
+
+def _percentile_ms(samples, q: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 2)
+
+
+def hasher_stats():
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_queue": PASSWORD_HASH_MAX_QUEUE,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        "outstanding": _outstanding,
+        **_stats,
+        "queue_wait_p50_ms": _percentile_ms(_queue_wait, 0.5),
+        "queue_wait_p99_ms": _percentile_ms(_queue_wait, 0.99),
+        "hash_p50_ms": _percentile_ms(_run_time, 0.5),
+        "hash_p99_ms": _percentile_ms(_run_time, 0.99),
+    }
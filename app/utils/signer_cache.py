@@ -0,0 +1,62 @@
+"""
+Decrypted signing keypairs, so active wallets skip the Fernet decrypt and
+the key derivation on every signed request.
+
+Entries are keyed by wallet id and stored with the ciphertext they were
+decrypted from; a wallet whose encrypted_secret changed (key rotation) is
+decrypted again rather than served the old key. The cache lives in this
+process's memory only - it is never pickled or written anywhere - is
+strictly size-bounded, and expired entries are dropped rather than left
+behind until they are overwritten.
+"""
+
+from functools import lru_cache
+
+from stellar_sdk import Keypair
+
+from app.config import SIGNER_CACHE_TTL, SIGNER_CACHE_MAX_SIZE
+from app.utils.cache import TTLCache
+from app.utils.encryption import decrypt_secret
+
+signer_cache = TTLCache(max_size=SIGNER_CACHE_MAX_SIZE, ttl=SIGNER_CACHE_TTL)
+
+
+def get_signer(wallet) -> Keypair:
+    """Keypair of a custodial wallet, decrypted at most once per SIGNER_CACHE_TTL"""
+    if SIGNER_CACHE_TTL <= 0:
+        return Keypair.from_secret(decrypt_secret(wallet.encrypted_secret))
+
+    entry = signer_cache.get(wallet.id)
+    if entry is not None:
+        encrypted_secret, keypair = entry
+        if encrypted_secret == wallet.encrypted_secret:
+            return keypair
+        # Rotated since it was cached
+        signer_cache.invalidate(wallet.id)
+
+    # Misses already pay for a decrypt, so this is where stale keys are cleared
+    signer_cache.purge_expired()
+    keypair = Keypair.from_secret(decrypt_secret(wallet.encrypted_secret))
+    signer_cache.set(wallet.id, (wallet.encrypted_secret, keypair))
+    return keypair
+
+
+def evict_signer(wallet_id: int):
+    signer_cache.invalidate(wallet_id)
+
+
+def signer_stats():
+    return signer_cache.stats()
+
+
+def to_keypair(signer) -> Keypair:
+    """Signing helpers take either a secret seed or an already derived Keypair"""
+    if isinstance(signer, Keypair):
+        return signer
+    return Keypair.from_secret(signer)
+
+
+@lru_cache(maxsize=None)
+def system_keypair(secret: str) -> Keypair:
+    """Keypair of a configured system account (vault, issuer, contract admin), derived once"""
+    return Keypair.from_secret(secret)
@@ -0,0 +1,43 @@
+"""
+Request trace ids and structured (JSON line) logs.
+
+Every HTTP request gets a trace id (the caller's X-Request-ID, or a new
+one; see metrics.RequestMetricsMiddleware) kept in a context variable, so
+log() lines written while handling it - upstream calls, and background
+tasks it starts, which copy the context - carry the same id.
+"""
+
+import json
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+
+_trace_id = ContextVar("trace_id", default=None)
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+def set_trace_id(trace_id: str):
+    """Returns a token for reset_trace_id"""
+    return _trace_id.set(trace_id)
+
+
+def reset_trace_id(token):
+    _trace_id.reset(token)
+
+
+def log(event: str, **fields):
+    """One JSON line on stdout: time, event, trace id and fields"""
+    record = {
+        "ts": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
+        "event": event,
+        "trace_id": _trace_id.get(),
+        **fields,
+    }
+    print(json.dumps(record, default=str))
@@ -0,0 +1,78 @@
+"""
+Sync vs async Stellar service under concurrency.
+
+Sync routes run in Starlette's threadpool (40 threads by default), so
+send_xlm throughput caps at ~40 in-flight payments. The async service keeps
+everything on the event loop and scales with the HTTP pool instead.
+
+Run from the repo root:
+    python -m benchmarks.bench_async_routes [--requests 400] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+async def run_sync(send_xlm, payments):
+    import anyio
+
+    # Same limiter FastAPI uses for `def` routes
+    limiter = anyio.to_thread.current_default_thread_limiter()
+
+    async def one(secret, destination):
+        await anyio.to_thread.run_sync(
+            lambda: send_xlm(secret, destination, "1"), limiter=limiter
+        )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(s, d) for s, d in payments))
+    return time.perf_counter() - start, limiter.total_tokens
+
+
+async def run_async(send_xlm, close_clients, payments):
+    start = time.perf_counter()
+    await asyncio.gather(*(send_xlm(s, d, "1") for s, d in payments))
+    elapsed = time.perf_counter() - start
+    await close_clients()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency) as stub:
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+
+        from stellar_sdk import Keypair
+        from app.services import stellar_service, stellar_service_async
+
+        payments = [
+            (Keypair.random().secret, Keypair.random().public_key)
+            for _ in range(args.requests)
+        ]
+
+        sync_elapsed, threads = asyncio.run(run_sync(stellar_service.send_xlm, payments))
+        stub.reset_counters()
+        async_elapsed = asyncio.run(
+            run_async(
+                stellar_service_async.send_xlm,
+                stellar_service_async.close_clients,
+                payments,
+            )
+        )
+
+    print(f"{args.requests} payments, {args.latency * 1000:.0f} ms per upstream call")
+    print(f"sync  (threadpool={threads}): {sync_elapsed:7.2f}s  {args.requests / sync_elapsed:8.1f} req/s")
+    print(f"async (pool={stellar_service_async.STELLAR_HTTP_POOL_SIZE}):       {async_elapsed:7.2f}s  {args.requests / async_elapsed:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
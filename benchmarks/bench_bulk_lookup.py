@@ -0,0 +1,76 @@
+"""
+Bulk vault summary lookups: one simulate per user vs the bounded,
+deduplicated fan-out behind POST /vault/summaries, plus a burst of
+identical concurrent lookups for one user.
+
+Run from the repo root:
+    python -m benchmarks.bench_bulk_lookup [--users 200] [--burst 100] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency) as stub:
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+
+        from stellar_sdk import Keypair
+        from app.services import balance_cache, stellar_service_async
+        from app.services.bulk_lookup import stream_summaries
+
+        keys = [Keypair.random().public_key for _ in range(args.users)]
+        rows = []
+
+        async def one_by_one():
+            for key in keys:
+                await stellar_service_async.fetch_user_summary(key)
+
+        async def bulk():
+            first = None
+            start = time.perf_counter()
+            async for _ in stream_summaries(keys):
+                first = first or time.perf_counter() - start
+            return first
+
+        async def burst():
+            hot_key = Keypair.random().public_key
+            await asyncio.gather(*(balance_cache.get_user_summary(hot_key) for _ in range(args.burst)))
+
+        for name, scenario in (
+            (f"{args.users} users, one simulate each", one_by_one),
+            (f"{args.users} users, bulk stream", bulk),
+            (f"{args.burst} identical concurrent lookups", burst),
+        ):
+            balance_cache.summary_cache.clear()
+            stub.reset_counters()
+
+            async def run():
+                start = time.perf_counter()
+                first = await scenario()
+                elapsed = time.perf_counter() - start
+                await stellar_service_async.close_clients()
+                return elapsed, first
+
+            elapsed, first = asyncio.run(run())
+            rows.append((name, elapsed, first, stub.requests["rpc.simulateTransaction"]))
+
+    print(f"{args.latency * 1000:.0f} ms per upstream call")
+    for name, elapsed, first, simulations in rows:
+        first_text = f"  first result after {first * 1000:.0f} ms" if first else ""
+        print(f"{name:38s}: {elapsed:6.2f}s  {simulations:4d} simulations{first_text}")
+
+
+if __name__ == "__main__":
+    main()
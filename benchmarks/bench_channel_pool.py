@@ -0,0 +1,86 @@
+"""
+Vault payouts with the vault as transaction source vs channel accounts.
+
+The stub closes a ledger every --ledger-close seconds and, like the
+network, takes at most one transaction per source account into each
+ledger. --payouts payouts go through the payout batcher (up to
+--ops-per-tx per transaction) with no channels, then with pools of
+increasing size; the channels are first created from the vault, as the
+deploy step (python -m app.services.channel_pool create N) would. Reports the time until every payout is in a ledger.
+
+Run from the repo root:
+    python -m benchmarks.bench_channel_pool [--payouts 2000] [--pools 0,2,4,8,16] [--ledger-close 1]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payouts", type=int, default=2000)
+    parser.add_argument("--ops-per-tx", type=int, default=100)
+    parser.add_argument("--pools", default="0,2,4,8,16")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--ledger-close", type=float, default=1)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/channels.db"
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+
+        from stellar_sdk import Keypair
+        from app.config import VAULT_PUBLIC_KEY, VAULT_SECRET_KEY
+        from app.database import Base, engine
+        from app.models import channel_account  # noqa: F401
+        from app.services import channel_pool, stellar_service_async
+        from app.services.payout_batcher import PayoutBatcher
+
+        Base.metadata.create_all(bind=engine)
+        # Transactions here wait for a ledger with room for their source, a higher fee won't help
+        stellar_service_async.FEE_BUMP_AFTER = 0
+        stub.ledger_close = args.ledger_close
+        stub.auto_create_accounts = False
+        stub.add_account(VAULT_PUBLIC_KEY, "1000000")
+
+        print(f"{args.payouts} vault payouts, up to {args.ops_per_tx} per transaction, "
+              f"a ledger every {args.ledger_close:g} s\n")
+        print(f"{'channels':>8} {'setup':>8} {'payouts in':>11} {'payouts/s':>10} {'transactions':>13} {'lease waits':>12}")
+
+        for size in (int(size) for size in args.pools.split(",")):
+            destinations = [Keypair.random().public_key for _ in range(args.payouts)]
+
+            async def run():
+                try:
+                    start = time.perf_counter()
+                    pool = None
+                    if size:
+                        await channel_pool.create_channels(size - channel_pool._channel_report()["funded"])
+                        pool = await channel_pool.open_channels(size)
+                        await channel_pool.check_channels(pool)
+                    setup = time.perf_counter() - start
+
+                    stub.reset_counters()
+                    batcher = PayoutBatcher(VAULT_SECRET_KEY, window_ms=20, max_ops=args.ops_per_tx)
+                    start = time.perf_counter()
+                    await asyncio.gather(*(batcher.pay(destination, 1) for destination in destinations))
+                    elapsed = time.perf_counter() - start
+                    await batcher.close()
+                    return setup, elapsed, pool.stats() if pool else {}
+                finally:
+                    await channel_pool.stop_channel_pool()
+                    await stellar_service_async.close_clients()
+
+            setup, elapsed, stats = asyncio.run(run())
+            print(f"{size:>8} {setup:>7.2f}s {elapsed:>10.2f}s {args.payouts / elapsed:>10.0f} "
+                  f"{stub.submitted_transactions:>13} {stats.get('waits', 0):>12}")
+
+
+if __name__ == "__main__":
+    main()
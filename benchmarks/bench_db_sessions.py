@@ -0,0 +1,214 @@
+"""
+Load test for the request database path.
+
+1. Queries per request: authenticated requests go through the ASGI app
+   (with the stub network behind it), and every SQL statement is counted.
+   The old two-query user -> wallet lookup is shown for comparison.
+2. Lock contention: several processes book round-offs and read reports
+   against one SQLite file, first with the old engine settings (rollback
+   journal), then with the app's engine (WAL + busy_timeout).
+
+Run from the repo root:
+    python -m benchmarks.bench_db_sessions [--users 50] [--requests 400] [--processes 4] [--writes 200]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import Counter
+from decimal import Decimal
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+def seed(users: int):
+    from stellar_sdk import Keypair
+    from app.database import Base, engine, SessionLocal
+    from app.models.user import User
+    from app.models.wallet import Wallet
+    from app.utils.encryption import encrypt_secret
+
+    import app.main  # noqa: F401  (registers every model)
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    emails = []
+    for i in range(users):
+        user = User(email=f"load{i}@microyield.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        keypair = Keypair.random()
+        db.add(Wallet(user_id=user.id, public_key=keypair.public_key, encrypted_secret=encrypt_secret(keypair.secret)))
+        emails.append(user.email)
+    db.commit()
+    db.close()
+    return emails
+
+
+def count_queries(engine):
+    counter = Counter()
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter["queries"] += 1
+
+    return counter
+
+
+def legacy_lookup(email: str):
+    """The per-handler lookup the routes used to do"""
+    from app.database import SessionLocal
+    from app.models.user import User
+    from app.models.wallet import Wallet
+
+    db = SessionLocal()
+    user = db.query(User).filter(User.email == email).first()
+    wallet = db.query(Wallet).filter(Wallet.user_id == user.id).first()
+    db.close()
+    return wallet
+
+
+async def run_requests(emails, total: int, method: str, path: str, body=None):
+    """total requests, one in flight per user at a time (payments share a sequence number)"""
+    import httpx
+    from app.main import app
+    from app.services import stellar_service_async
+    from app.services.auth_service import create_access_token
+
+    tokens = [create_access_token({"sub": email}) for email in emails]
+    transport = httpx.ASGITransport(app=app)
+    statuses = Counter()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+        async def one(token):
+            response = await client.request(method, path, json=body, headers={"Authorization": f"Bearer {token}"})
+            statuses[response.status_code] += 1
+
+        for start in range(0, total, len(tokens)):
+            await asyncio.gather(*(one(token) for token in tokens[:total - start]))
+
+    await stellar_service_async.close_clients()
+    return statuses
+
+
+def contention_worker(database_url: str, legacy: bool, writes: int, queue):
+    os.environ["DATABASE_URL"] = database_url
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.models.user import User  # noqa: F401  (Wallet.user relationship)
+    from app.models.wallet import Wallet
+    from app.services.roundoff_ledger import record_roundoff, roundoff_report
+
+    if legacy:
+        engine = create_engine(database_url, connect_args={"check_same_thread": False})
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    else:
+        from app.database import SessionLocal as Session
+
+    errors = 0
+    latencies = []
+    db = Session()
+    wallets = db.query(Wallet).all()
+    for i in range(writes):
+        wallet = wallets[i % len(wallets)]
+        start = time.perf_counter()
+        try:
+            record_roundoff(db, wallet, Decimal("0.37"), f"hash{i}")
+            roundoff_report(db, wallet.public_key, limit=5)
+            db.commit()
+        except Exception:
+            errors += 1
+            db.rollback()
+        latencies.append(time.perf_counter() - start)
+    db.close()
+    queue.put((errors, latencies))
+
+
+def run_contention(database_url: str, legacy: bool, processes: int, writes: int):
+    ctx = multiprocessing.get_context("spawn")
+    seed_process = ctx.Process(target=_seed_only, args=(database_url,))
+    seed_process.start()
+    seed_process.join()
+
+    queue = ctx.Queue()
+    workers = [
+        ctx.Process(target=contention_worker, args=(database_url, legacy, writes, queue))
+        for _ in range(processes)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    results = [queue.get(timeout=600) for _ in workers]
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    errors = sum(r[0] for r in results)
+    latencies = sorted(l for r in results for l in r[1])
+    return elapsed, errors, latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=0.005) as stub, tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/load.db"
+        os.environ["DATABASE_URL"] = database_url
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+        # A log line per request and upstream call would be measured too
+        os.environ.setdefault("LOG_TIMINGS", "false")
+
+        emails = seed(args.users)
+
+        from app.database import engine
+        from app.utils.dependencies import identity_cache
+        counter = count_queries(engine)
+
+        for email in emails:
+            legacy_lookup(email)
+        print(f"old user -> wallet lookup          : {counter['queries'] / len(emails):.2f} queries")
+
+        from stellar_sdk import Keypair
+        merchant = Keypair.random().public_key
+        scenarios = (
+            ("GET /wallet/my-wallet", "GET", "/wallet/my-wallet", None),
+            ("GET /wallet/balance", "GET", "/wallet/balance", None),
+            ("POST /wallet/pay (invest)", "POST", "/wallet/pay",
+             {"destination": merchant, "amount": 1.3, "roundoff_option": "invest"}),
+        )
+        for cache_ttl in (0, 30):
+            identity_cache.ttl = cache_ttl
+            for name, method, path, body in scenarios:
+                identity_cache.clear()
+                counter.clear()
+                start = time.perf_counter()
+                statuses = asyncio.run(run_requests(emails, args.requests, method, path, body))
+                elapsed = time.perf_counter() - start
+                print(f"{name:27s} cache={cache_ttl:<3}: {counter['queries'] / args.requests:.2f} queries/request"
+                      f"  {args.requests / elapsed:6.0f} req/s  {dict(statuses)}")
+
+    print(f"\n{args.processes} processes x {args.writes} round-off writes + reports on one SQLite file")
+    for name, legacy in (("rollback journal (old engine)", True), ("WAL + busy_timeout", False)):
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = f"sqlite:///{tmp}/contention.db"
+            elapsed, errors, p99 = run_contention(database_url, legacy, args.processes, args.writes)
+        print(f"{name:30s}: {elapsed:6.2f}s  {errors:4d} 'database is locked' errors  p99 {p99 * 1000:.0f} ms")
+
+
+def _seed_only(database_url: str):
+    os.environ["DATABASE_URL"] = database_url
+    seed(20)
+
+
+if __name__ == "__main__":
+    main()
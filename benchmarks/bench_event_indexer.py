@@ -0,0 +1,98 @@
+"""
+Replays recorded contract events through the indexer and compares
+user summary reads from the local index with simulate_transaction.
+
+The getEvents fixture is served by the stub RPC; indexed positions are
+checked against the fixture's expected_positions, first after a full
+sync (paged) and again after rewinding to a mid-range ledger.
+
+Run from the repo root:
+    python -m benchmarks.bench_event_indexer [--reads 200] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+FIXTURE = Path(__file__).parent / "fixtures" / "contract_events.json"
+
+
+def check_positions(db, expected):
+    from app.models.contract_event import VaultPosition
+
+    for public_key, want in expected.items():
+        position = db.get(VaultPosition, public_key)
+        got = {
+            "xlm_balance": position.xlm_balance,
+            "usdc_principal": position.usdc_principal,
+            "usdc_yield": position.usdc_yield,
+        }
+        if got != want:
+            raise SystemExit(f"Position mismatch for {public_key}: {got} != {want}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    fixture = json.loads(FIXTURE.read_text())
+    events = fixture["result"]["events"]
+
+    with StubStellarNetwork(latency=args.latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        stub.events = events
+        stub.ledger = fixture["result"]["latestLedger"]
+
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/indexer.db"
+
+        from app.database import Base, engine, SessionLocal
+        from app.models import contract_event  # noqa: F401
+        from app.services import event_indexer, stellar_service_async
+
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+
+        synced = event_indexer.sync(limit=5)
+        check_positions(db, fixture["expected_positions"])
+        print(f"sync: {synced['applied']} events applied in {stub.requests['rpc.getEvents']} getEvents pages")
+
+        mid_ledger = events[len(events) // 2]["ledger"]
+        rewound = event_indexer.rewind(db, mid_ledger)
+        replayed = event_indexer.sync(limit=5)
+        check_positions(db, fixture["expected_positions"])
+        print(f"replay from ledger {mid_ledger}: {rewound} undone, {replayed['applied']} re-applied")
+
+        users = list(fixture["expected_positions"])
+        keys = [users[i % len(users)] for i in range(args.reads)]
+
+        start = time.perf_counter()
+        for key in keys:
+            event_indexer.get_user_summary(db, key)
+        index_elapsed = time.perf_counter() - start
+
+        async def simulate_reads():
+            for key in keys:
+                await stellar_service_async.fetch_user_summary(key)
+            await stellar_service_async.close_clients()
+
+        start = time.perf_counter()
+        asyncio.run(simulate_reads())
+        rpc_elapsed = time.perf_counter() - start
+        db.close()
+
+    print(f"{args.reads} user summary reads, {args.latency * 1000:.0f} ms per upstream call")
+    print(f"local index        : {index_elapsed / args.reads * 1e6:9.1f} us/read")
+    print(f"simulate_transaction: {rpc_elapsed / args.reads * 1e6:9.1f} us/read")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Payments during a fee surge: base_fee=100 on every transaction (what the
+builders used to do), the same with fee-bump resubmission, and fees
+picked from Horizon fee_stats.
+
+The stub only includes transactions bidding at least --surge-fee stroops
+per operation; lower bids wait until Horizon gives up (504 after
+--horizon-timeout seconds). Every user sends one payment. Reports how many
+landed, how long they took and the fees charged.
+
+Run from the repo root:
+    python -m benchmarks.bench_fees [--users 200] [--surge-fee 1000] [--bump-after 1]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+async def send_payments(keypairs):
+    from stellar_sdk import Keypair
+    from app.services.stellar_service_async import send_xlm
+
+    async def one(keypair):
+        start = time.perf_counter()
+        try:
+            await send_xlm(keypair, Keypair.random().public_key, 1)
+            outcome = "landed"
+        except Exception as e:
+            outcome = type(e).__name__
+        return outcome, time.perf_counter() - start
+
+    return await asyncio.gather(*(one(keypair) for keypair in keypairs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--surge-fee", type=int, default=1000)
+    parser.add_argument("--horizon-timeout", type=float, default=3)
+    parser.add_argument("--bump-after", type=float, default=1)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/fees.db"
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+        stub.surge_fee = args.surge_fee
+        stub.horizon_timeout = args.horizon_timeout
+
+        from stellar_sdk import Keypair
+        from app.services import fee_strategy, stellar_service_async
+
+        print(f"{args.users} payments, surge fee {args.surge_fee} stroops per operation, "
+              f"Horizon times out after {args.horizon_timeout:.0f} s\n")
+
+        setups = (
+            ("base_fee=100", 100, 0),
+            ("base_fee=100 + fee-bump", 100, args.bump_after),
+            ("fee_stats + fee-bump", fee_strategy.FEE_MAX, args.bump_after),
+        )
+        for label, fee_max, bump_after in setups:
+            # Capping the bid at 100 reproduces the old fixed fee
+            fee_strategy.FEE_MAX = fee_max
+            stellar_service_async.FEE_BUMP_AFTER = bump_after
+            stub.reset_counters()
+            bumps_before = fee_strategy.fee_strategy_stats()["bumps"]
+
+            async def run():
+                try:
+                    return await send_payments([Keypair.random() for _ in range(args.users)])
+                finally:
+                    await stellar_service_async.close_clients()
+
+            results = asyncio.run(run())
+            outcomes = Counter(outcome for outcome, _ in results)
+            landed = sorted(elapsed for outcome, elapsed in results if outcome == "landed")
+            stats = fee_strategy.fee_strategy_stats()
+
+            print(label)
+            print(f"  outcomes              : {dict(outcomes)}")
+            if landed:
+                print(f"  landed after          : p50 {landed[len(landed) // 2]:.2f} s, "
+                      f"max {landed[-1]:.2f} s")
+            print(f"  fee-bumps submitted   : {stats['bumps'] - bumps_before}")
+            print(f"  submissions to Horizon: {stub.requests['horizon.submit']}")
+            print(f"  fees charged          : {stub.fees_charged} stroops "
+                  f"({stub.fees_charged / max(len(landed), 1):.0f} per landed payment)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Client retries during upstream slowness, with and without Idempotency-Key.
+
+Every user makes one /wallet/pay. Horizon is slow, so the client gives up
+after --client-timeout and sends the request again (up to --attempts
+times); like a real server, the abandoned request keeps running. Reports
+how many transactions reached Horizon and how many payments went out more
+than once.
+
+Run from the repo root:
+    python -m benchmarks.bench_idempotency [--users 50] [--latency 0.4] [--client-timeout 0.5]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from collections import Counter
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+async def run_clients(app, tokens, destinations, attempts: int, client_timeout: float, use_key: bool):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=None) as client:
+        async def one(token, destination):
+            headers = {"Authorization": f"Bearer {token}"}
+            if use_key:
+                headers["Idempotency-Key"] = str(uuid.uuid4())
+            body = {"destination": destination, "amount": 1.5, "roundoff_option": "invest"}
+
+            start = time.perf_counter()
+            requests = []
+            for attempt in range(attempts):
+                request = asyncio.ensure_future(client.post("/wallet/pay", json=body, headers=headers))
+                requests.append(request)
+                last = attempt == attempts - 1
+                try:
+                    # The server keeps working on a request the client gave up on
+                    response = await asyncio.wait_for(asyncio.shield(request), None if last else client_timeout)
+                    break
+                except asyncio.TimeoutError:
+                    continue
+            elapsed = time.perf_counter() - start
+            await asyncio.gather(*requests, return_exceptions=True)
+            return response.status_code, elapsed, len(requests)
+
+        return await asyncio.gather(*(one(t, d) for t, d in zip(tokens, destinations)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.4)
+    parser.add_argument("--client-timeout", type=float, default=0.5)
+    parser.add_argument("--attempts", type=int, default=3)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/idempotency.db"
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+        # A log line per request and upstream call would be measured too
+        os.environ.setdefault("LOG_TIMINGS", "false")
+
+        from benchmarks.bench_db_sessions import seed
+        emails = seed(args.users)
+
+        from stellar_sdk import Keypair
+        from app.main import app
+        from app.services import stellar_service_async
+        from app.services.auth_service import create_access_token
+        from app.services.idempotency import idempotency_stats
+
+        tokens = [create_access_token({"sub": email}) for email in emails]
+        print(f"{args.users} users, {args.latency * 1000:.0f} ms per upstream call, client retries after "
+              f"{args.client_timeout * 1000:.0f} ms (up to {args.attempts} attempts)\n")
+
+        for use_key in (False, True):
+            destinations = [Keypair.random().public_key for _ in tokens]
+            stub.reset_counters()
+            payments_before = len(stub.payments)
+
+            async def run():
+                try:
+                    return await run_clients(app, tokens, destinations, args.attempts, args.client_timeout, use_key)
+                finally:
+                    await stellar_service_async.close_clients()
+
+            results = asyncio.run(run())
+            paid = Counter(p["to"] for p in stub.payments[payments_before:] if p["to"] in set(destinations))
+            statuses = Counter(status for status, _, _ in results)
+            sent = sum(requests for _, _, requests in results)
+            elapsed = sorted(elapsed for _, elapsed, _ in results)
+
+            print("with Idempotency-Key" if use_key else "without key")
+            print(f"  requests sent by clients      : {sent} for {len(results)} payments")
+            print(f"  transactions sent to Horizon  : {stub.requests['horizon.submit']}")
+            print(f"  merchants paid more than once : {sum(1 for count in paid.values() if count > 1)}")
+            print(f"  final responses               : {dict(statuses)}, p50 {elapsed[len(elapsed) // 2]:.2f} s")
+
+        stats = idempotency_stats()
+        print(f"\nreplayed {stats['replayed']}, shared with the in-flight original {stats['shared']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Login storm: bcrypt verification inline in a `def` route (the old
+/auth/login) vs the bounded password-hashing pool, measured by login
+throughput and by the latency of other requests (GET /wallet/my-wallet,
+a `def` route on the shared threadpool) while the storm is running.
+
+Also checks that a hash stored with a lower cost is upgraded on login.
+
+Run from the repo root:
+    python -m benchmarks.bench_login [--clients 50] [--rounds 10] [--probes 30]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+PASSWORD = "password123"
+
+
+def seed(users: int, hashed: str):
+    from stellar_sdk import Keypair
+    from app.database import Base, engine, SessionLocal
+    from app.models.user import User
+    from app.models.wallet import Wallet
+
+    import app.main  # noqa: F401  (registers every model)
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    emails = []
+    for i in range(users):
+        user = User(email=f"login{i}@microyield.com", hashed_password=hashed)
+        db.add(user)
+        db.flush()
+        db.add(Wallet(user_id=user.id, public_key=Keypair.random().public_key, encrypted_secret="x"))
+        emails.append(user.email)
+    db.commit()
+    db.close()
+    return emails
+
+
+def add_inline_login(app):
+    """The old handler: verify_password on the shared threadpool, no admission control"""
+    from fastapi import Depends, HTTPException
+    from app.database import get_db
+    from app.models.user import User
+    from app.schemas.user import LoginRequest
+    from app.services.auth_service import create_access_token
+    from app.utils.security import verify_password
+
+    @app.post("/bench/login-inline")
+    def login_inline(data: LoginRequest, db=Depends(get_db)):
+        user = db.query(User).filter(User.email == data.email).first()
+        if not user or not verify_password(data.password, user.hashed_password):
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        return {"access_token": create_access_token(data={"sub": user.email})}
+
+
+async def storm(login_path: str, emails, clients: int, probes: int):
+    """clients log in back to back (backing off on 429 / 503) while the probes run"""
+    import httpx
+    from app.main import app
+    from app.services.auth_service import create_access_token
+
+    token = create_access_token({"sub": emails[0]})
+    statuses = Counter()
+    probe_latencies = []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app", timeout=None) as client:
+        async def login_client(i):
+            while not done.is_set():
+                response = await client.post(login_path, json={"email": emails[i % len(emails)], "password": PASSWORD})
+                statuses[response.status_code] += 1
+                if response.status_code in (429, 503):
+                    await asyncio.sleep(0.1)
+
+        async def probe():
+            for _ in range(probes):
+                start = time.perf_counter()
+                await client.get("/wallet/my-wallet", headers={"Authorization": f"Bearer {token}"})
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        async def probes_then_stop():
+            await asyncio.gather(probe(), probe())
+            done.set()
+
+        start = time.perf_counter()
+        await asyncio.gather(probes_then_stop(), *(login_client(i) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    probe_latencies.sort()
+    return elapsed, statuses, probe_latencies
+
+
+def percentile_ms(ordered, q: float):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--probes", type=int, default=30)
+    args = parser.parse_args()
+
+    with StubStellarNetwork() as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/login.db"
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+        # A log line per request and upstream call would be measured too
+        os.environ.setdefault("LOG_TIMINGS", "false")
+
+        from app.main import app
+        from app.utils import security
+
+        start = time.perf_counter()
+        hashed = security.hash_password(PASSWORD)
+        hash_ms = (time.perf_counter() - start) * 1000
+        emails = seed(args.users, hashed)
+        add_inline_login(app)
+
+        print(f"bcrypt cost {args.rounds}: {hash_ms:.0f} ms per hash, {os.cpu_count()} CPUs, "
+              f"{security.PASSWORD_HASH_WORKERS} hashing workers, queue {security.PASSWORD_HASH_MAX_QUEUE}")
+        print(f"{args.clients} clients logging in back to back during 2 x {args.probes} GET /wallet/my-wallet probes\n")
+
+        _, _, idle = asyncio.run(storm("/auth/login", emails, 0, args.probes))
+        print(f"{'no logins':24s}: {'':48s}probe p50 {percentile_ms(idle, 0.5):6.1f} ms  p99 {percentile_ms(idle, 0.99):7.1f} ms")
+
+        for name, path in (("inline (old /auth/login)", "/bench/login-inline"), ("bounded hashing pool", "/auth/login")):
+            elapsed, statuses, probes = asyncio.run(storm(path, emails, args.clients, args.probes))
+            print(f"{name:24s}: {statuses[200] / elapsed:5.1f} logins/s  {dict(statuses)!s:32s}"
+                  f"probe p50 {percentile_ms(probes, 0.5):6.1f} ms  p99 {percentile_ms(probes, 0.99):7.1f} ms")
+
+        # A hash with a lower cost is upgraded on the next successful login
+        from app.database import SessionLocal
+        from app.models.user import User
+
+        db = SessionLocal()
+        user = db.query(User).filter(User.email == emails[0]).first()
+        user.hashed_password = security.hash_password(PASSWORD, rounds=4)
+        db.commit()
+
+        async def login_once():
+            import httpx
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as client:
+                return await client.post("/auth/login", json={"email": emails[0], "password": PASSWORD})
+
+        response = asyncio.run(login_once())
+        db.expire_all()
+        upgraded = db.query(User).filter(User.email == emails[0]).first().hashed_password
+        db.close()
+        print(f"\nrehash on login: {response.status_code}, cost 4 -> {upgraded.split('$')[2]}")
+        print(security.hasher_stats())
+        security.shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Vault payouts one transaction each vs coalesced by PayoutBatcher.
+
+Run from the repo root:
+    python -m benchmarks.bench_payout_batcher [--payouts 1000] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+async def run(pay, close_clients, destinations):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(pay(d, "1") for d in destinations), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    await close_clients()
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    return elapsed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payouts", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency) as stub:
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+
+        from stellar_sdk import Keypair
+        from app.config import VAULT_SECRET_KEY
+        from app.services import payout_batcher, stellar_service_async
+
+        destinations = [Keypair.random().public_key for _ in range(args.payouts)]
+
+        async def single(destination, amount):
+            return await stellar_service_async.send_xlm(VAULT_SECRET_KEY, destination, amount)
+
+        async def close_batched():
+            await payout_batcher.close_vault_batcher()
+            await stellar_service_async.close_clients()
+
+        rows = []
+        for name, pay, close in (
+            ("one tx per payout", single, stellar_service_async.close_clients),
+            ("batched", payout_batcher.vault_payout, close_batched),
+        ):
+            stub.reset_counters()
+            elapsed, failed = asyncio.run(run(pay, close, destinations))
+            rows.append((name, elapsed, failed, stub.submitted_transactions, stub.requests["horizon.submit"]))
+
+    print(f"{args.payouts} vault payouts, {args.latency * 1000:.0f} ms per upstream call")
+    for name, elapsed, failed, txs, submits in rows:
+        print(f"{name:18s}: {elapsed:6.2f}s  {txs:5d} transactions  {submits:5d} submit calls  {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Bulk wallet provisioning vs one wallet at a time.
+
+1. Users + wallets: the /wallet/create path (Keypair.random, encrypt, one
+   commit per wallet) vs create_run() (process pool keys, bulk inserts).
+2. Funding: Friendbot one account at a time vs batched create_account
+   transactions from the treasury.
+3. Resume: a run is interrupted after a few funding transactions, some of
+   its accounts are made to exist already (as if a submission landed but
+   its response was lost), and fund_run() finishes it.
+
+Run from the repo root:
+    python -m benchmarks.bench_provisioning [--users 5000] [--processes 4] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from stellar_sdk import Keypair
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--sample", type=int, default=300, help="wallets for the one-at-a-time paths")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency) as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/provisioning.db"
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+        os.environ["FRIENDBOT_URL"] = stub.friendbot_url
+        os.environ.setdefault("TREASURY_SECRET_KEY", Keypair.random().secret)
+
+        import app.main  # noqa: F401  (registers every model)
+        from app.database import Base, engine, SessionLocal
+        from app.models.user import User
+        from app.models.wallet import Wallet
+        from app.models.provisioning import ProvisionedAccount
+        from app.services import provisioning, stellar_service_async
+        from app.services.stellar_service import generate_stellar_wallet
+        from app.utils.encryption import encrypt_secret
+
+        Base.metadata.create_all(bind=engine)
+        print(f"{os.cpu_count()} CPUs, {args.latency * 1000:.0f} ms per upstream call\n")
+
+        # 1. users + wallets
+        db = SessionLocal()
+        start = time.perf_counter()
+        old_keys = []
+        for i in range(args.sample):
+            user = User(email=f"single{i}@partner.com")
+            db.add(user)
+            db.commit()
+            keys = generate_stellar_wallet()
+            db.add(Wallet(user_id=user.id, public_key=keys["public_key"], encrypted_secret=encrypt_secret(keys["secret_key"])))
+            db.commit()
+            old_keys.append(keys["public_key"])
+        single_rate = args.sample / (time.perf_counter() - start)
+        db.close()
+
+        emails = [f"bulk{i}@partner.com" for i in range(args.users)]
+        rates = {}
+        for processes in (1, args.processes):
+            batch = [f"p{processes}-{email}" for email in emails]
+            start = time.perf_counter()
+            provisioning.create_run(batch, label=f"bench {processes}", processes=processes)
+            rates[processes] = len(batch) / (time.perf_counter() - start)
+
+        print("users + wallets")
+        print(f"  one commit per wallet           : {single_rate:8.0f} wallets/s")
+        for processes, rate in rates.items():
+            print(f"  bulk insert, {processes} key process(es)  : {rate:8.0f} wallets/s")
+
+        # 2. funding
+        async def friendbot_each():
+            for public_key in old_keys:
+                await stellar_service_async.fund_testnet_account(public_key)
+            await stellar_service_async.close_clients()
+
+        start = time.perf_counter()
+        asyncio.run(friendbot_each())
+        friendbot_rate = len(old_keys) / (time.perf_counter() - start)
+
+        run_id = provisioning.create_run(emails, label="bench funding", processes=args.processes)
+        stub.reset_counters()
+
+        async def fund(max_transactions=None):
+            try:
+                return await provisioning.fund_run(run_id, max_transactions)
+            finally:
+                await stellar_service_async.close_clients()
+
+        start = time.perf_counter()
+        asyncio.run(fund())
+        batched_rate = args.users / (time.perf_counter() - start)
+
+        print("\nfunding")
+        print(f"  friendbot, one account per call : {friendbot_rate:8.0f} accounts/s")
+        print(f"  create_account x100 per tx      : {batched_rate:8.0f} accounts/s  "
+              f"({stub.submitted_transactions} transactions)")
+
+        # 3. interrupt + resume
+        resume_emails = [f"resume{i}@partner.com" for i in range(1000)]
+        run_id = provisioning.create_run(resume_emails, label="bench resume", processes=1)
+        stub.reset_counters()
+        left = asyncio.run(fund(max_transactions=3))
+
+        db = SessionLocal()
+        pending = db.query(ProvisionedAccount.public_key).filter(
+            ProvisionedAccount.run_id == run_id, ProvisionedAccount.status == "pending"
+        ).limit(30).all()
+        for (public_key,) in pending:
+            stub.sequences[public_key] = stub.ledger << 32
+
+        # Same emails again: nothing left to create
+        provisioning.create_run(resume_emails, run_id=run_id, processes=1)
+        asyncio.run(fund())
+
+        report = provisioning.run_report(db, run_id)
+        on_chain = sum(1 for email_key in db.query(ProvisionedAccount.public_key).filter(ProvisionedAccount.run_id == run_id)
+                       if email_key[0] in stub.sequences)
+        db.close()
+
+        print("\nresume")
+        print(f"  interrupted with {left} pending, 30 of them already on-chain")
+        print(f"  after resume: {report['status']}, {report['wallets_created']} wallets, "
+              f"{report['accounts_funded']} funded ({on_chain} on-chain), {report['transactions']} transactions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Round-off engine: the old float path vs exact integer stroops.
+
+1. Correctness: amounts with up to 7 decimals through the old
+   float calculate_roundoff + Decimal(str(...)) vs the exact engine.
+2. Throughput: old float loop, exact scalar loop, NumPy batch.
+3. Projection: project_savings() over one user's seeded payment history.
+
+Run from the repo root:
+    python -m benchmarks.bench_roundoff [--amounts 2000000] [--history 100000]
+"""
+
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+
+def float_roundoff(amount: float):
+    """calculate_roundoff() as it was before the stroop engine"""
+    if amount < 500:
+        rounded = math.ceil(amount)
+    elif amount <= 10000:
+        rounded = math.ceil(amount / 10) * 10
+    else:
+        rounded = math.ceil(amount / 100) * 100
+    return rounded - amount, rounded
+
+
+def random_stroops(count: int, seed: int = 7):
+    """Mostly everyday payments, some large ones, a share on whole XLM"""
+    rng = random.Random(seed)
+    amounts = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.7:
+            amounts.append(rng.randint(1, 500 * 10**7))
+        elif kind < 0.9:
+            amounts.append(rng.randint(1, 50_000 * 10**7))
+        else:
+            amounts.append(rng.randint(1, 2_000) * 10**7)
+    return amounts
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--amounts", type=int, default=2_000_000)
+    parser.add_argument("--history", type=int, default=100_000, help="payments in the seeded history")
+    args = parser.parse_args()
+
+    from app.utils import rounding
+    from app.utils.rounding import STROOPS_PER_XLM, roundoff_stroops, roundoffs_stroops, to_stroops, load_numpy
+    np = load_numpy()
+
+    stroops = random_stroops(args.amounts)
+    floats = [s / STROOPS_PER_XLM for s in stroops]
+
+    # 1. correctness
+    wrong = 0
+    sample = stroops[:200_000]
+    for amount, exact in zip(sample, (roundoff_stroops(s) for s in sample)):
+        roundoff, _ = float_roundoff(amount / STROOPS_PER_XLM)
+        if Decimal(str(roundoff)) != Decimal(exact) / STROOPS_PER_XLM:
+            wrong += 1
+    print("correctness")
+    print(f"  float path, Decimal(str(...)) differs from exact : {wrong}/{len(sample)} "
+          f"({100 * wrong / len(sample):.1f}%)  e.g. 0.1+0.2 -> {float_roundoff(0.1 + 0.2)[0]!r}")
+
+    # 2. throughput
+    _, float_time = timed(lambda: [float_roundoff(a) for a in floats])
+    _, scalar_time = timed(lambda: [roundoff_stroops(s) for s in stroops])
+    _, parse_time = timed(lambda: [to_stroops(a) for a in floats[:200_000]])
+    print(f"\nthroughput ({args.amounts:,} amounts)")
+    print(f"  float calculate_roundoff loop   : {args.amounts / float_time / 1e6:8.2f} M amounts/s")
+    print(f"  exact stroops, scalar loop      : {args.amounts / scalar_time / 1e6:8.2f} M amounts/s")
+    print(f"  to_stroops(float) parse         : {200_000 / parse_time / 1e6:8.2f} M amounts/s")
+    if np is not None:
+        array = np.asarray(stroops, dtype=np.int64)
+        result, batch_time = timed(lambda: roundoffs_stroops(array))
+        assert result.tolist() == [roundoff_stroops(s) for s in stroops]
+        _, convert_time = timed(lambda: rounding.to_stroops_array(np.asarray(floats)))
+        print(f"  exact stroops, NumPy batch      : {args.amounts / batch_time / 1e6:8.2f} M amounts/s "
+              f"(+ {convert_time * 1000:.0f} ms float -> stroops)")
+    else:
+        print("  NumPy not installed, batch path skipped")
+
+    # 3. projection over a seeded history
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/roundoff.db"
+
+        import app.main  # noqa: F401  (registers every model)
+        from sqlalchemy import insert
+        from app.database import Base, engine, SessionLocal
+        from app.models.payment_history import PaymentRecord
+        from app.services.savings_projection import project_savings, history_cache
+
+        Base.metadata.create_all(bind=engine)
+        public_key = "G" + "A" * 55
+        start_at = datetime.utcnow() - timedelta(days=365)
+        history = stroops[:args.history]
+        db = SessionLocal()
+        db.execute(insert(PaymentRecord), [
+            {
+                "wallet_id": 1,
+                "public_key": public_key,
+                "amount": amount,
+                "roundoff": roundoff_stroops(amount) if i % 3 else 0,
+                "tx_hash": f"{i:064x}",
+                "created_at": start_at + timedelta(minutes=5 * i),
+            }
+            for i, amount in enumerate(history)
+        ])
+        db.commit()
+
+        print(f"\nprojection ({len(history):,} payments)")
+        for step_xlm, multiplier in ((None, 1), (5, 2)):
+            history_cache.clear()
+            projection, cold = timed(lambda: project_savings(db, public_key, step_xlm, multiplier))
+            warm = min(timed(lambda: project_savings(db, public_key, step_xlm, multiplier))[1] for _ in range(5))
+            print(f"  {projection['rule']:<28} x{multiplier}: {cold * 1000:6.1f} ms loading, {warm * 1000:5.1f} ms cached  "
+                  f"would have saved {projection['would_have_saved_xlm']:,.2f} XLM, "
+                  f"actually {projection['actually_saved_xlm']:,.2f}")
+
+        # The same history through the old float function, one payment at a time
+        _, float_projection = timed(lambda: sum(
+            Decimal(str(float_roundoff(amount / STROOPS_PER_XLM)[0]))
+            for (amount,) in db.query(PaymentRecord.amount).filter(PaymentRecord.public_key == public_key)
+        ))
+        print(f"  float loop over the same rows            : {float_projection * 1000:6.1f} ms")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Per-call latency of soroban_get_user_summary with a fresh SorobanServer per
+call (old behaviour) vs the shared pooled server from get_soroban_server().
+
+Run from the repo root:
+    python -m benchmarks.bench_soroban_pool [--calls 300] [--latency 0]
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+def timed_calls(stellar_service, public_key, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        stellar_service.soroban_get_user_summary(public_key)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency) as stub:
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+
+        from stellar_sdk import Keypair, SorobanServer
+        from app.services import stellar_service
+
+        public_key = Keypair.random().public_key
+
+        # Old behaviour: a new SorobanServer (session + connection) per call
+        shared = stellar_service.get_soroban_server
+        stellar_service.get_soroban_server = lambda: SorobanServer(stub.rpc_url)
+        fresh_latency = timed_calls(stellar_service, public_key, args.calls)
+        fresh_connections = len(stub.connections)
+
+        stellar_service.get_soroban_server = shared
+        stub.reset_counters()
+        pooled_latency = timed_calls(stellar_service, public_key, args.calls)
+        pooled_connections = len(stub.connections)
+
+    print(f"{args.calls} get_user_summary calls (2 RPC requests each)")
+    print(f"fresh server : {fresh_latency * 1000:7.2f} ms/call  {fresh_connections:5d} connections")
+    print(f"pooled server: {pooled_latency * 1000:7.2f} ms/call  {pooled_connections:5d} connections")
+    print(f"saved        : {(fresh_latency - pooled_latency) * 1000:7.2f} ms/call")
+
+
+if __name__ == "__main__":
+    main()
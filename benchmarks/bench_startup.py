@@ -0,0 +1,141 @@
+"""
+Cold start of an API worker: time to import app.main and to run the
+app's startup handlers, each in a fresh interpreter.
+
+The database is migrated once beforehand (startup only checks the schema
+version) and the Stellar URLs point at the in-memory network, so the
+background tasks started on startup don't reach the testnet. Reports the
+median and worst of --runs runs, and with --top the slowest top-level
+imports (python -X importtime).
+
+--save writes the report as JSON; --baseline compares with a saved
+report and exits 1 if the median import or startup time got more than
+--tolerance (plus --slack-ms, for timer noise) worse.
+
+Run from the repo root:
+    python -m benchmarks.bench_startup [--runs 5] [--top 10] [--save startup.json] [--baseline startup.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+# Runs in the fresh interpreter: import, then the ASGI lifespan startup / shutdown
+CHILD = """
+import asyncio, json, time
+
+start = time.perf_counter()
+import app.main
+import_ms = (time.perf_counter() - start) * 1000
+
+async def lifespan():
+    inbox, outbox = asyncio.Queue(), asyncio.Queue()
+    scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+    task = asyncio.create_task(app.main.app(scope, inbox.get, outbox.put))
+    start = time.perf_counter()
+    await inbox.put({"type": "lifespan.startup"})
+    message = await outbox.get()
+    startup_ms = (time.perf_counter() - start) * 1000
+    await inbox.put({"type": "lifespan.shutdown"})
+    await outbox.get()
+    await task
+    return startup_ms, message
+
+startup_ms, message = asyncio.run(lifespan())
+print(json.dumps({"import_ms": import_ms, "startup_ms": startup_ms, "startup": message}))
+"""
+
+METRICS = ("import_ms", "startup_ms")
+
+
+def run_child(env):
+    result = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    if sample["startup"]["type"] != "lifespan.startup.complete":
+        raise RuntimeError(f"startup failed: {sample['startup'].get('message')}")
+    return sample
+
+
+def slowest_imports(env, top: int):
+    """[(cumulative ms, module)] of the slowest top-level imports under app.main"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"], env=env, capture_output=True, text=True, check=True
+    )
+    found = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Direct imports of app.main and its own modules, two levels of indent at most
+        if cumulative.strip().isdigit() and len(name) - len(name.lstrip()) <= 3:
+            found.append((int(cumulative) / 1000, name.strip()))
+    return sorted(found, reverse=True)[:top]
+
+
+def regressions(report: dict, baseline: dict, tolerance: float, slack_ms: float):
+    found = []
+    for metric in METRICS:
+        base, current = baseline[metric]["median"], report[metric]["median"]
+        if current > base * (1 + tolerance) + slack_ms:
+            found.append(f"{metric}: median {base} -> {current}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    parser.add_argument("--save")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--slack-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=0.01) as stub, tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp}/startup.db",
+            HORIZON_URL=stub.base_url,
+            SOROBAN_RPC_URL=stub.rpc_url,
+            FRIENDBOT_URL=stub.friendbot_url,
+            PYTHONPATH=os.getcwd(),
+        )
+        subprocess.run([sys.executable, "-m", "app.migrations"], env=env, capture_output=True, check=True)
+
+        samples = [run_child(env) for _ in range(args.runs)]
+        report = {}
+        for metric in METRICS:
+            values = sorted(sample[metric] for sample in samples)
+            report[metric] = {"median": round(values[len(values) // 2], 1), "max": round(values[-1], 1)}
+
+        print(f"{args.runs} cold starts\n")
+        print(f"{'':<10} {'median ms':>10} {'max ms':>10}")
+        for metric in METRICS:
+            print(f"{metric[:-3]:<10} {report[metric]['median']:>10} {report[metric]['max']:>10}")
+
+        if args.top:
+            print(f"\nslowest imports (cumulative):")
+            for ms, name in slowest_imports(env, args.top):
+                print(f"  {ms:>8.1f} ms  {name}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"args": vars(args), "report": report}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(report, json.load(f)["report"], args.tolerance, args.slack_ms)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+        print(f"\nwithin {args.tolerance:.0%} (+{args.slack_ms:g} ms) of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
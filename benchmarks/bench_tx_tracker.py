@@ -0,0 +1,108 @@
+"""
+Confirming submitted Soroban transactions: one poll_transaction loop per
+hash (what balance_cache.watch_confirmation used to start) vs tx_tracker
+confirming every pending hash with batched getTransactions (with more than
+TX_TRACKER_HASH_POLL_MAX pending; fewer are looked up one by one).
+
+Every user sends one deposit_xlm; the stub applies it --confirm-after
+seconds later, like a ledger close. Reports RPC requests and the time
+until every transaction is final, and how many updates reached the
+users' event-stream queues.
+
+Run from the repo root:
+    python -m benchmarks.bench_tx_tracker [--users 500] [--latency 0.05] [--confirm-after 5]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+async def send_deposits(keypairs):
+    from app.services.stellar_service_async import soroban_deposit_xlm
+    return await asyncio.gather(*(soroban_deposit_xlm(keypair, 1) for keypair in keypairs))
+
+
+async def per_hash_polling(keypairs):
+    from app.services.stellar_service_async import get_soroban_server
+    results = await send_deposits(keypairs)
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(get_soroban_server().poll_transaction(r["hash"]) for r in results))
+    return time.perf_counter() - start, Counter(response.status.value for response in responses)
+
+
+async def batched_tracker(keypairs):
+    from app.services import tx_tracker
+    queues = {keypair.public_key: tx_tracker.subscribe(keypair.public_key) for keypair in keypairs}
+    results = await send_deposits(keypairs)
+
+    start = time.perf_counter()
+    for keypair, result in zip(keypairs, results):
+        await tx_tracker.track(result["hash"], keypair.public_key, result["function"], result["latest_ledger"])
+    statuses = await asyncio.gather(*(tx_tracker.wait(result["hash"], 120) for result in results))
+    elapsed = time.perf_counter() - start
+
+    pushed = Counter()
+    for public_key, queue in queues.items():
+        while not queue.empty():
+            pushed[queue.get_nowait()["status"]] += 1
+        tx_tracker.unsubscribe(public_key, queue)
+    return elapsed, Counter(statuses), pushed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--confirm-after", type=float, default=5)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency, confirm_after=args.confirm_after) as stub, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/tracker.db"
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+        # The stub closes a ledger per transaction, the network ~1 per 5 s with
+        # many in each: let a round cover the ledgers of every deposit
+        os.environ.setdefault("TX_TRACKER_SCAN_LEDGERS", str(args.users))
+
+        from stellar_sdk import Keypair
+        from app.database import Base, engine
+        from app.models import tracked_tx  # noqa: F401
+        from app.services import stellar_service_async, tx_tracker
+
+        Base.metadata.create_all(bind=engine)
+        print(f"{args.users} pending deposits, {args.latency * 1000:.0f} ms per RPC call, "
+              f"applied {args.confirm_after:.0f} s after sending\n")
+
+        async def run(confirm):
+            try:
+                return await confirm([Keypair.random() for _ in range(args.users)])
+            finally:
+                await tx_tracker.stop_tracker()
+                await stellar_service_async.close_clients()
+
+        stub.reset_counters()
+        elapsed, statuses = asyncio.run(run(per_hash_polling))
+        print("poll_transaction per hash")
+        print(f"  getTransaction requests : {stub.requests['rpc.getTransaction']}")
+        print(f"  all final after        : {elapsed:.2f} s {dict(statuses)}\n")
+
+        stub.reset_counters()
+        elapsed, statuses, pushed = asyncio.run(run(batched_tracker))
+        stats = tx_tracker.tracker_stats()
+        print("tx_tracker, batched getTransactions")
+        print(f"  getTransactions requests: {stub.requests['rpc.getTransactions']} in {stats['rounds']} rounds"
+              f" over {stats['ledgers_scanned']} ledgers (+{stub.requests['rpc.getTransaction']} getTransaction)")
+        print(f"  all final after        : {elapsed:.2f} s {dict(statuses)}")
+        print(f"  pushed to event streams: {dict(pushed)}")
+        print(f"  stored                 : {stats['stored']}")
+
+
+if __name__ == "__main__":
+    main()
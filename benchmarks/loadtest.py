@@ -0,0 +1,200 @@
+"""
+End-to-end load test of /wallet/pay, /vault/deposit and /vault/withdraw
+against the in-memory network (benchmarks/stub_rpc.py), no testnet needed.
+
+The app runs in-process under uvicorn with its startup tasks (confirmation
+tracker, channel pool, fee refresher, ...). --users virtual users each
+make --requests requests, picking the endpoint by the --mix weights from a
+seeded RNG so that runs are repeatable; a user only withdraws after it has
+deposited. Upstream latency and failures are injected in the stub
+(--latency, --errors "horizon.submit=0.02,rpc.sendTransaction=0.01").
+
+Reports requests, errors, throughput and p50 / p95 / p99 latency per
+endpoint. --save writes the report as JSON; --baseline compares with a
+saved report and exits 1 if an endpoint's p95 or throughput got more than
+--tolerance worse.
+
+Run from the repo root:
+    python -m benchmarks.loadtest [--users 50] [--requests 20] [--save report.json] [--baseline report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+ENDPOINTS = ("pay", "deposit", "withdraw")
+
+
+def percentile(values, q: float) -> float:
+    """q-th percentile (0-1) of sorted values, nearest rank"""
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def parse_errors(spec: str) -> dict:
+    rates = {}
+    for item in filter(None, spec.split(",")):
+        name, rate = item.split("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+async def virtual_user(client, token: str, rng: random.Random, requests: int, mix, samples):
+    from stellar_sdk import Keypair
+
+    headers = {"Authorization": f"Bearer {token}"}
+    deposited = 0
+    for _ in range(requests):
+        endpoint = rng.choices(ENDPOINTS, weights=mix)[0]
+        if endpoint == "withdraw" and not deposited:
+            endpoint = "deposit"
+
+        start = time.perf_counter()
+        try:
+            if endpoint == "pay":
+                destination = Keypair.from_raw_ed25519_seed(rng.randbytes(32)).public_key
+                body = {"destination": destination, "amount": 1.5, "roundoff_option": "invest"}
+                response = await client.post("/wallet/pay", json=body, headers=headers)
+            elif endpoint == "deposit":
+                response = await client.post("/vault/deposit", params={"amount": 2}, headers=headers)
+            else:
+                response = await client.post("/vault/withdraw", json={"amount": 1}, headers=headers)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        samples[endpoint].append((time.perf_counter() - start, status))
+
+        if status == 200 and endpoint == "deposit":
+            deposited += 1
+        elif status == 200 and endpoint == "withdraw":
+            deposited -= 1
+
+
+async def run_load(app, tokens, args):
+    import httpx
+    import uvicorn
+
+    # Failed requests are counted in the report, not logged with their tracebacks
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="critical"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    samples = defaultdict(list)
+    mix = [float(weight) for weight in args.mix.split(",")]
+    limits = httpx.Limits(max_connections=len(tokens))
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                virtual_user(client, token, random.Random(args.seed * 100_003 + i), args.requests, mix, samples)
+                for i, token in enumerate(tokens)
+            ))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.should_exit = True
+        await serving
+
+    return samples, elapsed
+
+
+def summarize(samples, elapsed: float) -> dict:
+    report = {}
+    for endpoint in ENDPOINTS:
+        results = samples.get(endpoint)
+        if not results:
+            continue
+        latencies = sorted(latency for latency, _ in results)
+        report[endpoint] = {
+            "requests": len(results),
+            "errors": sum(1 for _, status in results if status != 200),
+            "rps": round(len(results) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        }
+    return report
+
+
+def regressions(report: dict, baseline: dict, tolerance: float):
+    found = []
+    for endpoint, base in baseline.items():
+        current = report.get(endpoint)
+        if current is None:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            found.append(f"{endpoint}: p95 {base['p95_ms']} -> {current['p95_ms']} ms")
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            found.append(f"{endpoint}: throughput {base['rps']} -> {current['rps']} req/s")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="requests per user")
+    parser.add_argument("--mix", default="6,3,1", help="weights of pay, deposit, withdraw")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--errors", default="", help="injected 503s, e.g. horizon.submit=0.02")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency, seed=args.seed) as stub, tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/loadtest.db"
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+        os.environ["FRIENDBOT_URL"] = stub.friendbot_url
+        # A log line per request and upstream call would be measured too
+        os.environ.setdefault("LOG_TIMINGS", "false")
+        stub.error_rates = parse_errors(args.errors)
+
+        from app.migrations import upgrade
+        from benchmarks.bench_db_sessions import seed
+        upgrade()
+        emails = seed(args.users)
+
+        from app.main import app
+        from app.services.auth_service import create_access_token
+
+        tokens = [create_access_token({"sub": email}) for email in emails]
+        print(f"{args.users} users x {args.requests} requests (pay/deposit/withdraw {args.mix}), "
+              f"{args.latency * 1000:.0f} ms per upstream call, injected errors {stub.error_rates or 'none'}\n")
+
+        samples, elapsed = asyncio.run(run_load(app, tokens, args))
+        report = summarize(samples, elapsed)
+
+        print(f"{'endpoint':<10} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for endpoint, row in report.items():
+            print(f"{endpoint:<10} {row['requests']:>8} {row['errors']:>7} {row['rps']:>8} "
+                  f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}")
+        print(f"\n{sum(row['requests'] for row in report.values())} requests in {elapsed:.2f} s, "
+              f"{stub.requests['horizon.submit']} Horizon submissions, "
+              f"{stub.requests['rpc.sendTransaction']} Soroban transactions")
+
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump({"args": vars(args), "endpoints": report}, f, indent=2)
+
+        if args.baseline:
+            with open(args.baseline) as f:
+                found = regressions(report, json.load(f)["endpoints"], args.tolerance)
+            for line in found:
+                print(f"REGRESSION {line}")
+            if found:
+                sys.exit(1)
+            print(f"\nwithin {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
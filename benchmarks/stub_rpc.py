@@ -0,0 +1,742 @@
+"""
+Local stub of Horizon + Soroban RPC used by the benchmarks and the load
+test: an in-memory ledger behind the same URLs the app talks to, so every
+service function runs unchanged against it (point HORIZON_URL,
+SOROBAN_RPC_URL and FRIENDBOT_URL at it).
+
+Runs an aiohttp server in a background thread. Every request sleeps for a
+latency (per endpoint in `latencies`, else `latency`) to emulate the
+network round trip, and fails with a 503 at the rate given in
+`error_rates`. Account sequence numbers are enforced like Horizon does
+(tx_bad_seq), native payments move balances, and the vault contract's
+deposit_xlm / withdraw_xlm / get_user_summary keep per-user state, with
+add_yield_batch / credit_xlm_batch applied once per batch id like the
+contract does.
+Counters record how many requests / TCP connections / operations the
+stub has seen.
+
+Standalone, for running the app against it:
+    python -m benchmarks.stub_rpc [--port 8100] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from aiohttp import web
+
+from stellar_sdk import CreateAccount, Keypair, Network, Payment, SorobanDataBuilder, TransactionEnvelope, scval
+from stellar_sdk import xdr as stellar_xdr
+from stellar_sdk.fee_bump_transaction_envelope import FeeBumpTransactionEnvelope
+
+NETWORK_PASSPHRASE = Network.TESTNET_NETWORK_PASSPHRASE
+STARTING_SEQUENCE = 1_000_000
+STARTING_BALANCE = "10000.0000000"
+# errorResultXdr of a Soroban transaction sent with the wrong sequence
+BAD_SEQ_RESULT_XDR = stellar_xdr.TransactionResult(
+    fee_charged=stellar_xdr.Int64(0),
+    result=stellar_xdr.TransactionResultResult(code=stellar_xdr.TransactionResultCode.txBAD_SEQ),
+    ext=stellar_xdr.TransactionResultExt(0),
+).to_xdr()
+
+
+# Admin batch function -> the per-user contract state it credits
+BATCH_BALANCES = {"add_yield_batch": "contract_usdc_yield", "credit_xlm_batch": "contract_xlm"}
+
+
+class StubStellarNetwork:
+    def __init__(self, latency: float = 0.05, port: int = 0, confirm_after: float = 0, seed: int = 0):
+        self.latency = latency
+        self.port = port
+        # Request name (see _enter) -> latency override / share answered with a 503
+        self.latencies = {}
+        self.error_rates = {}
+        self.random = random.Random(seed)
+        # Vault contract state per user, in the contract's own units
+        self.contract_xlm = {}
+        self.contract_usdc_principal = {}
+        self.contract_usdc_yield = {}
+        self.applied_batches = set()
+        # Seconds before a sent Soroban transaction shows up as applied
+        self.confirm_after = confirm_after
+        self.soroban_transactions = []
+        self.failing_functions = set()
+        # Per-operation fee a transaction must bid to get into a ledger (0:
+        # no surge). Lower bids sit in the queue until Horizon gives up with
+        # a 504 after horizon_timeout seconds, leaving the sequence unused.
+        self.surge_fee = 0
+        # Seconds between ledger closes (0: a transaction is applied and
+        # answered at once). Like the network, a ledger takes at most one
+        # transaction per source account; Horizon answers when it closes.
+        self.ledger_close = 0
+        self._source_ledgers = {}
+        # Unknown accounts exist with STARTING_BALANCE unless this is off
+        self.auto_create_accounts = True
+        self.horizon_timeout = 2.0
+        self.fees_charged = 0
+        self.sequences = {}
+        self.balances = {}
+        self.effects = []
+        self.payments = []
+        # Horizon transaction records by hash (a fee-bump also by its inner hash)
+        self.transactions = {}
+        self.contract_data = {}
+        self.total_usdc_principal = 0
+        self.events = []
+        self.requests = Counter()
+        self.connections = set()
+        self.submitted_transactions = 0
+        self.submitted_operations = 0
+        self.ledger = 1000
+        self._lock = threading.Lock()
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    # =========================
+    # LIFECYCLE
+    # =========================
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def rpc_url(self) -> str:
+        return f"{self.base_url}/rpc"
+
+    @property
+    def friendbot_url(self) -> str:
+        return f"{self.base_url}/friendbot"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    async def _shutdown(self):
+        await self._runner.cleanup()
+        # Streams (effects) left open by clients
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        app = web.Application()
+        app.router.add_get("/accounts/{account_id}", self.handle_account)
+        app.router.add_get("/accounts/{account_id}/payments", self.handle_payments)
+        app.router.add_get("/effects", self.handle_effects)
+        app.router.add_post("/transactions", self.handle_submit)
+        app.router.add_get("/transactions/{tx_hash}", self.handle_transaction)
+        app.router.add_get("/fee_stats", self.handle_fee_stats)
+        app.router.add_get("/friendbot", self.handle_friendbot)
+        app.router.add_post("/rpc", self.handle_rpc)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port, backlog=4096)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests.clear()
+            self.connections.clear()
+            self.submitted_transactions = 0
+            self.submitted_operations = 0
+            self.fees_charged = 0
+
+    async def _enter(self, request, name: str):
+        with self._lock:
+            self.requests[name] += 1
+            self.connections.add(request.transport.get_extra_info("peername"))
+            failed = self.random.random() < self.error_rates.get(name, 0)
+            if failed:
+                self.requests[f"{name}.injected_error"] += 1
+        latency = self.latencies.get(name, self.latency)
+        if latency:
+            await asyncio.sleep(latency)
+        if failed:
+            raise web.HTTPServiceUnavailable(
+                content_type="application/json",
+                text=json.dumps({
+                    "type": "https://stellar.org/horizon-errors/service_unavailable",
+                    "title": "Service Unavailable",
+                    "status": 503,
+                }),
+            )
+
+    def set_contract_data(self, key, value):
+        """Serve value (SCVal) for a contract-data LedgerKey via getLedgerEntries"""
+        self.contract_data[key.to_xdr()] = (key, value)
+
+    def add_account(self, account_id: str, balance: str = STARTING_BALANCE):
+        with self._lock:
+            self._sequence(account_id)
+            self.balances[account_id] = Decimal(balance)
+
+    def _ledger_slot(self, source: str) -> float:
+        """Close time of the first ledger with room for another transaction from source"""
+        next_close = (time.monotonic() // self.ledger_close + 1) * self.ledger_close
+        slot = max(next_close, self._source_ledgers.get(source, 0) + self.ledger_close)
+        self._source_ledgers[source] = slot
+        return slot
+
+    def _sequence(self, account_id: str) -> int:
+        return self.sequences.setdefault(account_id, STARTING_SEQUENCE)
+
+    def _balance(self, account_id: str) -> Decimal:
+        return self.balances.setdefault(account_id, Decimal(STARTING_BALANCE))
+
+    def _create_account_codes(self, tx):
+        """Per-operation result codes: create_account fails for accounts that already exist"""
+        return [
+            "op_already_exists" if isinstance(op, CreateAccount) and op.destination in self.sequences else "op_success"
+            for op in tx.operations
+        ]
+
+    def _apply_create_accounts(self, tx):
+        for op in tx.operations:
+            if not isinstance(op, CreateAccount):
+                continue
+            source = op.source.account_id if op.source else tx.source.account_id
+            self.balances[source] = self._balance(source) - Decimal(op.starting_balance)
+            self.balances[op.destination] = Decimal(op.starting_balance)
+            self.sequences[op.destination] = self.ledger << 32
+
+    def _apply_payments(self, tx, tx_hash: str):
+        """Move native balances and record payment operations and account_debited / account_credited effects"""
+        for index, op in enumerate(tx.operations):
+            if not isinstance(op, Payment) or not op.asset.is_native():
+                continue
+            source = op.source.account_id if op.source else tx.source.account_id
+            amount = Decimal(op.amount)
+            self.balances[source] = self._balance(source) - amount
+            self.balances[op.destination.account_id] = self._balance(op.destination.account_id) + amount
+            operation_id = str((self.ledger << 32) + len(self.payments) * 100 + index + 1)
+            self.payments.append({
+                "id": operation_id,
+                "paging_token": operation_id,
+                "type": "payment",
+                "asset_type": "native",
+                "from": source,
+                "to": op.destination.account_id,
+                "amount": op.amount,
+                "transaction_hash": tx_hash,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            })
+            for effect_type, account in (("account_debited", source), ("account_credited", op.destination.account_id)):
+                token = f"{(self.ledger << 32) + len(self.effects):019d}-1"
+                self.effects.append({
+                    "id": token,
+                    "paging_token": token,
+                    "account": account,
+                    "type": effect_type,
+                    "asset_type": "native",
+                    "amount": op.amount,
+                })
+
+    # =========================
+    # HORIZON
+    # =========================
+
+    async def handle_account(self, request):
+        await self._enter(request, "horizon.account")
+        account_id = request.match_info["account_id"]
+        with self._lock:
+            if not self.auto_create_accounts and account_id not in self.sequences:
+                return web.json_response(
+                    {
+                        "type": "https://stellar.org/horizon-errors/not_found",
+                        "title": "Resource Missing",
+                        "status": 404,
+                        "detail": "The resource at the url requested was not found.",
+                    },
+                    status=404,
+                )
+            sequence = self._sequence(account_id)
+
+        return web.json_response({
+            "id": account_id,
+            "account_id": account_id,
+            "sequence": str(sequence),
+            "balances": [{"asset_type": "native", "balance": f"{self._balance(account_id):.7f}"}],
+            "data": {},
+        })
+
+    async def handle_submit(self, request):
+        await self._enter(request, "horizon.submit")
+        form = await request.post()
+        envelope_xdr = form["tx"]
+
+        try:
+            envelope = TransactionEnvelope.from_xdr(envelope_xdr, NETWORK_PASSPHRASE)
+            tx = envelope.transaction
+            fee_operations = len(tx.operations)
+        except Exception:
+            envelope = FeeBumpTransactionEnvelope.from_xdr(envelope_xdr, NETWORK_PASSPHRASE)
+            tx = envelope.transaction.inner_transaction_envelope.transaction
+            # A fee-bump pays for the inner operations plus itself
+            fee_operations = len(tx.operations) + 1
+
+        if envelope.transaction.fee // fee_operations < self.surge_fee:
+            await asyncio.sleep(self.horizon_timeout)
+            return web.json_response(
+                {
+                    "type": "https://stellar.org/horizon-errors/timeout",
+                    "title": "Timeout",
+                    "status": 504,
+                    "detail": "Your transaction was not included in a ledger in time; it may still be.",
+                },
+                status=504,
+            )
+
+        source = tx.source.account_id
+        with self._lock:
+            expected = self._sequence(source) + 1
+            if tx.sequence != expected:
+                return web.json_response(
+                    {
+                        "type": "https://stellar.org/horizon-errors/transaction_failed",
+                        "title": "Transaction Failed",
+                        "status": 400,
+                        "extras": {
+                            "envelope_xdr": envelope_xdr,
+                            "result_codes": {"transaction": "tx_bad_seq"},
+                        },
+                    },
+                    status=400,
+                )
+            self.sequences[source] = tx.sequence
+            op_codes = self._create_account_codes(tx)
+            self._record_transaction(envelope, successful=all(code == "op_success" for code in op_codes))
+            if any(code != "op_success" for code in op_codes):
+                # Like the network: the sequence is consumed, nothing else applies
+                return web.json_response(
+                    {
+                        "type": "https://stellar.org/horizon-errors/transaction_failed",
+                        "title": "Transaction Failed",
+                        "status": 400,
+                        "extras": {
+                            "envelope_xdr": envelope_xdr,
+                            "result_codes": {"transaction": "tx_failed", "operations": op_codes},
+                        },
+                    },
+                    status=400,
+                )
+            self.submitted_transactions += 1
+            self.submitted_operations += len(tx.operations)
+            # Every transaction in a ledger pays the same per-operation fee
+            self.fees_charged += max(self.surge_fee, 100) * fee_operations
+            self.ledger += 1
+            self._apply_create_accounts(tx)
+            self._apply_payments(tx, envelope.hash_hex())
+            closes_at = self._ledger_slot(source) if self.ledger_close else None
+
+        if closes_at is not None:
+            await asyncio.sleep(max(closes_at - time.monotonic(), 0))
+
+        return web.json_response({
+            "successful": True,
+            "hash": envelope.hash_hex(),
+            "ledger": self.ledger,
+            "envelope_xdr": envelope_xdr,
+        })
+
+    def _record_transaction(self, envelope, successful: bool):
+        record = {"hash": envelope.hash_hex(), "successful": successful, "ledger": self.ledger + 1}
+        self.transactions[record["hash"]] = record
+        if isinstance(envelope, FeeBumpTransactionEnvelope):
+            self.transactions[envelope.transaction.inner_transaction_envelope.hash_hex()] = record
+
+    async def handle_transaction(self, request):
+        await self._enter(request, "horizon.transaction")
+        record = self.transactions.get(request.match_info["tx_hash"])
+        if record is None:
+            return web.json_response(
+                {
+                    "type": "https://stellar.org/horizon-errors/not_found",
+                    "title": "Resource Missing",
+                    "status": 404,
+                    "detail": "The resource at the url requested was not found.",
+                },
+                status=404,
+            )
+        return web.json_response(record)
+
+    async def handle_fee_stats(self, request):
+        """Recently charged fees: the surge fee around p50, half again more at p99"""
+        await self._enter(request, "horizon.fee_stats")
+        surge = max(self.surge_fee, 100)
+        charged = {f"p{p}": str(max(100, surge * (50 + p) // 100)) for p in (10, 20, 30, 40, 50, 60, 70, 80, 90, 95, 99)}
+        return web.json_response({
+            "last_ledger": str(self.ledger),
+            "last_ledger_base_fee": "100",
+            "ledger_capacity_usage": "0.97" if self.surge_fee else "0.35",
+            "fee_charged": {"min": "100", "max": charged["p99"], "mode": str(surge), **charged},
+            "max_fee": {"min": "100", "max": charged["p99"], "mode": str(surge), **charged},
+        })
+
+    async def handle_payments(self, request):
+        """One page of an account's payments, oldest first, after the cursor"""
+        await self._enter(request, "horizon.payments")
+        account_id = request.match_info["account_id"]
+        cursor = int(request.query.get("cursor") or 0)
+        limit = int(request.query.get("limit", 10))
+        with self._lock:
+            records = [
+                p for p in self.payments
+                if account_id in (p["from"], p["to"]) and int(p["paging_token"]) > cursor
+            ][:limit]
+        return web.json_response({"_embedded": {"records": records}})
+
+    async def handle_effects(self, request):
+        """SSE stream of self.effects after the cursor ("now" = only new ones)"""
+        await self._enter(request, "horizon.effects")
+        cursor = request.query.get("cursor", "now")
+        with self._lock:
+            position = len(self.effects) if cursor == "now" else sum(1 for e in self.effects if e["paging_token"] <= cursor)
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        try:
+            # The client may already be gone (e.g. an app that stopped right after starting)
+            await response.prepare(request)
+            await response.write(b'retry: 100\nevent: open\ndata: "hello"\n\n')
+            while True:
+                with self._lock:
+                    new = self.effects[position:]
+                for effect in new:
+                    await response.write(f"id: {effect['paging_token']}\ndata: {json.dumps(effect)}\n\n".encode())
+                position += len(new)
+                await asyncio.sleep(0.02)
+        except ConnectionResetError:
+            return response
+
+    async def handle_friendbot(self, request):
+        await self._enter(request, "friendbot")
+        account_id = request.query["addr"]
+        with self._lock:
+            self._sequence(account_id)
+        return web.json_response({"successful": True, "account": account_id})
+
+    # =========================
+    # SOROBAN RPC
+    # =========================
+
+    async def handle_rpc(self, request):
+        body = await request.json()
+        method = body["method"]
+        await self._enter(request, f"rpc.{method}")
+
+        handler = getattr(self, f"rpc_{method}", None)
+        if handler is None:
+            return web.json_response({
+                "jsonrpc": "2.0",
+                "id": body["id"],
+                "error": {"code": -32601, "message": f"method not found: {method}"},
+            })
+
+        return web.json_response({
+            "jsonrpc": "2.0",
+            "id": body["id"],
+            "result": handler(body.get("params") or {}),
+        })
+
+    def rpc_getHealth(self, params):
+        oldest = min([e["ledger"] for e in self.events] + [self.ledger])
+        return {
+            "status": "healthy",
+            "latestLedger": self.ledger,
+            "oldestLedger": oldest,
+            "ledgerRetentionWindow": self.ledger - oldest + 1,
+        }
+
+    def rpc_getEvents(self, params):
+        """Serves self.events (getEvents result items, e.g. loaded from a fixture)"""
+        pagination = params.get("pagination") or {}
+        limit = pagination.get("limit") or 100
+        cursor = pagination.get("cursor")
+
+        if cursor:
+            matching = [e for e in self.events if e["id"] > cursor]
+        else:
+            matching = [e for e in self.events if e["ledger"] >= params["startLedger"]]
+
+        page = matching[:limit]
+        return {
+            "events": page,
+            "latestLedger": self.ledger,
+            "oldestLedger": 1,
+            "latestLedgerCloseTime": str(int(time.time())),
+            "oldestLedgerCloseTime": str(int(time.time())),
+            "cursor": page[-1]["id"] if len(page) == limit else f"{(self.ledger + 1) << 32:019d}-0000000000",
+        }
+
+    def rpc_getLatestLedger(self, params):
+        return {
+            "id": "0" * 64,
+            "protocolVersion": 22,
+            "sequence": self.ledger,
+            "closeTime": int(time.time()),
+            "headerXdr": "",
+            "metadataXdr": "",
+        }
+
+    def rpc_getLedgerEntries(self, params):
+        entries = []
+        for key_xdr in params["keys"]:
+            key = stellar_xdr.LedgerKey.from_xdr(key_xdr)
+            if key_xdr in self.contract_data:
+                entries.append(self._contract_data_entry(key_xdr))
+                continue
+            if key.type != stellar_xdr.LedgerEntryType.ACCOUNT:
+                continue
+
+            account_id = Keypair.from_raw_ed25519_public_key(
+                key.account.account_id.account_id.ed25519.uint256
+            ).public_key
+            with self._lock:
+                sequence = self._sequence(account_id)
+
+            entry = stellar_xdr.LedgerEntryData(
+                stellar_xdr.LedgerEntryType.ACCOUNT,
+                account=stellar_xdr.AccountEntry(
+                    account_id=key.account.account_id,
+                    balance=stellar_xdr.Int64(100_000_000_000),
+                    seq_num=stellar_xdr.SequenceNumber(stellar_xdr.Int64(sequence)),
+                    num_sub_entries=stellar_xdr.Uint32(0),
+                    inflation_dest=None,
+                    flags=stellar_xdr.Uint32(0),
+                    home_domain=stellar_xdr.String32(b""),
+                    thresholds=stellar_xdr.Thresholds(b"\x01\x00\x00\x00"),
+                    signers=[],
+                    ext=stellar_xdr.AccountEntryExt(0),
+                ),
+            )
+            entries.append({
+                "key": key_xdr,
+                "xdr": entry.to_xdr(),
+                "lastModifiedLedgerSeq": self.ledger,
+            })
+
+        return {"entries": entries, "latestLedger": self.ledger}
+
+    def _contract_data_entry(self, key_xdr):
+        key, value = self.contract_data[key_xdr]
+        entry = stellar_xdr.LedgerEntryData(
+            stellar_xdr.LedgerEntryType.CONTRACT_DATA,
+            contract_data=stellar_xdr.ContractDataEntry(
+                ext=stellar_xdr.ExtensionPoint(0),
+                contract=key.contract_data.contract,
+                key=key.contract_data.key,
+                durability=key.contract_data.durability,
+                val=value,
+            ),
+        )
+        return {"key": key_xdr, "xdr": entry.to_xdr(), "lastModifiedLedgerSeq": self.ledger}
+
+    @staticmethod
+    def _contract_call(tx):
+        invoke = tx.operations[0].host_function.invoke_contract
+        return invoke.function_name.sc_symbol.decode(), invoke.args
+
+    def rpc_simulateTransaction(self, params):
+        envelope = TransactionEnvelope.from_xdr(params["transaction"], NETWORK_PASSPHRASE)
+        function_name, args = self._contract_call(envelope.transaction)
+
+        with self._lock:
+            error = self._contract_error(function_name, args)
+            value = None if error else self.contract_return_value(function_name, args)
+        if error:
+            return {"error": error, "latestLedger": self.ledger}
+
+        return {
+            "transactionData": SorobanDataBuilder().set_resource_fee(50_000).build().to_xdr(),
+            "minResourceFee": "50000",
+            "results": [{"auth": [], "xdr": value.to_xdr()}],
+            "latestLedger": self.ledger,
+        }
+
+    def _contract_error(self, function_name: str, args):
+        """Why the contract would panic on this call, None if it would not"""
+        if function_name == "withdraw_xlm":
+            user, amount = scval.from_address(args[0]).address, scval.from_int128(args[1])
+            if amount > self.contract_xlm.get(user, 0):
+                return "HostError: Error(Contract, #2) insufficient balance"
+        return None
+
+    def _apply_contract_call(self, function_name: str, args):
+        if function_name in BATCH_BALANCES:
+            batch = scval.from_bytes(args[0])
+            if batch not in self.applied_batches:
+                self.applied_batches.add(batch)
+                balances = getattr(self, BATCH_BALANCES[function_name])
+                for user, amount in map(scval.from_vec, scval.from_vec(args[1])):
+                    user = scval.from_address(user).address
+                    balances[user] = balances.get(user, 0) + scval.from_int128(amount)
+            return
+        if function_name not in ("deposit_xlm", "withdraw_xlm"):
+            return
+        user, amount = scval.from_address(args[0]).address, scval.from_int128(args[1])
+        sign = 1 if function_name == "deposit_xlm" else -1
+        self.contract_xlm[user] = self.contract_xlm.get(user, 0) + sign * amount
+
+    def contract_return_value(self, function_name: str, args=()):
+        if function_name == "get_user_summary":
+            user = scval.from_address(args[0]).address
+            return scval.to_vec([
+                scval.to_int128(self.contract_xlm.get(user, 0)),
+                scval.to_int128(self.contract_usdc_principal.get(user, 0)),
+                scval.to_int128(self.contract_usdc_yield.get(user, 0)),
+            ])
+        if function_name == "total_usdc_principal":
+            return scval.to_int128(self.total_usdc_principal)
+        if function_name == "total_xlm":
+            return scval.to_int128(sum(self.contract_xlm.values()))
+        if function_name == "batch_applied":
+            return scval.to_bool(scval.from_bytes(args[0]) in self.applied_batches)
+        if function_name in BATCH_BALANCES:
+            return scval.to_bool(scval.from_bytes(args[0]) not in self.applied_batches)
+        return scval.to_void()
+
+    def rpc_sendTransaction(self, params):
+        envelope = TransactionEnvelope.from_xdr(params["transaction"], NETWORK_PASSPHRASE)
+        tx = envelope.transaction
+        source = tx.source.account_id
+
+        with self._lock:
+            status, error_result = "PENDING", None
+            latest_ledger = self.ledger
+            if tx.sequence != self._sequence(source) + 1:
+                status, error_result = "ERROR", BAD_SEQ_RESULT_XDR
+            else:
+                self.sequences[source] = tx.sequence
+                self.submitted_transactions += 1
+                self.submitted_operations += len(tx.operations)
+                # Applied in the next ledger (the contract state right away),
+                # visible once confirm_after has passed
+                function_name, args = self._contract_call(tx)
+                failed = function_name in self.failing_functions or self._contract_error(function_name, args)
+                if not failed:
+                    self._apply_contract_call(function_name, args)
+                self.ledger += 1
+                self.soroban_transactions.append({
+                    "hash": envelope.hash_hex(),
+                    "ledger": self.ledger,
+                    "status": "FAILED" if failed else "SUCCESS",
+                    "applied_at": time.time() + self.confirm_after,
+                })
+
+        response = {
+            "status": status,
+            "hash": envelope.hash_hex(),
+            "latestLedger": latest_ledger,
+            "latestLedgerCloseTime": str(int(time.time())),
+        }
+        if error_result:
+            response["errorResultXdr"] = error_result
+        return response
+
+    def _closed_ledger(self, now: float) -> int:
+        """Latest ledger whose Soroban transactions are all visible"""
+        unapplied = [tx["ledger"] for tx in self.soroban_transactions if tx["applied_at"] > now]
+        return min(unapplied) - 1 if unapplied else self.ledger
+
+    def rpc_getTransaction(self, params):
+        now = time.time()
+        with self._lock:
+            tx = next((tx for tx in self.soroban_transactions if tx["hash"] == params["hash"]), None)
+            latest = self._closed_ledger(now)
+
+        # Hashes the stub never saw (sent before it kept track) count as applied
+        status, ledger = "SUCCESS", latest
+        if tx is not None:
+            status, ledger = (tx["status"], tx["ledger"]) if tx["applied_at"] <= now else ("NOT_FOUND", None)
+
+        return {
+            "status": status,
+            "txHash": params["hash"],
+            "latestLedger": latest,
+            "latestLedgerCloseTime": str(int(now)),
+            "oldestLedger": 1,
+            "oldestLedgerCloseTime": str(int(now)),
+            "ledger": ledger,
+        }
+
+    def rpc_getTransactions(self, params):
+        """Applied Soroban transactions from startLedger (or after the cursor), in ledger order"""
+        pagination = params.get("pagination") or {}
+        limit = pagination.get("limit") or 100
+        cursor = pagination.get("cursor")
+        now = time.time()
+
+        with self._lock:
+            latest = self._closed_ledger(now)
+            if cursor:
+                matching = [tx for tx in self.soroban_transactions if tx["ledger"] << 32 > int(cursor)]
+            else:
+                matching = [tx for tx in self.soroban_transactions if tx["ledger"] >= params["startLedger"]]
+            page = [tx for tx in matching if tx["ledger"] <= latest][:limit]
+
+        return {
+            "transactions": [{
+                "status": tx["status"],
+                "txHash": tx["hash"],
+                "applicationOrder": 1,
+                "feeBump": False,
+                "envelopeXdr": "",
+                "resultXdr": "",
+                "resultMetaXdr": "",
+                "ledger": tx["ledger"],
+                "createdAt": int(tx["applied_at"]),
+            } for tx in page],
+            "latestLedger": latest,
+            "latestLedgerCloseTimestamp": int(now),
+            "oldestLedger": 1,
+            "oldestLedgerCloseTimestamp": int(now),
+            "cursor": str(page[-1]["ledger"] << 32) if page else str(latest << 32),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--confirm-after", type=float, default=0)
+    args = parser.parse_args()
+
+    with StubStellarNetwork(latency=args.latency, port=args.port, confirm_after=args.confirm_after) as stub:
+        print(f"HORIZON_URL={stub.base_url} SOROBAN_RPC_URL={stub.rpc_url} FRIENDBOT_URL={stub.friendbot_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
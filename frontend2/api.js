@@ -5,14 +5,40 @@ const API_BASE =
 
 
 
+/**
+ * Idempotency key for one user action; send the same key on every retry
+ * @returns {string}
+ */
+function newIdempotencyKey() {
+  return crypto.randomUUID();
+}
+
+/**
+ * fetch(), retried on network errors when the request carries an
+ * Idempotency-Key (the server then runs it at most once)
+ */
+async function fetchWithRetry(url, options, attempts = 3) {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await fetch(url, options);
+    } catch (error) {
+      if (!options.headers["Idempotency-Key"] || attempt >= attempts) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500 * attempt));
+    }
+  }
+}
+
 /**
  * Make API request with proper error handling
  * @param {string} endpoint - API endpoint (e.g., "/auth/login")
  * @param {string} method - HTTP method (GET, POST, etc.)
  * @param {object} body - Request body (optional)
+ * @param {object} headers - Extra headers (optional)
  * @returns {Promise<object>} Response data
  */
-async function apiRequest(endpoint, method = "GET", body = null) {
+async function apiRequest(endpoint, method = "GET", body = null, headers = {}) {
   try {
     const token = localStorage.getItem("token");
     
@@ -20,6 +46,7 @@ async function apiRequest(endpoint, method = "GET", body = null) {
       method,
       headers: {
         "Content-Type": "application/json",
+        ...headers,
       }
     };
 
@@ -33,7 +60,7 @@ async function apiRequest(endpoint, method = "GET", body = null) {
       options.body = JSON.stringify(body);
     }
 
-    const response = await fetch(`${API_BASE}${endpoint}`, options);
+    const response = await fetchWithRetry(`${API_BASE}${endpoint}`, options);
     
     // Check if response is ok
     if (!response.ok) {
@@ -59,6 +86,37 @@ async function apiRequest(endpoint, method = "GET", body = null) {
   }
 }
 
+/**
+ * Follow the status of the user's transactions (server-sent events).
+ * onUpdate gets {hash, kind, status, ledger}: first for recent
+ * transactions, then on every change ("pending" -> "success" / "failed" /
+ * "expired"). EventSource can't send headers, so the query string carries
+ * a short-lived stream token instead of the login token; once the server
+ * turns a reconnect down (expired token), a new token is fetched.
+ * @param {function} onUpdate - Called with each update
+ * @returns {Promise<void>}
+ */
+async function subscribeTransactions(onUpdate) {
+  let token;
+  try {
+    ({ token } = await apiRequest("/wallet/tx-events/token", "POST"));
+  } catch (error) {
+    setTimeout(() => subscribeTransactions(onUpdate), 5000);
+    return;
+  }
+
+  const source = new EventSource(
+    `${API_BASE}/wallet/tx-events?token=${encodeURIComponent(token)}`
+  );
+
+  source.addEventListener("tx", (event) => onUpdate(JSON.parse(event.data)));
+  source.addEventListener("error", () => {
+    if (source.readyState === EventSource.CLOSED) {
+      setTimeout(() => subscribeTransactions(onUpdate), 1000);
+    }
+  });
+}
+
 /**
  * Check if user is authenticated
  * @returns {boolean}
@@ -25,7 +25,7 @@ async function makePayment() {
       destination: destination,
       amount: amount,
       roundoff_option: investToggle.checked ? "invest" : "none"
-    });
+    }, { "Idempotency-Key": newIdempotencyKey() });
 
     statusElement.style.color = "var(--primary-teal)";
     statusElement.textContent = "✅ Payment successful!";
@@ -36,6 +36,35 @@ async function makePayment() {
   }
 }
 
+const TX_LABELS = {
+  payment: "Payment",
+  deposit_xlm: "Vault deposit",
+  withdraw_xlm: "Vault withdrawal",
+  invest_usdc: "USDC investment"
+};
+const TX_ICONS = { pending: "⏳", success: "✅", failed: "❌", expired: "⌛" };
+
+// hash -> latest update, most recently updated last
+const transactions = new Map();
+
+/**
+ * Show the latest transaction updates pushed by the backend
+ */
+function onTransactionUpdate(update) {
+  transactions.delete(update.hash);
+  transactions.set(update.hash, update);
+
+  const recent = [...transactions.values()].slice(-5).reverse();
+  document.getElementById("txActivity").innerHTML = recent
+    .map((tx) => {
+      const ledger = tx.ledger ? ` · ledger ${tx.ledger}` : "";
+      return `<p style="opacity: 0.8;">${TX_ICONS[tx.status] || ""} ${TX_LABELS[tx.kind] || tx.kind} · ${tx.hash.slice(0, 10)}…${ledger}</p>`;
+    })
+    .join("");
+}
+
+subscribeTransactions(onTransactionUpdate);
+
 document.getElementById("amount").addEventListener("input", function() {
   const amount = parseFloat(this.value);
   if (!amount) return;
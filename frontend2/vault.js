@@ -1,6 +1,9 @@
 // Require authentication
 requireAuth();
 
+let withdrawing = false;
+let reloadTimer = null;
+
 /**
  * Load vault data
  */
@@ -65,25 +68,44 @@ async function withdraw() {
   statusElement.style.color = "var(--primary-cyan)";
   statusElement.textContent = "Processing withdrawal...";
 
+  withdrawing = true;
   try {
     await apiRequest("/vault/withdraw", "POST", {
       amount: amount
-    });
+    }, { "Idempotency-Key": newIdempotencyKey() });
 
     statusElement.style.color = "var(--primary-teal)";
-    statusElement.textContent = "✅ Withdrawal successful!";
-
-    setTimeout(() => {
-      loadVault();
-      document.getElementById("withdrawAmount").value = "";
-    }, 1500);
+    statusElement.textContent = "✅ Withdrawal confirmed and paid out!";
+    document.getElementById("withdrawAmount").value = "";
 
   } catch (error) {
     statusElement.style.color = "#ff6b6b";
     statusElement.textContent = `❌ Withdrawal failed: ${error.message}`;
+  } finally {
+    withdrawing = false;
+  }
+}
+
+/**
+ * Transaction updates pushed by the backend: show the contract call of a
+ * running withdrawal, and reload balances once something is final
+ */
+function onTransactionUpdate(update) {
+  if (withdrawing && update.kind === "withdraw_xlm" && update.status === "pending") {
+    const statusElement = document.getElementById("withdrawStatus");
+    statusElement.textContent = "⏳ Withdrawal submitted, waiting for ledger confirmation...";
+  }
+
+  if (update.status !== "pending") {
+    // Updates arrive in bursts (recent transactions on connect): reload once
+    clearTimeout(reloadTimer);
+    reloadTimer = setTimeout(loadVault, 300);
   }
 }
 
 
-// Load data when page loads
-document.addEventListener("DOMContentLoaded", loadVault);
+// Load data when page loads, then follow transaction updates
+document.addEventListener("DOMContentLoaded", () => {
+  loadVault();
+  subscribeTransactions(onTransactionUpdate);
+});
@@ -40,5 +40,68 @@ async function loadYield() {
   }
 }
 
+/**
+ * Parse "0:8, 180:6" into [{from_day, apy}] (APY given in percent)
+ */
+function parseSchedule(text) {
+  return text
+    .split(",")
+    .map((part) => part.trim())
+    .filter(Boolean)
+    .map((part) => {
+      const [day, apy] = part.split(":").map(Number);
+      return { from_day: day, apy: apy / 100 };
+    });
+}
+
+/**
+ * Project the cohort on the backend and show the result
+ */
+async function runSimulation() {
+  const resultElement = document.getElementById("simResult");
+  const days = parseInt(document.getElementById("simDays").value, 10);
+
+  resultElement.style.display = "block";
+  resultElement.style.color = "var(--primary-cyan)";
+  resultElement.textContent = "Simulating...";
+
+  try {
+    const data = await apiRequest("/vault/yield-simulation", "POST", {
+      days: days,
+      compounding: document.getElementById("simCompounding").value,
+      sample_every: Math.max(1, Math.round(days / 12)),
+      cohorts: [{
+        name: "cohort",
+        users: parseInt(document.getElementById("simUsers").value, 10),
+        principal: parseFloat(document.getElementById("simPrincipal").value) || 0,
+        deposit: parseFloat(document.getElementById("simDeposit").value) || 0,
+        deposit_every: 7,
+        spread: 0.5,
+        schedule: parseSchedule(document.getElementById("simSchedule").value)
+      }]
+    });
+
+    const cohort = data.cohorts[0];
+    const perUser = (value) => (value / cohort.users).toFixed(2);
+    const series = data.series
+      .map((point) => `Day ${point.day}: ${point.balance.toFixed(2)} USDC`)
+      .join("<br>");
+
+    resultElement.style.color = "inherit";
+    resultElement.innerHTML = `
+      <p>Deposited: <b>${cohort.deposited.toFixed(2)} USDC</b> (${perUser(cohort.deposited)} per user)</p>
+      <p>Yield earned: <b>${cohort.yield_earned.toFixed(2)} USDC</b> (${perUser(cohort.yield_earned)} per user)</p>
+      <p>Final balance: <b>${cohort.final_balance.toFixed(2)} USDC</b>, median user ${cohort.balance_p50.toFixed(2)}</p>
+      <p>Effective APY: <b>${(cohort.effective_apy * 100).toFixed(2)}%</b></p>
+      <p style="opacity: 0.7; margin-top: 12px;">${series}</p>
+      <p style="opacity: 0.5; font-size: 12px;">${data.users} users x ${data.days} days in ${data.elapsed_ms} ms</p>
+    `;
+
+  } catch (error) {
+    resultElement.style.color = "#ff6b6b";
+    resultElement.textContent = `❌ Simulation failed: ${error.message}`;
+  }
+}
+
 // Load data when page loads
 document.addEventListener("DOMContentLoaded", loadYield);
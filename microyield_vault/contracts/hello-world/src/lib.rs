@@ -2,7 +2,7 @@
 
 use soroban_sdk::{
     contract, contractimpl, contracttype,
-    symbol_short, Env, Address,
+    symbol_short, Env, Address, BytesN, Vec,
 };
 
 #[contract]
@@ -17,6 +17,7 @@ pub enum DataKey {
     UsdcYield(Address),
     TotalXlm,
     TotalUsdcPrincipal,
+    AppliedBatch(BytesN<32>),
 }
 
 
@@ -40,6 +41,18 @@ impl Vault {
         admin.require_auth();
     }
 
+    // Records batch_id; false if it was already applied, so a resent
+    // batch transaction is a no-op instead of a second credit
+    fn claim_batch(env: &Env, batch_id: &BytesN<32>) -> bool {
+        let key = DataKey::AppliedBatch(batch_id.clone());
+        if env.storage().persistent().has(&key) {
+            return false;
+        }
+
+        env.storage().persistent().set(&key, &true);
+        true
+    }
+
     // ==============================
     // 1️⃣ Deposit XLM Savings
     // ==============================
@@ -63,6 +76,41 @@ impl Vault {
         env.events().publish((symbol_short!("deposit"), user), amount);
     }
 
+    // ==============================
+    // 1️⃣b Credit swept round-offs in bulk (one admin auth per batch)
+    // ==============================
+    // The XLM was already paid to the vault account by each user's
+    // payment transaction; the backend sweeps the accumulated amounts here.
+    // Applied once per batch_id, like add_yield_batch.
+    pub fn credit_xlm_batch(env: Env, batch_id: BytesN<32>, entries: Vec<(Address, i128)>) -> bool {
+        Self::require_admin(&env);
+
+        if !Self::claim_batch(&env, &batch_id) {
+            return false;
+        }
+
+        let mut total: i128 = env.storage().persistent().get(&DataKey::TotalXlm).unwrap_or(0);
+
+        for (user, amount) in entries.iter() {
+            if amount <= 0 {
+                panic!("Invalid deposit amount");
+            }
+
+            let key = DataKey::XlmBalance(user.clone());
+            let current: i128 = env.storage().persistent().get(&key).unwrap_or(0);
+
+            let new_balance = current.checked_add(amount).expect("Overflow");
+            env.storage().persistent().set(&key, &new_balance);
+
+            total = total.checked_add(amount).expect("Overflow");
+
+            env.events().publish((symbol_short!("deposit"), user), amount);
+        }
+
+        env.storage().persistent().set(&DataKey::TotalXlm, &total);
+        true
+    }
+
     // ==============================
     // 2️⃣ Invest XLM into USDC
     // ==============================
@@ -117,6 +165,35 @@ impl Vault {
         env.events().publish((symbol_short!("yield"), user), amount);
     }
 
+    // ==============================
+    // 3️⃣b Add Yield in bulk (one admin auth per batch)
+    // ==============================
+    // Applied once per batch_id: returns false and changes nothing when
+    // the batch was already applied.
+    pub fn add_yield_batch(env: Env, batch_id: BytesN<32>, entries: Vec<(Address, i128)>) -> bool {
+        Self::require_admin(&env);
+
+        if !Self::claim_batch(&env, &batch_id) {
+            return false;
+        }
+
+        for (user, amount) in entries.iter() {
+            if amount <= 0 {
+                panic!("Invalid yield amount");
+            }
+
+            let key = DataKey::UsdcYield(user.clone());
+            let current: i128 = env.storage().persistent().get(&key).unwrap_or(0);
+
+            let new_yield = current.checked_add(amount).expect("Overflow");
+            env.storage().persistent().set(&key, &new_yield);
+
+            env.events().publish((symbol_short!("yield"), user), amount);
+        }
+
+        true
+    }
+
     // ==============================
     // 4️⃣ Withdraw XLM Savings
     // ==============================
@@ -182,4 +259,12 @@ impl Vault {
             .get(&DataKey::TotalUsdcPrincipal)
             .unwrap_or(0)
     }
+
+    pub fn batch_applied(env: Env, batch_id: BytesN<32>) -> bool {
+        env.storage()
+            .persistent()
+            .has(&DataKey::AppliedBatch(batch_id))
+    }
 }
+
+mod test;
@@ -1,21 +1,91 @@
 #![cfg(test)]
 
 use super::*;
-use soroban_sdk::{vec, Env, String};
+use soroban_sdk::{testutils::Address as _, vec, BytesN, Env};
+
+fn setup(env: &Env) -> (VaultClient<'_>, Address) {
+    env.mock_all_auths();
+
+    let contract_id = env.register(Vault, ());
+    let client = VaultClient::new(env, &contract_id);
+    let admin = Address::generate(env);
+    client.initialize(&admin);
+
+    (client, admin)
+}
 
 #[test]
-fn test() {
+fn deposit_and_withdraw() {
     let env = Env::default();
-    let contract_id = env.register(Contract, ());
-    let client = ContractClient::new(&env, &contract_id);
-
-    let words = client.hello(&String::from_str(&env, "Dev"));
-    assert_eq!(
-        words,
-        vec![
-            &env,
-            String::from_str(&env, "Hello"),
-            String::from_str(&env, "Dev"),
-        ]
-    );
+    let (client, _) = setup(&env);
+    let user = Address::generate(&env);
+
+    client.deposit_xlm(&user, &500);
+    client.withdraw_xlm(&user, &200);
+
+    assert_eq!(client.get_user_summary(&user), (300, 0, 0));
+    assert_eq!(client.total_xlm(), 300);
+}
+
+#[test]
+fn add_yield_batch_applies_once() {
+    let env = Env::default();
+    let (client, admin) = setup(&env);
+    let (alice, bob) = (Address::generate(&env), Address::generate(&env));
+    let batch = BytesN::from_array(&env, &[1; 32]);
+    let entries = vec![&env, (alice.clone(), 10), (bob.clone(), 20)];
+
+    assert!(!client.batch_applied(&batch));
+    assert!(client.add_yield_batch(&batch, &entries));
+    assert_eq!(env.auths()[0].0, admin);
+
+    // Resent after a timeout: nothing is credited twice
+    assert!(!client.add_yield_batch(&batch, &entries));
+    assert!(client.batch_applied(&batch));
+    assert_eq!(client.get_user_summary(&alice), (0, 0, 10));
+    assert_eq!(client.get_user_summary(&bob), (0, 0, 20));
+
+    // A different batch id is a different batch
+    let next = BytesN::from_array(&env, &[2; 32]);
+    assert!(client.add_yield_batch(&next, &vec![&env, (alice.clone(), 5)]));
+    assert_eq!(client.get_user_summary(&alice), (0, 0, 15));
+}
+
+#[test]
+fn credit_xlm_batch_applies_once() {
+    let env = Env::default();
+    let (client, _) = setup(&env);
+    let user = Address::generate(&env);
+    let batch = BytesN::from_array(&env, &[3; 32]);
+    let entries = vec![&env, (user.clone(), 70)];
+
+    assert!(client.credit_xlm_batch(&batch, &entries));
+    assert!(!client.credit_xlm_batch(&batch, &entries));
+
+    assert_eq!(client.get_user_summary(&user), (70, 0, 0));
+    assert_eq!(client.total_xlm(), 70);
+}
+
+#[test]
+#[should_panic]
+fn credit_xlm_batch_requires_admin() {
+    let env = Env::default();
+    let contract_id = env.register(Vault, ());
+    let client = VaultClient::new(&env, &contract_id);
+    client.initialize(&Address::generate(&env));
+
+    let batch = BytesN::from_array(&env, &[3; 32]);
+    client.credit_xlm_batch(&batch, &vec![&env, (Address::generate(&env), 70)]);
+}
+
+#[test]
+#[should_panic]
+fn add_yield_batch_requires_admin() {
+    let env = Env::default();
+    let contract_id = env.register(Vault, ());
+    let client = VaultClient::new(&env, &contract_id);
+    client.initialize(&Address::generate(&env));
+
+    let batch = BytesN::from_array(&env, &[1; 32]);
+    client.add_yield_batch(&batch, &vec![&env, (Address::generate(&env), 10)]);
 }
@@ -0,0 +1,28 @@
+"""
+Tests run the app against the in-memory network of benchmarks/stub_rpc.py
+and a throwaway SQLite database. app.config reads the environment once,
+so every test module shares one stub.
+
+Run from the repo root:
+    python -m pytest tests
+"""
+
+import os
+
+import pytest
+
+from benchmarks.stub_rpc import StubStellarNetwork
+
+
+@pytest.fixture(scope="session")
+def stub(tmp_path_factory):
+    with StubStellarNetwork(latency=0) as stub:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp_path_factory.mktemp('db')}/test.db"
+        os.environ["HORIZON_URL"] = stub.base_url
+        os.environ["SOROBAN_RPC_URL"] = stub.rpc_url
+        os.environ["FRIENDBOT_URL"] = stub.friendbot_url
+        os.environ["LOG_TIMINGS"] = "false"
+
+        from app.migrations import upgrade
+        upgrade()
+        yield stub
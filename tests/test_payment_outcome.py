@@ -0,0 +1,42 @@
+"""/wallet/pay when Horizon's answer to a submission is lost"""
+
+import asyncio
+
+from stellar_sdk import Keypair
+
+
+def test_payment_with_lost_response_is_not_sent_twice(stub, monkeypatch):
+    import httpx
+    from benchmarks.bench_db_sessions import seed
+    from app.main import app
+    from app.services import stellar_service_async
+    from app.services.auth_service import create_access_token
+
+    token = create_access_token({"sub": seed(1)[0]})
+    merchant = Keypair.random().public_key
+    headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": "lost-response"}
+    payment = {"destination": merchant, "amount": 3.3, "roundoff_option": "invest"}
+
+    async def scenario():
+        server = stellar_service_async.get_horizon_server()
+        submit_transaction = server.submit_transaction
+
+        async def submit_then_drop(tx, **kwargs):
+            await submit_transaction(tx, **kwargs)
+            raise ConnectionError("response lost")
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            monkeypatch.setattr(server, "submit_transaction", submit_then_drop)
+            lost = await client.post("/wallet/pay", json=payment, headers=headers)
+            monkeypatch.setattr(server, "submit_transaction", submit_transaction)
+            retried = await client.post("/wallet/pay", json=payment, headers=headers)
+
+        await stellar_service_async.close_clients()
+        return lost, retried
+
+    lost, retried = asyncio.run(scenario())
+
+    assert lost.status_code == 504
+    assert retried.status_code == 200
+    assert retried.json()["payment_hash"] in lost.json()["detail"]
+    assert [p["amount"] for p in stub.payments if p["to"] == merchant] == ["3.3"]
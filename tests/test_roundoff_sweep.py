@@ -0,0 +1,55 @@
+"""Round-off sweeps (app/services/roundoff_ledger.py)"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+
+def test_sweep_lost_after_acceptance_is_credited_once(stub, monkeypatch):
+    from stellar_sdk import Keypair
+    from app.config import JOB_LEASE_SECONDS
+    from app.database import SessionLocal
+    from app.models import user, wallet  # tables the entries reference
+    from app.models.roundoff import RoundoffEntry, RoundoffSweep
+    from app.services import roundoff_ledger, stellar_service_async
+
+    users = {Keypair.random().public_key: 1_500_000, Keypair.random().public_key: 2_500_000}
+    db = SessionLocal()
+    db.add_all(RoundoffEntry(wallet_id=None, public_key=user, amount=amount) for user, amount in users.items())
+    db.commit()
+
+    async def scenario():
+        server = stellar_service_async.get_soroban_server()
+        send_transaction = server.send_transaction
+
+        async def send_then_drop(tx):
+            await send_transaction(tx)
+            raise ConnectionError("response lost")
+
+        monkeypatch.setattr(server, "send_transaction", send_then_drop)
+        first = await roundoff_ledger.sweep_pending()
+        monkeypatch.setattr(server, "send_transaction", send_transaction)
+
+        # The entries stay claimed, so a second run does not sweep them again
+        second = await roundoff_ledger.sweep_pending()
+
+        db.query(RoundoffSweep).update(
+            {"created_at": datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS + 1)}
+        )
+        db.commit()
+        recovered = await roundoff_ledger.sweep_pending()
+
+        await stellar_service_async.close_clients()
+        return first, second, recovered
+
+    try:
+        first, second, recovered = asyncio.run(scenario())
+
+        assert first["errors"] == ["response lost"]
+        assert second["sweeps"] == [] and second["errors"] == []
+        assert set(users) <= set(recovered["swept_users"])
+
+        assert {s.status for s in db.query(RoundoffSweep)} == {"done"}
+        assert {e.status for e in db.query(RoundoffEntry).filter(RoundoffEntry.public_key.in_(users))} == {"swept"}
+        assert {user: stub.contract_xlm[user] for user in users} == users
+    finally:
+        db.close()
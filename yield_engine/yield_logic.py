@@ -1,15 +1,27 @@
+import asyncio
 from decimal import Decimal, ROUND_DOWN
-from typing import List, Dict
-from datetime import datetime
-
+from typing import List, Dict, Optional
+from datetime import datetime, date
+
+from app.config import YIELD_BATCH_SIZE, YIELD_ANNUAL_APY
+from app.database import SessionLocal
+from app.migrations import upgrade
+from app.models.wallet import Wallet
+from app.models.yield_run import YieldRun, YieldAllocation
 from app.services.stellar_service import (
     soroban_get_total_usdc_principal,
-    soroban_get_user_summary,
-    soroban_add_yield_admin
+    soroban_get_usdc_principals,
+)
+from app.services.stellar_service_async import (
+    batch_id,
+    close_clients,
+    soroban_add_yield_batch,
+    soroban_batch_applied,
+    wait_for_transaction,
 )
 
-# Annual APY (8%)
-ANNUAL_APY = Decimal("0.08")
+# Annual APY (8% unless YIELD_ANNUAL_APY says otherwise)
+ANNUAL_APY = Decimal(YIELD_ANNUAL_APY)
 DAYS_IN_YEAR = Decimal("365")
 
 
@@ -22,47 +34,149 @@ def calculate_daily_yield(total_principal: Decimal) -> Decimal:
     return earned.quantize(Decimal("0.0000001"), rounding=ROUND_DOWN)
 
 
-def distribute_daily_yield(users: List[str]) -> Dict:
+def compute_yield_shares(principals: Dict[str, int], total_principal: int, daily_yield: int) -> Dict[str, int]:
     """
-    Distribute yield proportionally to all users
-    based on their USDC principal.
+    Split daily_yield (stroops) proportionally to each user's principal
+    (stroops) in one integer pass. Shares are floored, so the sum never
+    exceeds daily_yield.
     """
+    if total_principal <= 0:
+        return {}
+
+    shares = {
+        user: daily_yield * principal // total_principal
+        for user, principal in principals.items()
+        if principal > 0
+    }
+    return {user: amount for user, amount in shares.items() if amount > 0}
 
-    total_principal = Decimal(
-        soroban_get_total_usdc_principal()
-    )
 
+def _plan_run(db, run_date: str, users: List[str], chunk_size: int) -> Optional[YieldRun]:
+    """Read all principals once and persist the chunked allocation plan"""
+    total_principal = soroban_get_total_usdc_principal()
     if total_principal == 0:
-        return {"message": "No principal in vault"}
+        return None
 
-    daily_yield = calculate_daily_yield(total_principal)
+    daily_yield = int(calculate_daily_yield(Decimal(total_principal)))
+    shares = compute_yield_shares(soroban_get_usdc_principals(users), total_principal, daily_yield)
 
-    results = []
+    run = YieldRun(run_date=run_date, total_principal=total_principal, daily_yield=daily_yield)
+    db.add(run)
+    db.flush()
 
-    for user_public_key in users:
-        xlm, principal, yield_amt = soroban_get_user_summary(user_public_key)
+    db.add_all(
+        YieldAllocation(
+            run_id=run.id,
+            chunk_index=i // chunk_size,
+            public_key=user,
+            amount=amount,
+        )
+        for i, (user, amount) in enumerate(sorted(shares.items()))
+    )
+    db.commit()
+    return run
 
-        user_principal = Decimal(principal)
 
-        if user_principal == 0:
-            continue
+async def _apply_chunk(db, run: YieldRun, chunk_index: int, allocations: List[YieldAllocation]):
+    """
+    Submit one add_yield_batch transaction for a chunk and wait for it.
 
-        share_ratio = user_principal / total_principal
-        user_yield = (daily_yield * share_ratio).quantize(
-            Decimal("0.0000001"),
-            rounding=ROUND_DOWN
-        )
+    The contract records each chunk's batch id and ignores a batch it has
+    already applied. A chunk that was in flight when a previous run
+    stopped is checked on-chain first, and otherwise sent again: should
+    the earlier transaction still land, only one of the two credits.
+    """
+    batch = batch_id("add_yield_batch", run.run_date, chunk_index)
+    tx_hash = allocations[0].tx_hash
+    if tx_hash and await soroban_batch_applied(batch):
+        status = "SUCCESS"
+    else:
+        result = await soroban_add_yield_batch(batch, [(a.public_key, a.amount) for a in allocations])
+        tx_hash = result["hash"]
+        for a in allocations:
+            a.tx_hash = tx_hash
+            a.status = "submitted"
+        db.commit()
+        status = await wait_for_transaction(tx_hash)
+        # Not seen (yet, or no longer retained by RPC): the contract's record decides
+        if status == "NOT_FOUND" and await soroban_batch_applied(batch):
+            status = "SUCCESS"
+
+    for a in allocations:
+        a.status = "done" if status == "SUCCESS" else status.lower()
+    db.commit()
+
+    if status != "SUCCESS":
+        raise Exception(f"add_yield_batch {tx_hash} ended with {status}")
+
+
+async def distribute_daily_yield(users: List[str], run_date: Optional[str] = None,
+                                 chunk_size: int = YIELD_BATCH_SIZE) -> Dict:
+    """
+    Distribute yield proportionally to all users
+    based on their USDC principal.
 
-        if user_yield > 0:
-            soroban_add_yield_admin(user_public_key, int(user_yield))
-            results.append({
-                "user": user_public_key,
-                "yield_added": str(user_yield)
-            })
-
-    return {
-        "total_principal": str(total_principal),
-        "daily_yield_generated": str(daily_yield),
-        "distributed_to": results,
-        "timestamp": datetime.utcnow().isoformat()
-    }
\ No newline at end of file
+    The allocation for run_date (today by default) is planned once and
+    stored; calling again for the same date resumes from the first chunk
+    that has not been confirmed on-chain. Run from the CLI (below), one
+    process at a time.
+    """
+    run_date = run_date or date.today().isoformat()
+    db = SessionLocal()
+
+    try:
+        run = db.query(YieldRun).filter(YieldRun.run_date == run_date).first()
+        if run is None:
+            run = _plan_run(db, run_date, users, chunk_size)
+            if run is None:
+                return {"message": "No principal in vault"}
+
+        chunks = {}
+        for allocation in run.allocations:
+            chunks.setdefault(allocation.chunk_index, []).append(allocation)
+
+        for chunk_index in sorted(chunks):
+            allocations = chunks[chunk_index]
+            if all(a.status == "done" for a in allocations):
+                continue
+            await _apply_chunk(db, run, chunk_index, allocations)
+
+        if run.status != "done":
+            run.status = "done"
+            run.completed_at = datetime.utcnow()
+            db.commit()
+
+        return {
+            "total_principal": str(Decimal(run.total_principal) / Decimal("10000000")),
+            "daily_yield_generated": str(Decimal(run.daily_yield) / Decimal("10000000")),
+            "distributed_to": [
+                {
+                    "user": a.public_key,
+                    "yield_added": str(Decimal(a.amount) / Decimal("10000000")),
+                    "tx_hash": a.tx_hash,
+                }
+                for a in run.allocations
+            ],
+            "chunks": len(chunks),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import app.models.user  # noqa: F401 (Wallet.user resolves "User" by name)
+
+    upgrade()
+
+    db = SessionLocal()
+    wallet_keys = [w.public_key for w in db.query(Wallet).all()]
+    db.close()
+
+    async def main():
+        try:
+            return await distribute_daily_yield(wallet_keys)
+        finally:
+            await close_clients()
+
+    print(asyncio.run(main()))